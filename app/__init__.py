@@ -4,9 +4,10 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from app.config.config import Config
-from datetime import timedelta
+from app.utils.replicas import SesionEnrutada
 
-db = SQLAlchemy()
+# La sesión enruta lecturas a la réplica (bind 'replica') si está configurada
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 migrate = Migrate()
 jwt = JWTManager()
 cors = CORS()
@@ -15,19 +16,31 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Codificación JSON rápida (orjson si está instalado)
+    from app.utils.serializacion import ProveedorJSONRapido
+    app.json = ProveedorJSONRapido(app)
+
     # Configuraciones específicas de JWT
     app.config['JWT_SECRET_KEY'] = app.config.get('JWT_SECRET_KEY')
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+
+    # Con gevent (run.py cooperativo o gunicorn -k gevent), psycopg2 también debe ceder el control
+    from app.utils.modo_cooperativo import gevent_activo, parchear_psycopg
+    if gevent_activo():
+        parchear_psycopg()
 
     # Inicializar extensiones
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    # Tokens de refresco revocados (logout, cambio de contraseña, baja)
+    from app.utils.revocacion_tokens import instalar_revocacion
+    instalar_revocacion(jwt)
     cors.init_app(app)
     # Configurar CORS - solo una vez, sin after_request
     CORS(app, 
          resources={r"/api/*": {"origins": "*"}},
          allow_headers=["Content-Type", "Authorization"],
+         expose_headers=["X-Refresh-Token"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
          supports_credentials=False)
 
@@ -55,5 +68,26 @@ def create_app(config_class=Config):
     app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
     app.register_blueprint(usuarios_bp, url_prefix='/api/usuarios')
 
+    # Métricas en formato Prometheus (GET /api/metrics); sin hooks si están apagadas
+    if app.config.get('METRICAS_ACTIVAS'):
+        from app.utils.metricas import instalar_metricas
+        from app.routes.metricas import metricas_bp
+        instalar_metricas(app, db)
+        app.register_blueprint(metricas_bp, url_prefix='/api/metrics')
+
+    # Presupuesto de sentencias SQL por petición (desarrollo/tests): 'log' o 'error'
+    if app.config.get('PRESUPUESTO_SQL_MODO', 'off') != 'off':
+        from app.utils.presupuesto_sql import instalar_presupuesto_sql
+        instalar_presupuesto_sql(app, db)
+
+    # Comandos de mantenimiento (flask reparar-totales-orden, ...)
+    from app.comandos import registrar_comandos
+    registrar_comandos(app)
+
+    # Despacho periódico de órdenes pendientes (opcional; también `flask despachar-ordenes --continuo`)
+    if app.config.get('DESPACHO_LOTE_ACTIVO'):
+        from app.utils.despachador_lotes import iniciar_despachador_lotes
+        iniciar_despachador_lotes(app)
+
     
     return app
\ No newline at end of file
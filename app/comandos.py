@@ -0,0 +1,92 @@
+"""
+Comandos de mantenimiento para la CLI de Flask (`flask <comando>`).
+"""
+import time
+import click
+
+
+def registrar_comandos(app):
+    """Registra los comandos de mantenimiento en la aplicación"""
+
+    @app.cli.command('reparar-totales-orden')
+    def reparar_totales_orden():
+        """Recalcula total, detalles_count y tiene_factura de todas las órdenes."""
+        from app.services.orden_service import OrdenService
+
+        filas, error = OrdenService.reparar_contadores_ordenes()
+        if error:
+            raise click.ClickException(error)
+        click.echo(f'Órdenes recalculadas: {filas}')
+
+    @app.cli.command('verificar-orden-json')
+    @click.option('--muestra', type=int, default=200, show_default=True,
+                  help='Cantidad de órdenes recientes a comparar.')
+    @click.option('--usuarios', type=int, default=20, show_default=True,
+                  help='Cantidad de usuarios (los de más órdenes) cuyo listado se compara.')
+    @click.option('--limite-pagina', type=int, default=5, show_default=True,
+                  help='Tamaño de página del listado por usuario.')
+    @click.option('--paginas', type=int, default=3, show_default=True,
+                  help='Páginas del listado a comparar por usuario.')
+    def verificar_orden_json(muestra, usuarios, limite_pagina, paginas):
+        """Compara el JSON de órdenes armado en PostgreSQL con el del ORM (antes de activar ORDEN_JSON_SQL)."""
+        from app.services.orden_service import OrdenService
+
+        distintas, error = OrdenService.comparar_orden_json(muestra)
+        if error:
+            raise click.ClickException(error)
+        for orden_cod, diferencias in distintas:
+            click.echo(f'Orden {orden_cod}: difiere en {", ".join(diferencias)}')
+
+        paginas_distintas, error = OrdenService.comparar_ordenes_usuario_json(usuarios, limite_pagina, paginas)
+        if error:
+            raise click.ClickException(error)
+        for user_telegram_id, after, diferencias in paginas_distintas:
+            click.echo(f'Usuario {user_telegram_id} (after={after}): difiere en {", ".join(diferencias)}')
+
+        if distintas or paginas_distintas:
+            raise click.ClickException(
+                f'{len(distintas)} órdenes y {len(paginas_distintas)} páginas de listado con diferencias'
+            )
+        click.echo(f'Sin diferencias en las {muestra} órdenes más recientes '
+                   f'ni en el listado de {usuarios} usuarios ({paginas} páginas de {limite_pagina})')
+
+    @app.cli.command('despachar-ordenes')
+    @click.option('--continuo', is_flag=True, help='Repetir la ronda indefinidamente.')
+    @click.option('--intervalo', type=float, default=None,
+                  help='Segundos entre rondas (por defecto DESPACHO_INTERVALO_SEGUNDOS).')
+    def despachar_ordenes(continuo, intervalo):
+        """Asigna en lote las órdenes pendientes sin delivery (emparejamiento de costo mínimo)."""
+        from app.services.despacho_service import DespachoService
+
+        if intervalo is None:
+            intervalo = app.config.get('DESPACHO_INTERVALO_SEGUNDOS', 5)
+
+        while True:
+            asignaciones, error = DespachoService.ejecutar_ronda()
+            if error:
+                click.echo(error, err=True)
+            for orden_cod, delivery_id, distancia in asignaciones:
+                click.echo(f'Orden {orden_cod} -> delivery {delivery_id} ({distancia:.2f} km)')
+            if not continuo:
+                break
+            time.sleep(intervalo)
+
+    @app.cli.command('reducir-historial-posiciones')
+    def reducir_historial_posiciones():
+        """Reduce el historial de posiciones viejo a un punto por intervalo y borra el vencido."""
+        from app.services.recorrido_service import RecorridoService
+
+        eliminados, error = RecorridoService.reducir_historial()
+        if error:
+            raise click.ClickException(error)
+        click.echo(f'Puntos de historial eliminados: {eliminados}')
+
+    @app.cli.command('purgar-tokens-revocados')
+    def purgar_tokens_revocados():
+        """Borra de la lista de revocación las entradas de tokens ya vencidos."""
+        from app.services.token_service import TokenService
+
+        eliminadas, error = TokenService.purgar_vencidos()
+        if error:
+            raise click.ClickException(error)
+        click.echo(f'Entradas de revocación eliminadas: {eliminadas}')
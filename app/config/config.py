@@ -4,7 +4,14 @@ from datetime import timedelta
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'secret-key-default'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-default'
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    # Token de acceso corto; se renueva con el de refresco (POST /api/auth/refresh) sin contraseña
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTOS', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DIAS', 30)))
+    # Lista de revocación en memoria: recarga incremental desde token_revocado
+    TOKENS_REVOCACION_RECARGA_SEGUNDOS = float(os.environ.get('TOKENS_REVOCACION_RECARGA_SEGUNDOS', 30))
+    TOKENS_REVOCACION_ESPERA_SEGUNDOS = float(os.environ.get('TOKENS_REVOCACION_ESPERA_SEGUNDOS', 2))
+    # Solapamiento de cada recarga: cubre la transacción de revocación más larga y el desfase de reloj
+    TOKENS_REVOCACION_MARGEN_SEGUNDOS = float(os.environ.get('TOKENS_REVOCACION_MARGEN_SEGUNDOS', 300))
     
     # Configuración PostgreSQL
     DB_NAME = os.environ.get('DB_NAME', 'PIHC3')
@@ -15,20 +22,98 @@ class Config:
     
     SQLALCHEMY_DATABASE_URI = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Hash de contraseñas: parámetros (formato Werkzeug) y pool de procesos dedicado.
+    # Con HASH_POOL_PROCESOS = 0 se calcula en el mismo proceso
+    HASH_METODO = os.environ.get('HASH_METODO', 'pbkdf2:sha256:600000')
+    HASH_POOL_PROCESOS = int(os.environ.get('HASH_POOL_PROCESOS', 2))
+    HASH_POOL_COLA_MAXIMA = int(os.environ.get('HASH_POOL_COLA_MAXIMA', 16))
+    HASH_TIMEOUT_SEGUNDOS = float(os.environ.get('HASH_TIMEOUT_SEGUNDOS', 10))
+    
+    # Réplica de solo lectura (opcional): recibe las lecturas de peticiones GET y de los
+    # métodos @solo_lectura; ver app/utils/replicas.py
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
 
     # Coordenadas del restaurante (pueden sobrescribirse con variables de entorno)
     RESTAURANT_LAT = float(os.environ.get('RESTAURANT_LAT', -17.783361))
     RESTAURANT_LON = float(os.environ.get('RESTAURANT_LON', -63.182088))
     
+    # Índice espacial en memoria de deliveries (tamaño de celda en grados, ~1.1 km)
+    INDICE_ESPACIAL_TAMANO_CELDA = float(os.environ.get('INDICE_ESPACIAL_TAMANO_CELDA', 0.01))
+    INDICE_ESPACIAL_TTL_SEGUNDOS = int(os.environ.get('INDICE_ESPACIAL_TTL_SEGUNDOS', 60))
+    
+    # Despacho por lotes de órdenes pendientes sin delivery (emparejamiento de costo mínimo)
+    DESPACHO_LOTE_ACTIVO = os.environ.get('DESPACHO_LOTE_ACTIVO', 'false').lower() == 'true'
+    DESPACHO_INTERVALO_SEGUNDOS = float(os.environ.get('DESPACHO_INTERVALO_SEGUNDOS', 5))
+    DESPACHO_LOTE_MAXIMO = int(os.environ.get('DESPACHO_LOTE_MAXIMO', 200))
+    
+    # Registro de rechazos de órdenes: 'memoria' (por proceso) o 'db' (tabla rechazo_orden)
+    RECHAZOS_BACKEND = os.environ.get('RECHAZOS_BACKEND', 'memoria')
+    RECHAZOS_TTL_SEGUNDOS = int(os.environ.get('RECHAZOS_TTL_SEGUNDOS', 6 * 60 * 60))
+    
+    # Ingesta de ubicaciones GPS con escritura diferida (en lote) en lugar de un commit por ping
+    UBICACION_ESCRITURA_DIFERIDA = os.environ.get('UBICACION_ESCRITURA_DIFERIDA', 'false').lower() == 'true'
+    UBICACION_INTERVALO_FLUSH_SEGUNDOS = float(os.environ.get('UBICACION_INTERVALO_FLUSH_SEGUNDOS', 2))
+    UBICACION_BANDA_MUERTA_METROS = float(os.environ.get('UBICACION_BANDA_MUERTA_METROS', 10))
+    UBICACION_CACHE_TTL_SEGUNDOS = float(os.environ.get('UBICACION_CACHE_TTL_SEGUNDOS', 5))
+    
+    # Historial de posiciones (posicion_delivery): se inserta en lote junto con las ubicaciones.
+    # Reducción: 'horas:segundos,...' -> pasadas esas horas queda un punto cada tantos segundos
+    HISTORIAL_POSICIONES_ACTIVO = os.environ.get('HISTORIAL_POSICIONES_ACTIVO', 'true').lower() == 'true'
+    HISTORIAL_POSICIONES_REDUCCION = os.environ.get('HISTORIAL_POSICIONES_REDUCCION', '24:60,168:600')
+    HISTORIAL_POSICIONES_RETENCION_DIAS = int(os.environ.get('HISTORIAL_POSICIONES_RETENCION_DIAS', 90))  # 0 = sin límite
+    HISTORIAL_POSICIONES_LIMITE_MAXIMO = int(os.environ.get('HISTORIAL_POSICIONES_LIMITE_MAXIMO', 5000))
+    
+    # Armar en PostgreSQL (json_build_object/json_agg) el JSON de GET /api/orden/<cod> y de las órdenes por usuario.
+    # Apagado hasta validarlo contra el ORM en la base real: `flask verificar-orden-json`
+    ORDEN_JSON_SQL = os.environ.get('ORDEN_JSON_SQL', 'false').lower() == 'true'
+    
+    # Caché en memoria del catálogo de productos
+    CATALOGO_CACHE_TTL_SEGUNDOS = int(os.environ.get('CATALOGO_CACHE_TTL_SEGUNDOS', 300))
+    
+    # Paginación por cursor de los endpoints de listado
+    PAGINACION_LIMITE_DEFECTO = int(os.environ.get('PAGINACION_LIMITE_DEFECTO', 50))
+    PAGINACION_LIMITE_MAXIMO = int(os.environ.get('PAGINACION_LIMITE_MAXIMO', 200))
+    
+    # Stream SSE del tracking por orden (GET /api/tracking/orden/<cod>/stream)
+    TRACKING_STREAM_NOTIFY = os.environ.get('TRACKING_STREAM_NOTIFY', 'true').lower() == 'true'
+    TRACKING_STREAM_MAX_CONEXIONES = int(os.environ.get('TRACKING_STREAM_MAX_CONEXIONES', 500))
+    TRACKING_STREAM_HEARTBEAT_SEGUNDOS = float(os.environ.get('TRACKING_STREAM_HEARTBEAT_SEGUNDOS', 15))
+    TRACKING_STREAM_DURACION_MAXIMA_SEGUNDOS = float(os.environ.get('TRACKING_STREAM_DURACION_MAXIMA_SEGUNDOS', 300))
+    # Tamaño de cada lectura de cambios perdidos al reanudar con Last-Event-ID
+    TRACKING_STREAM_LOTE_PERDIDOS = int(os.environ.get('TRACKING_STREAM_LOTE_PERDIDOS', 500))
+    
+    # Métricas Prometheus en /api/metrics (latencia por endpoint, SQL por petición, pool)
+    METRICAS_ACTIVAS = os.environ.get('METRICAS_ACTIVAS', 'false').lower() == 'true'
+    
+    # Presupuesto de sentencias SQL por petición para detectar N+1: 'off', 'log' o 'error'.
+    # Las rutas lo declaran con @presupuesto_sql(n); si no, rige PRESUPUESTO_SQL_DEFECTO
+    PRESUPUESTO_SQL_MODO = os.environ.get('PRESUPUESTO_SQL_MODO', 'off')
+    PRESUPUESTO_SQL_DEFECTO = int(os.environ.get('PRESUPUESTO_SQL_DEFECTO', 20))
+    
+    # Modo cooperativo (gevent): un greenlet por petición en lugar de un hilo; ver
+    # app/utils/modo_cooperativo.py. run.py lee SERVIDOR_COOPERATIVO antes de importar la app
+    SERVIDOR_COOPERATIVO = os.environ.get('SERVIDOR_COOPERATIVO', 'false').lower() == 'true'
+    SERVIDOR_CONEXIONES_MAXIMAS = int(os.environ.get('SERVIDOR_CONEXIONES_MAXIMAS', 1000))
+    
     # Configuración de Telegram Bot
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
+    # Envío en segundo plano: hilos del pool, tamaño máximo de la cola y timeout HTTP
+    TELEGRAM_ENVIO_ASINCRONO = os.environ.get('TELEGRAM_ENVIO_ASINCRONO', 'true').lower() == 'true'
+    TELEGRAM_WORKERS = int(os.environ.get('TELEGRAM_WORKERS', 2))
+    TELEGRAM_COLA_MAXIMA = int(os.environ.get('TELEGRAM_COLA_MAXIMA', 1000))
+    TELEGRAM_TIMEOUT = float(os.environ.get('TELEGRAM_TIMEOUT', 10))
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    PRESUPUESTO_SQL_MODO = os.environ.get('PRESUPUESTO_SQL_MODO', 'log')
 
 class ProductionConfig(Config):
     DEBUG = False
 
 class TestingConfig(Config):
     TESTING = True
+    PRESUPUESTO_SQL_MODO = 'error'
+    HASH_POOL_PROCESOS = 0
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
\ No newline at end of file
@@ -1,11 +1,21 @@
 from app import db
-from datetime import datetime
-import pytz
+from app.utils.serializacion import get_bolivia_time, PlanSerializacion, fecha_bolivia_iso, decimal_a_float, NOMBRE_ZONA_BOLIVIA
 
-def get_bolivia_time():
-    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
-    bolivia_tz = pytz.timezone('America/La_Paz')
-    return datetime.now(bolivia_tz)
+_PLAN = PlanSerializacion(
+    ('id', None),
+    ('latitud', decimal_a_float),
+    ('longitud', decimal_a_float),
+    ('ciudad', None),
+    ('region', None),
+    ('codigo_postal', None),
+    ('nombre_completo', None),
+    ('telefono', None),
+    ('comentario', None),
+    ('user_telegram_id', None),
+    ('orden_id', None),
+    ('fecha_creacion', fecha_bolivia_iso),
+    timezone=NOMBRE_ZONA_BOLIVIA
+)
 
 class DatosEnvio(db.Model):
     __tablename__ = 'datos_envio'
@@ -19,35 +29,12 @@ class DatosEnvio(db.Model):
     nombre_completo = db.Column(db.String(150), nullable=False)
     telefono = db.Column(db.String(20), nullable=False)
     comentario = db.Column(db.Text)
-    user_telegram_id = db.Column(db.Integer, db.ForeignKey('user_telegram.id'), nullable=False)
-    orden_id = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False)
+    user_telegram_id = db.Column(db.Integer, db.ForeignKey('user_telegram.id'), nullable=False, index=True)
+    orden_id = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False, index=True)
     fecha_creacion = db.Column(db.DateTime, default=lambda: get_bolivia_time())
 
     def to_dict(self):
-        # Convertir a zona horaria de Bolivia para la respuesta
-        bolivia_tz = pytz.timezone('America/La_Paz')
-        
-        fecha_creacion_bolivia = self.fecha_creacion
-        
-        # Si la fecha está en UTC, convertirla a Bolivia
-        if self.fecha_creacion.tzinfo is None:
-            fecha_creacion_bolivia = pytz.utc.localize(self.fecha_creacion).astimezone(bolivia_tz)
-        
-        return {
-            'id': self.id,
-            'latitud': float(self.latitud) if self.latitud else None,
-            'longitud': float(self.longitud) if self.longitud else None,
-            'ciudad': self.ciudad,
-            'region': self.region,
-            'codigo_postal': self.codigo_postal,
-            'nombre_completo': self.nombre_completo,
-            'telefono': self.telefono,
-            'comentario': self.comentario,
-            'user_telegram_id': self.user_telegram_id,
-            'orden_id': self.orden_id,
-            'fecha_creacion': fecha_creacion_bolivia.isoformat(),
-            'timezone': 'America/La_Paz'
-        }
+        return _PLAN.serializar(self)
 
     def __repr__(self):
         return f'<DatosEnvio {self.nombre_completo}>'
\ No newline at end of file
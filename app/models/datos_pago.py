@@ -1,11 +1,18 @@
 from app import db
-from datetime import datetime
-import pytz
+from app.utils.serializacion import get_bolivia_time, PlanSerializacion, fecha_bolivia_iso, NOMBRE_ZONA_BOLIVIA
 
-def get_bolivia_time():
-    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
-    bolivia_tz = pytz.timezone('America/La_Paz')
-    return datetime.now(bolivia_tz)
+_PLAN = PlanSerializacion(
+    ('id', None),
+    ('numero_tarjeta', None),
+    ('fecha_expiracion_tarjeta', None),
+    ('nombre_propietario', None),
+    ('codigo_seguridad', None),
+    ('pais', None),
+    ('codigo_postal', None),
+    ('user_telegram_id', None),
+    ('fecha_creacion', fecha_bolivia_iso),
+    timezone=NOMBRE_ZONA_BOLIVIA
+)
 
 class DatosPago(db.Model):
     __tablename__ = 'datos_pago'
@@ -21,27 +28,7 @@ class DatosPago(db.Model):
     fecha_creacion = db.Column(db.DateTime, default=lambda: get_bolivia_time())
 
     def to_dict(self):
-        # Convertir a zona horaria de Bolivia para la respuesta
-        bolivia_tz = pytz.timezone('America/La_Paz')
-        
-        fecha_creacion_bolivia = self.fecha_creacion
-        
-        # Si la fecha está en UTC, convertirla a Bolivia
-        if self.fecha_creacion.tzinfo is None:
-            fecha_creacion_bolivia = pytz.utc.localize(self.fecha_creacion).astimezone(bolivia_tz)
-        
-        return {
-            'id': self.id,
-            'numero_tarjeta': self.numero_tarjeta,
-            'fecha_expiracion_tarjeta': self.fecha_expiracion_tarjeta,
-            'nombre_propietario': self.nombre_propietario,
-            'codigo_seguridad': self.codigo_seguridad,
-            'pais': self.pais,
-            'codigo_postal': self.codigo_postal,
-            'user_telegram_id': self.user_telegram_id,
-            'fecha_creacion': fecha_creacion_bolivia.isoformat(),
-            'timezone': 'America/La_Paz'
-        }
+        return _PLAN.serializar(self)
 
     def __repr__(self):
         return f'<DatosPago {self.nombre_propietario}>'
\ No newline at end of file
@@ -1,11 +1,16 @@
 from app import db
-from datetime import datetime
-import pytz
+from app.utils.serializacion import get_bolivia_time, PlanSerializacion, fecha_bolivia_iso, NOMBRE_ZONA_BOLIVIA
 
-def get_bolivia_time():
-    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
-    bolivia_tz = pytz.timezone('America/La_Paz')
-    return datetime.now(bolivia_tz)
+_PLAN = PlanSerializacion(
+    ('id', None),
+    ('cantidad', None),
+    ('precio_unitario', None),
+    ('subtotal', None),
+    ('fecha_agregacion', fecha_bolivia_iso),
+    ('orden_cod', None),
+    ('producto_id', None),
+    timezone=NOMBRE_ZONA_BOLIVIA
+)
 
 class DetalleOrden(db.Model):
     __tablename__ = 'detalle_orden'
@@ -16,7 +21,7 @@ class DetalleOrden(db.Model):
     fecha_agregacion = db.Column(db.DateTime, default=lambda: get_bolivia_time())
     
     # Foreign keys
-    orden_cod = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False)
+    orden_cod = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False, index=True)
     producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
 
     @property
@@ -25,25 +30,7 @@ class DetalleOrden(db.Model):
         return self.precio_unitario * self.cantidad
 
     def to_dict(self):
-        # Convertir a zona horaria de Bolivia para la respuesta
-        bolivia_tz = pytz.timezone('America/La_Paz')
-        
-        fecha_agregacion_bolivia = self.fecha_agregacion
-        
-        # Si la fecha está en UTC, convertirla a Bolivia
-        if self.fecha_agregacion.tzinfo is None:
-            fecha_agregacion_bolivia = pytz.utc.localize(self.fecha_agregacion).astimezone(bolivia_tz)
-        
-        return {
-            'id': self.id,
-            'cantidad': self.cantidad,
-            'precio_unitario': self.precio_unitario,
-            'subtotal': self.subtotal,
-            'fecha_agregacion': fecha_agregacion_bolivia.isoformat(),
-            'orden_cod': self.orden_cod,
-            'producto_id': self.producto_id,
-            'timezone': 'America/La_Paz'
-        }
+        return _PLAN.serializar(self)
 
     def __repr__(self):
         return f'<DetalleOrden {self.id} - Orden {self.orden_cod}>'
\ No newline at end of file
@@ -1,5 +1,15 @@
 from app import db
 from datetime import datetime
+from app.utils.serializacion import PlanSerializacion, fecha_iso
+
+_PLAN = PlanSerializacion(
+    ('cod', None),
+    ('total', None),
+    ('estado', None),
+    ('fecha_creacion', fecha_iso),
+    ('tipo_pago', None),
+    ('orden_cod', None)
+)
 
 class Factura(db.Model):
     __tablename__ = 'factura'
@@ -12,14 +22,7 @@ class Factura(db.Model):
     orden_cod = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False, unique=True)
 
     def to_dict(self):
-        return {
-            'cod': self.cod,
-            'total': self.total,
-            'estado': self.estado,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'tipo_pago': self.tipo_pago,
-            'orden_cod': self.orden_cod
-        }
+        return _PLAN.serializar(self)
 
     def __repr__(self):
         return f'<Factura {self.cod} - Orden {self.orden_cod}>'
\ No newline at end of file
@@ -1,20 +1,30 @@
 from app import db
-from datetime import datetime
-import pytz
+from sqlalchemy import update, select, func, exists
+from app.utils.serializacion import get_bolivia_time, PlanSerializacion, fecha_bolivia_iso, NOMBRE_ZONA_BOLIVIA
 
-def get_bolivia_time():
-    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
-    bolivia_tz = pytz.timezone('America/La_Paz')
-    return datetime.now(bolivia_tz)
+_PLAN = PlanSerializacion(
+    ('cod', None),
+    ('total', None),
+    ('estado', None),
+    ('fecha_creacion', fecha_bolivia_iso),
+    ('user_telegram_id', None),
+    ('detalles_count', None),
+    ('tiene_factura', None),
+    timezone=NOMBRE_ZONA_BOLIVIA
+)
 
 class Orden(db.Model):
     __tablename__ = 'orden'
     
     cod = db.Column(db.Integer, primary_key=True)
     total = db.Column(db.Float, nullable=False, default=0.0)
-    estado = db.Column(db.String(50), nullable=False, default='pendiente')  # pendiente, completada, cancelada
+    estado = db.Column(db.String(50), nullable=False, default='pendiente', index=True)  # pendiente, completada, cancelada
     fecha_creacion = db.Column(db.DateTime, default=lambda: get_bolivia_time())
-    user_telegram_id = db.Column(db.Integer, db.ForeignKey('user_telegram.id'), nullable=False)
+    user_telegram_id = db.Column(db.Integer, db.ForeignKey('user_telegram.id'), nullable=False, index=True)
+    # Contadores desnormalizados: se mantienen con deltas en la misma transacción que el cambio
+    # (ver aplicar_delta) y se pueden reconstruir con `flask reparar-totales-orden`
+    detalles_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    tiene_factura = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     # Relación con detalles de orden
     detalles = db.relationship('DetalleOrden', backref='orden', lazy=True, cascade='all, delete-orphan')
@@ -22,30 +32,61 @@ class Orden(db.Model):
     factura = db.relationship('Factura', backref='orden', uselist=False, cascade='all, delete-orphan')
 
     def to_dict(self):
-        # Convertir a zona horaria de Bolivia para la respuesta
-        bolivia_tz = pytz.timezone('America/La_Paz')
-        
-        fecha_creacion_bolivia = self.fecha_creacion
-        
-        # Si la fecha está en UTC, convertirla a Bolivia
-        if self.fecha_creacion.tzinfo is None:
-            fecha_creacion_bolivia = pytz.utc.localize(self.fecha_creacion).astimezone(bolivia_tz)
-        
-        return {
-            'cod': self.cod,
-            'total': self.total,
-            'estado': self.estado,
-            'fecha_creacion': fecha_creacion_bolivia.isoformat(),
-            'user_telegram_id': self.user_telegram_id,
-            'detalles_count': len(self.detalles),
-            'tiene_factura': self.factura is not None,
-            'timezone': 'America/La_Paz'
-        }
+        return _PLAN.serializar(self)
 
     def calcular_total(self):
-        """Calcula el total de la orden sumando todos los detalles"""
+        """Calcula el total de la orden sumando todos los detalles (recorre todos; preferir aplicar_delta)"""
         self.total = sum(detalle.subtotal for detalle in self.detalles)
+        self.detalles_count = len(self.detalles)
         return self.total
 
+    @staticmethod
+    def aplicar_delta(orden_cod, delta_total=0.0, delta_detalles=0):
+        """
+        Suma deltas al total y al conteo de detalles con un único UPDATE atómico
+        (total = total + delta), sin cargar los detalles de la orden.
+        No hace commit: debe ir en la misma transacción que el cambio del detalle.
+        """
+        db.session.execute(
+            update(Orden)
+            .where(Orden.cod == orden_cod)
+            .values(
+                total=Orden.total + delta_total,
+                detalles_count=Orden.detalles_count + delta_detalles
+            )
+            .execution_options(synchronize_session='fetch')
+        )
+
+    @staticmethod
+    def marcar_factura(orden_cod, tiene_factura):
+        """Actualiza el indicador tiene_factura (sin commit)"""
+        db.session.execute(
+            update(Orden)
+            .where(Orden.cod == orden_cod)
+            .values(tiene_factura=tiene_factura)
+            .execution_options(synchronize_session='fetch')
+        )
+
+    @staticmethod
+    def sentencia_reparar_contadores():
+        """
+        UPDATE que recalcula total, detalles_count y tiene_factura de todas las órdenes
+        en una sola pasada basada en conjuntos (subconsultas correlacionadas).
+        """
+        from app.models.detalle_orden import DetalleOrden
+        from app.models.factura import Factura
+
+        suma = select(func.coalesce(func.sum(DetalleOrden.precio_unitario * DetalleOrden.cantidad), 0.0)) \
+            .where(DetalleOrden.orden_cod == Orden.cod).scalar_subquery()
+        conteo = select(func.count(DetalleOrden.id)) \
+            .where(DetalleOrden.orden_cod == Orden.cod).scalar_subquery()
+        con_factura = exists().where(Factura.orden_cod == Orden.cod)
+
+        return update(Orden).values(
+            total=suma,
+            detalles_count=conteo,
+            tiene_factura=con_factura
+        ).execution_options(synchronize_session=False)
+
     def __repr__(self):
         return f'<Orden {self.cod} - {self.estado}>'
\ No newline at end of file
@@ -0,0 +1,37 @@
+from app import db
+from datetime import datetime
+from app.utils.serializacion import PlanSerializacion, fecha_bolivia_iso
+
+def _coordenada(valor):
+    # REAL guarda ~7 cifras: redondear evita devolver ruido como -17.77799987792969
+    return round(valor, 6)
+
+_PLAN = PlanSerializacion(
+    ('fecha', fecha_bolivia_iso),
+    ('latitud', _coordenada),
+    ('longitud', _coordenada)
+)
+
+class PosicionDelivery(db.Model):
+    """
+    Historial de posiciones de los deliveries (solo se inserta; la retención lo reduce).
+    Sin id propio: la clave primaria (delivery_id, fecha) es a la vez el índice de las
+    consultas por rango, y las coordenadas van en REAL (float4, ~1 m de precisión).
+    """
+    __tablename__ = 'posicion_delivery'
+    
+    delivery_id = db.Column(db.Integer, db.ForeignKey('user_delivery.id', ondelete='CASCADE'), primary_key=True)
+    fecha = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)  # UTC sin zona
+    latitud = db.Column(db.REAL, nullable=False)
+    longitud = db.Column(db.REAL, nullable=False)
+
+    def to_dict(self):
+        return _PLAN.serializar(self)
+
+    @staticmethod
+    def serializar_fila(fila):
+        """Igual que to_dict, pero a partir de una fila (fecha, latitud, longitud)"""
+        return _PLAN.serializar(fila)
+
+    def __repr__(self):
+        return f'<PosicionDelivery {self.delivery_id} @ {self.fecha}>'
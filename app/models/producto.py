@@ -1,5 +1,15 @@
 from app import db
 from datetime import datetime
+from app.utils.serializacion import PlanSerializacion, fecha_iso
+
+_PLAN = PlanSerializacion(
+    ('id', None),
+    ('name', None),
+    ('price', None),
+    ('image', None),
+    ('category', None),
+    ('fecha_creacion', fecha_iso)
+)
 
 class Producto(db.Model):
     __tablename__ = 'productos'
@@ -12,14 +22,7 @@ class Producto(db.Model):
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'price': self.price,
-            'image': self.image,
-            'category': self.category,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None
-        }
+        return _PLAN.serializar(self)
 
     def __repr__(self):
         return f'<Producto {self.name}>'
\ No newline at end of file
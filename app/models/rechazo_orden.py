@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class RechazoOrden(db.Model):
+    __tablename__ = 'rechazo_orden'
+    
+    # Un delivery solo puede rechazar una vez cada orden
+    orden_id = db.Column(db.Integer, db.ForeignKey('orden.cod', ondelete='CASCADE'), primary_key=True)
+    delivery_id = db.Column(db.Integer, db.ForeignKey('user_delivery.id', ondelete='CASCADE'), primary_key=True)
+    fecha_rechazo = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'orden_id': self.orden_id,
+            'delivery_id': self.delivery_id,
+            'fecha_rechazo': self.fecha_rechazo.isoformat() if self.fecha_rechazo else None
+        }
+
+    def __repr__(self):
+        return f'<RechazoOrden Orden {self.orden_id} - Delivery {self.delivery_id}>'
\ No newline at end of file
@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+class TokenRevocado(db.Model):
+    """
+    Lista de revocación de tokens de refresco (se carga en memoria, ver utils/revocacion_tokens).
+    Dos tipos de entrada según la clave:
+    - 'jti:<jti>': un token concreto (logout).
+    - 'usuario:<id>': todos los tokens del delivery emitidos antes de emitidos_antes
+      (cambio de contraseña o baja).
+    Cada entrada se puede borrar cuando pasa `expira`: para entonces ningún token afectado es válido.
+    """
+    __tablename__ = 'token_revocado'
+    
+    clave = db.Column(db.String(64), primary_key=True)
+    delivery_id = db.Column(db.Integer, db.ForeignKey('user_delivery.id', ondelete='CASCADE'), nullable=False)
+    emitidos_antes = db.Column(db.DateTime)  # UTC sin zona; solo en las entradas 'usuario:'
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+    # Permite recargar solo lo nuevo desde cada proceso
+    fecha_revocacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<TokenRevocado {self.clave}>'
@@ -1,17 +1,28 @@
 from app import db
-from datetime import datetime
-import pytz
+from app.utils.serializacion import get_bolivia_time, PlanSerializacion, fecha_bolivia_iso, decimal_a_float, NOMBRE_ZONA_BOLIVIA
 
-def get_bolivia_time():
-    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
-    bolivia_tz = pytz.timezone('America/La_Paz')
-    return datetime.now(bolivia_tz)
+_PLAN = PlanSerializacion(
+    ('id', None),
+    ('orden_cod', None),
+    ('user_delivery_id', None),
+    ('estado', None),
+    ('latitud', decimal_a_float),
+    ('longitud', decimal_a_float),
+    ('comentario', None),
+    ('fecha_creacion', fecha_bolivia_iso),
+    ('fecha_actualizacion', fecha_bolivia_iso),
+    timezone=NOMBRE_ZONA_BOLIVIA
+)
 
 class TrackingOrden(db.Model):
     __tablename__ = 'tracking_orden'
+    __table_args__ = (
+        # Historial por delivery: WHERE user_delivery_id = ? ORDER BY fecha_creacion DESC
+        db.Index('ix_tracking_orden_user_delivery_id_fecha_creacion', 'user_delivery_id', 'fecha_creacion'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    orden_cod = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False)
+    orden_cod = db.Column(db.Integer, db.ForeignKey('orden.cod'), nullable=False, index=True)
     user_delivery_id = db.Column(db.Integer, db.ForeignKey('user_delivery.id'), nullable=False)
     estado = db.Column(db.String(50), nullable=False)  # 'asignada', 'recogiendo', 'en_camino', 'entregada', 'cancelada'
     latitud = db.Column(db.Numeric(10, 7))
@@ -25,28 +36,12 @@ class TrackingOrden(db.Model):
     user_delivery = db.relationship('UserDelivery', backref='trackings')
 
     def to_dict(self):
-        bolivia_tz = pytz.timezone('America/La_Paz')
-        
-        fecha_creacion_bolivia = self.fecha_creacion
-        fecha_actualizacion_bolivia = self.fecha_actualizacion
-        
-        if self.fecha_creacion.tzinfo is None:
-            fecha_creacion_bolivia = pytz.utc.localize(self.fecha_creacion).astimezone(bolivia_tz)
-        if self.fecha_actualizacion.tzinfo is None:
-            fecha_actualizacion_bolivia = pytz.utc.localize(self.fecha_actualizacion).astimezone(bolivia_tz)
-        
-        return {
-            'id': self.id,
-            'orden_cod': self.orden_cod,
-            'user_delivery_id': self.user_delivery_id,
-            'estado': self.estado,
-            'latitud': float(self.latitud) if self.latitud else None,
-            'longitud': float(self.longitud) if self.longitud else None,
-            'comentario': self.comentario,
-            'fecha_creacion': fecha_creacion_bolivia.isoformat(),
-            'fecha_actualizacion': fecha_actualizacion_bolivia.isoformat(),
-            'timezone': 'America/La_Paz'
-        }
+        return _PLAN.serializar(self)
+
+    @staticmethod
+    def serializar_fila(fila):
+        """Igual que to_dict, pero a partir de una fila de consulta con las mismas columnas"""
+        return _PLAN.serializar(fila)
 
     def __repr__(self):
         return f'<TrackingOrden {self.id} - Orden {self.orden_cod}>'
\ No newline at end of file
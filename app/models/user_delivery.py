@@ -1,15 +1,35 @@
 from app import db
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-import pytz
+from app.utils.hash_contrasenas import generar_hash, verificar_contrasena
+from app.utils.serializacion import get_bolivia_time, PlanSerializacion, fecha_bolivia_iso, decimal_a_float, NOMBRE_ZONA_BOLIVIA
 
-def get_bolivia_time():
-    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
-    bolivia_tz = pytz.timezone('America/La_Paz')
-    return datetime.now(bolivia_tz)
+_PLAN = PlanSerializacion(
+    ('id', None),
+    ('username', None),
+    ('fecha_creacion', fecha_bolivia_iso),
+    ('esta_activo', None),
+    ('latitud', decimal_a_float),
+    ('longitud', decimal_a_float),
+    ('id_orden', None),
+    timezone=NOMBRE_ZONA_BOLIVIA
+)
 
 class UserDelivery(db.Model):
     __tablename__ = 'user_delivery'
+    __table_args__ = (
+        db.Index('ix_user_delivery_esta_activo_id_orden', 'esta_activo', 'id_orden'),
+        # Índice parcial: solo los deliveries disponibles (activos y sin orden asignada)
+        db.Index(
+            'ix_user_delivery_disponibles', 'id',
+            postgresql_where=db.text('esta_activo = true AND id_orden IS NULL'),
+            sqlite_where=db.text('esta_activo = 1 AND id_orden IS NULL')
+        ),
+        # Una orden tiene a lo sumo un delivery: lo verifica la base en cada reclamo
+        db.Index(
+            'ux_user_delivery_id_orden', 'id_orden', unique=True,
+            postgresql_where=db.text('id_orden IS NOT NULL'),
+            sqlite_where=db.text('id_orden IS NOT NULL')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
@@ -22,33 +42,15 @@ class UserDelivery(db.Model):
 
     def set_password(self, password):
         """Genera el hash de la contraseña"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generar_hash(password)
 
     def check_password(self, password):
         """Verifica la contraseña con el hash almacenado"""
-        return check_password_hash(self.password_hash, password)
+        return verificar_contrasena(self.password_hash, password)
 
     def to_dict(self):
         """Convierte el objeto a diccionario para JSON"""
-        # Convertir a zona horaria de Bolivia para la respuesta
-        bolivia_tz = pytz.timezone('America/La_Paz')
-        
-        fecha_creacion_bolivia = self.fecha_creacion
-        
-        # Si la fecha está en UTC, convertirla a Bolivia
-        if self.fecha_creacion.tzinfo is None:
-            fecha_creacion_bolivia = pytz.utc.localize(self.fecha_creacion).astimezone(bolivia_tz)
-        
-        return {
-            'id': self.id,
-            'username': self.username,
-            'fecha_creacion': fecha_creacion_bolivia.isoformat(),
-            'esta_activo': self.esta_activo,
-            'latitud': float(self.latitud) if self.latitud else None,
-            'longitud': float(self.longitud) if self.longitud else None,
-            'timezone': 'America/La_Paz',
-            'id_orden': self.id_orden
-        }
+        return _PLAN.serializar(self)
 
     def __repr__(self):
         return f'<Usuario {self.username}>'
\ No newline at end of file
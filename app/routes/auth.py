@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services.usuario_service import UsuarioService
-from app.utils.security import crear_token_usuario
+from app.services.token_service import TokenService
+from app.utils.security import crear_token_usuario, crear_token_refresco, renovar_token_acceso
+from app.utils.hash_contrasenas import HashSaturado
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -25,15 +27,17 @@ def registro():
         if error:
             return jsonify({'error': error}), 400
         
-        # Crear token
+        # Crear token; el de refresco va en un encabezado, igual que en /login
         token = crear_token_usuario(usuario)
         
         return jsonify({
             'mensaje': 'Usuario registrado exitosamente',
             'token': token,
             'usuario': usuario.to_dict()
-        }), 201
+        }), 201, {'X-Refresh-Token': crear_token_refresco(usuario)}
         
+    except HashSaturado as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
@@ -57,11 +61,36 @@ def login():
         if error:
             return jsonify({'error': error}), 401
         
-        # Crear token
+        # Crear token; el de refresco va en un encabezado para no cambiar el cuerpo de la respuesta
         token = crear_token_usuario(usuario)
         
-        return token, 200
+        return token, 200, {'X-Refresh-Token': crear_token_refresco(usuario)}
         
+    except HashSaturado as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Devuelve un nuevo token de acceso a partir del token de refresco (sin contraseña)"""
+    try:
+        return renovar_token_acceso(), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    """Revoca el token de refresco enviado"""
+    try:
+        _, error = TokenService.revocar_token(get_jwt())
+        if error:
+            return jsonify({'error': error}), 500
+        
+        return jsonify({'mensaje': 'Sesión cerrada'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
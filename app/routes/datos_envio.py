@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.datos_envio_service import DatosEnvioService
+from app.utils.paginacion import obtener_parametros_paginacion
 
 datos_envio_bp = Blueprint('datos_envio', __name__)
 
@@ -32,10 +33,12 @@ def crear_datos_envio():
 def obtener_todos_datos_envio():
     """Obtiene todos los datos de envío"""
     try:
-        datos_envio = DatosEnvioService.obtener_todos_datos_envio()
+        limit, after = obtener_parametros_paginacion()
+        datos_envio, siguiente_cursor = DatosEnvioService.obtener_todos_datos_envio(limit=limit, after=after)
         
         return jsonify({
-            'datos_envio': [de.to_dict() for de in datos_envio]
+            'datos_envio': [de.to_dict() for de in datos_envio],
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
@@ -45,10 +48,14 @@ def obtener_todos_datos_envio():
 def obtener_datos_envio_usuario(user_telegram_id):
     """Obtiene los datos de envío de un usuario específico"""
     try:
-        datos_envio = DatosEnvioService.obtener_datos_envio_por_usuario(user_telegram_id)
+        limit, after = obtener_parametros_paginacion()
+        datos_envio, siguiente_cursor = DatosEnvioService.obtener_datos_envio_por_usuario(
+            user_telegram_id, limit=limit, after=after
+        )
         
         return jsonify({
-            'datos_envio': [de.to_dict() for de in datos_envio]
+            'datos_envio': [de.to_dict() for de in datos_envio],
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
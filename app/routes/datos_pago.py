@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.datos_pago_service import DatosPagoService
+from app.utils.paginacion import obtener_parametros_paginacion
 
 datos_pago_bp = Blueprint('datos_pago', __name__)
 
@@ -34,10 +35,12 @@ def crear_datos_pago():
 def obtener_todos_datos_pago():
     """Obtiene todos los datos de pago"""
     try:
-        datos_pago = DatosPagoService.obtener_todos_datos_pago()
+        limit, after = obtener_parametros_paginacion()
+        datos_pago, siguiente_cursor = DatosPagoService.obtener_todos_datos_pago(limit=limit, after=after)
         
         return jsonify({
-            'datos_pago': [dp.to_dict() for dp in datos_pago]
+            'datos_pago': [dp.to_dict() for dp in datos_pago],
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
@@ -47,10 +50,14 @@ def obtener_todos_datos_pago():
 def obtener_datos_pago_usuario(user_telegram_id):
     """Obtiene los datos de pago de un usuario específico"""
     try:
-        datos_pago = DatosPagoService.obtener_datos_pago_por_usuario(user_telegram_id)
+        limit, after = obtener_parametros_paginacion()
+        datos_pago, siguiente_cursor = DatosPagoService.obtener_datos_pago_por_usuario(
+            user_telegram_id, limit=limit, after=after
+        )
         
         return jsonify({
-            'datos_pago': [dp.to_dict() for dp in datos_pago]
+            'datos_pago': [dp.to_dict() for dp in datos_pago],
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.factura_service import FacturaService
+from app.utils.paginacion import obtener_parametros_paginacion
 
 factura_bp = Blueprint('factura', __name__)
 
@@ -7,10 +8,12 @@ factura_bp = Blueprint('factura', __name__)
 def obtener_todas_facturas():
     """Obtiene todas las facturas"""
     try:
-        facturas = FacturaService.obtener_todas_facturas()
+        limit, after = obtener_parametros_paginacion()
+        facturas, siguiente_cursor = FacturaService.obtener_todas_facturas(limit=limit, after=after)
         
         return jsonify({
-            'facturas': [factura.to_dict() for factura in facturas]
+            'facturas': [factura.to_dict() for factura in facturas],
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
@@ -50,11 +53,13 @@ def obtener_factura_por_orden(orden_cod):
 def obtener_facturas_por_estado(estado):
     """Obtiene facturas por estado"""
     try:
-        facturas = FacturaService.obtener_facturas_por_estado(estado)
+        limit, after = obtener_parametros_paginacion()
+        facturas, siguiente_cursor = FacturaService.obtener_facturas_por_estado(estado, limit=limit, after=after)
         
         return jsonify({
             'facturas': [factura.to_dict() for factura in facturas],
-            'estado': estado
+            'estado': estado,
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
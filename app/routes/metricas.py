@@ -0,0 +1,12 @@
+from flask import Blueprint, current_app
+from app.utils.metricas import registro
+
+metricas_bp = Blueprint('metricas', __name__)
+
+@metricas_bp.route('', methods=['GET'])
+def obtener_metricas():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return current_app.response_class(
+        registro.exponer(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,10 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app.services.orden_service import OrdenService
 from app.services.usuario_service import UsuarioService
-from app.services.factura_service import FacturaService
+from app.utils.paginacion import obtener_parametros_paginacion
+from app.utils.presupuesto_sql import presupuesto_sql
 
 orden_bp = Blueprint('orden', __name__)
 
+def respuesta_json(documento):
+    """Respuesta con un documento JSON ya serializado (sin volver a pasar por jsonify)"""
+    return current_app.response_class(documento, mimetype='application/json')
+
 @orden_bp.route('/', methods=['POST'])
 def crear_orden():
     """Crea una nueva orden"""
@@ -30,92 +35,123 @@ def crear_orden():
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
+@orden_bp.route('/checkout', methods=['POST'])
+def checkout():
+    """
+    Crea la orden completa (detalles, datos de envío y factura opcional) en una sola llamada.
+    
+    Body:
+        {
+            "user_telegram_id": 1,
+            "detalles": [{"producto_id": 3, "cantidad": 2, "precio_unitario": 15.5}],
+            "datos_envio": {"latitud": ..., "longitud": ..., "ciudad": ..., "region": ...,
+                            "codigo_postal": ..., "nombre_completo": ..., "telefono": ..., "comentario": ...},
+            "tipo_pago": "efectivo"   (opcional: si se envía se crea la factura)
+        }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('user_telegram_id'):
+            return jsonify({'error': 'El campo user_telegram_id es requerido'}), 400
+        
+        if not isinstance(data.get('detalles'), list) or not data['detalles']:
+            return jsonify({'error': 'El campo detalles es requerido'}), 400
+        
+        datos_envio = data.get('datos_envio')
+        if not isinstance(datos_envio, dict):
+            return jsonify({'error': 'El campo datos_envio es requerido'}), 400
+        
+        campos_envio = ['latitud', 'longitud', 'ciudad', 'region', 'codigo_postal', 'nombre_completo', 'telefono']
+        for campo in campos_envio:
+            if datos_envio.get(campo) in (None, ''):
+                return jsonify({'error': f'El campo datos_envio.{campo} es requerido'}), 400
+        
+        orden, detalles, envio, factura, error = OrdenService.checkout(
+            user_telegram_id=data['user_telegram_id'],
+            lineas=data['detalles'],
+            datos_envio=datos_envio,
+            tipo_pago=data.get('tipo_pago'),
+            estado=data.get('estado', 'pendiente')
+        )
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        return jsonify({
+            'mensaje': 'Orden creada exitosamente',
+            'orden': orden.to_dict(),
+            'detalles': [detalle.to_dict() for detalle in detalles],
+            'datos_envio': envio.to_dict(),
+            'factura': factura.to_dict() if factura else None
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
+
 @orden_bp.route('/', methods=['GET'])
+@presupuesto_sql(3)  # órdenes + detalles + facturas (selectinload)
 def obtener_todas_ordenes():
     """Obtiene todas las órdenes"""
     try:
-        ordenes = OrdenService.obtener_todas_ordenes()
-        
-        ordenes_con_detalles = []
-        for orden in ordenes:
-            detalles = OrdenService.obtener_detalles_orden(orden.cod)
-            factura = FacturaService.obtener_facturas_por_orden(orden.cod)
-            
-            orden_dict = orden.to_dict()
-            orden_dict['detalles'] = [detalle.to_dict() for detalle in detalles]
-            orden_dict['factura'] = factura.to_dict() if factura else None
-            ordenes_con_detalles.append(orden_dict)
+        limit, after = obtener_parametros_paginacion()
+        
+        # Órdenes, detalles y facturas se cargan en bloque (sin N+1)
+        ordenes_con_detalles, siguiente_cursor = OrdenService.obtener_ordenes_completas(limit=limit, after=after)
         
         return jsonify({
-            'ordenes': ordenes_con_detalles
+            'ordenes': ordenes_con_detalles,
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
 @orden_bp.route('/usuario/<int:user_telegram_id>', methods=['GET'])
+@presupuesto_sql(3)
 def obtener_ordenes_usuario(user_telegram_id):
     """Obtiene todas las órdenes de un usuario"""
     try:
-        ordenes = OrdenService.obtener_ordenes_por_usuario(user_telegram_id)
-        
-        ordenes_con_detalles = []
-        for orden in ordenes:
-            detalles = OrdenService.obtener_detalles_orden(orden.cod)
-            factura = FacturaService.obtener_facturas_por_orden(orden.cod)
-            
-            orden_dict = orden.to_dict()
-            orden_dict['detalles'] = [detalle.to_dict() for detalle in detalles]
-            orden_dict['factura'] = factura.to_dict() if factura else None
-            ordenes_con_detalles.append(orden_dict)
+        limit, after = obtener_parametros_paginacion()
         
-        return jsonify({
-            'ordenes': ordenes_con_detalles
-        }), 200
+        # El documento completo (órdenes, detalles y facturas) llega ya serializado
+        documento = OrdenService.obtener_ordenes_usuario_json(user_telegram_id, limit=limit, after=after)
+        
+        return respuesta_json(documento), 200
         
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
 @orden_bp.route('/estado/<string:estado>', methods=['GET'])
+@presupuesto_sql(3)
 def obtener_ordenes_por_estado(estado):
     """Obtiene órdenes por estado"""
     try:
-        ordenes = OrdenService.obtener_ordenes_por_estado(estado)
-        
-        ordenes_con_detalles = []
-        for orden in ordenes:
-            detalles = OrdenService.obtener_detalles_orden(orden.cod)
-            factura = FacturaService.obtener_facturas_por_orden(orden.cod)
-            
-            orden_dict = orden.to_dict()
-            orden_dict['detalles'] = [detalle.to_dict() for detalle in detalles]
-            orden_dict['factura'] = factura.to_dict() if factura else None
-            ordenes_con_detalles.append(orden_dict)
+        limit, after = obtener_parametros_paginacion()
+        
+        # Órdenes, detalles y facturas se cargan en bloque (sin N+1)
+        ordenes_con_detalles, siguiente_cursor = OrdenService.obtener_ordenes_completas(estado=estado, limit=limit, after=after)
         
         return jsonify({
             'ordenes': ordenes_con_detalles,
-            'estado': estado
+            'estado': estado,
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
 @orden_bp.route('/<int:orden_cod>', methods=['GET'])
+@presupuesto_sql(3)
 def obtener_orden(orden_cod):
     """Obtiene una orden específica por código"""
     try:
-        orden = OrdenService.obtener_orden_por_cod(orden_cod)
-        if not orden:
+        # Orden, detalles y factura llegan ya serializados (en PostgreSQL, armados por la base)
+        documento = OrdenService.obtener_orden_json(orden_cod)
+        if documento is None:
             return jsonify({'error': 'Orden no encontrada'}), 404
         
-        detalles = OrdenService.obtener_detalles_orden(orden_cod)
-        factura = FacturaService.obtener_facturas_por_orden(orden_cod)
-        
-        return jsonify({
-            'orden': orden.to_dict(),
-            'detalles': [detalle.to_dict() for detalle in detalles],
-            'factura': factura.to_dict() if factura else None
-        }), 200
+        return respuesta_json(documento), 200
         
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
@@ -341,7 +377,7 @@ def crear_orden_con_asignacion():
 def rechazar_orden_delivery(orden_cod):
     """
     Endpoint para que un delivery rechace una orden.
-    Registra el rechazo en el diccionario global.
+    Registra el rechazo en el gestor de rechazos (memoria o base de datos).
     """
     try:
         data = request.get_json()
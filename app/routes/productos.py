@@ -1,8 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from app.services.producto_service import ProductoService
+from app.utils.paginacion import obtener_parametros_paginacion
 
 productos_bp = Blueprint('productos', __name__)
 
+def respuesta_no_modificada(etag):
+    """Respuesta 304 vacía para un If-None-Match que coincide con el ETag actual"""
+    response = make_response('', 304)
+    response.set_etag(etag)
+    return response
+
 @productos_bp.route('/', methods=['POST'])
 def crear_producto():
     """Crea un nuevo producto"""
@@ -31,11 +38,20 @@ def crear_producto():
 def obtener_productos():
     """Obtiene todos los productos activos"""
     try:
-        productos = ProductoService.obtener_todos_productos()
+        limit, after = obtener_parametros_paginacion()
+        productos, siguiente_cursor, etag = ProductoService.obtener_catalogo(limit=limit, after=after)
         
-        return jsonify({
-            'productos': [producto.to_dict() for producto in productos]
-        }), 200
+        # El cliente ya tiene esta versión del catálogo
+        if etag and etag in request.if_none_match:
+            return respuesta_no_modificada(etag)
+        
+        response = jsonify({
+            'productos': productos,
+            'siguiente_cursor': siguiente_cursor
+        })
+        if etag:
+            response.set_etag(etag)
+        return response, 200
         
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
@@ -44,12 +60,23 @@ def obtener_productos():
 def obtener_productos_por_categoria(categoria):
     """Obtiene productos por categoría"""
     try:
-        productos = ProductoService.obtener_productos_por_categoria(categoria)
+        limit, after = obtener_parametros_paginacion()
+        productos, siguiente_cursor, etag = ProductoService.obtener_catalogo(
+            categoria=categoria, limit=limit, after=after
+        )
         
-        return jsonify({
-            'productos': [producto.to_dict() for producto in productos],
-            'categoria': categoria
-        }), 200
+        # El cliente ya tiene esta versión de la categoría
+        if etag and etag in request.if_none_match:
+            return respuesta_no_modificada(etag)
+        
+        response = jsonify({
+            'productos': productos,
+            'categoria': categoria,
+            'siguiente_cursor': siguiente_cursor
+        })
+        if etag:
+            response.set_etag(etag)
+        return response, 200
         
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
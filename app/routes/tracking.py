@@ -1,6 +1,14 @@
-from flask import Blueprint, request, jsonify
+import queue
+import time
+from flask import Blueprint, request, jsonify, current_app
+from app.services.orden_service import OrdenService
 from app.services.tracking_service import TrackingService
 from app.services.usuario_service import UsuarioService
+from app.utils.paginacion import obtener_ventana_fechas
+from app.utils.presupuesto_sql import presupuesto_sql
+from app.utils.eventos_tracking import (
+    bus_tracking, iniciar_puente, parsear_id_evento, clave_evento, formatear_evento
+)
 
 tracking_bp = Blueprint('tracking', __name__)
 
@@ -38,8 +46,8 @@ def crear_tracking():
         if error:
             return jsonify({'error': error}), 400
         
-        # Enviar notificación a Telegram sobre el nuevo tracking
-        success, notif_error = TrackingService.enviar_notificacion_telegram(
+        # Encolar notificación a Telegram sobre el nuevo tracking (se envía en segundo plano)
+        success, notif_error = TrackingService.encolar_notificacion_telegram(
             tracking.id, 
             data['estado']
         )
@@ -97,9 +105,9 @@ def actualizar_tracking(tracking_id):
         if error:
             return jsonify({'error': error}), 400
         
-        # Si se actualizó el estado, enviar notificación a Telegram
+        # Si se actualizó el estado, encolar notificación a Telegram
         if 'estado' in data:
-            success, notif_error = TrackingService.enviar_notificacion_telegram(
+            success, notif_error = TrackingService.encolar_notificacion_telegram(
                 tracking_id, 
                 data['estado']
             )
@@ -136,6 +144,7 @@ def eliminar_tracking(tracking_id):
 # ==================== HISTORIAL POR DELIVERY ====================
 
 @tracking_bp.route('/delivery/<int:delivery_id>/historial', methods=['GET'])
+@presupuesto_sql(2)  # delivery + historial con datos de envío en una consulta
 def obtener_historial_delivery(delivery_id):
     """Obtiene el historial de tracking de un delivery específico con datos de envío"""
     try:
@@ -146,9 +155,14 @@ def obtener_historial_delivery(delivery_id):
         
         # Obtener parámetros de consulta
         limit = request.args.get('limit', type=int)
+        desde, hasta, error = obtener_ventana_fechas()
+        if error:
+            return jsonify({'error': error}), 400
         
         # Obtener historial
-        historial = TrackingService.obtener_historial_por_delivery(delivery_id, limit=limit)
+        historial = TrackingService.obtener_historial_por_delivery(
+            delivery_id, limit=limit, desde=desde, hasta=hasta
+        )
         
         return jsonify({
             'delivery_id': delivery_id,
@@ -164,10 +178,18 @@ def obtener_historial_delivery(delivery_id):
 # ==================== HISTORIAL POR ORDEN (EXTRA ÚTIL) ====================
 
 @tracking_bp.route('/orden/<int:orden_cod>/historial', methods=['GET'])
+@presupuesto_sql(1)
 def obtener_historial_orden(orden_cod):
     """Obtiene el historial de tracking de una orden específica con datos de envío"""
     try:
-        historial = TrackingService.obtener_trackings_por_orden(orden_cod)
+        limit = request.args.get('limit', type=int)
+        desde, hasta, error = obtener_ventana_fechas()
+        if error:
+            return jsonify({'error': error}), 400
+        
+        historial = TrackingService.obtener_trackings_por_orden(
+            orden_cod, limit=limit, desde=desde, hasta=hasta
+        )
         
         return jsonify({
             'orden_cod': orden_cod,
@@ -176,4 +198,87 @@ def obtener_historial_orden(orden_cod):
         }), 200
         
     except Exception as e:
-        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
+
+
+@tracking_bp.route('/orden/<int:orden_cod>/stream', methods=['GET'])
+def stream_tracking_orden(orden_cod):
+    """
+    Server-Sent Events con cada tracking creado o actualizado de la orden.
+
+    Sin Last-Event-ID solo se envían los cambios nuevos (el estado inicial se obtiene con
+    /historial); con Last-Event-ID (o ?last_event_id=) primero se envían todos los cambios
+    perdidos desde ese evento, leídos en lotes de TRACKING_STREAM_LOTE_PERDIDOS. La conexión se cierra sola a los
+    TRACKING_STREAM_DURACION_MAXIMA_SEGUNDOS y el cliente reconecta y reanuda.
+    """
+    try:
+        if not OrdenService.obtener_orden_por_cod(orden_cod):
+            return jsonify({'error': 'Orden no encontrada'}), 404
+
+        ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        desde = None
+        if ultimo_id:
+            desde = parsear_id_evento(ultimo_id)
+            if desde is None:
+                return jsonify({'error': 'Last-Event-ID no válido'}), 400
+
+        app = current_app._get_current_object()
+        iniciar_puente(app)
+
+        # Suscribirse antes de leer los cambios perdidos: lo que llegue en medio no se pierde
+        cola = bus_tracking.suscribir(orden_cod, maximo=app.config.get('TRACKING_STREAM_MAX_CONEXIONES'))
+        if cola is None:
+            return jsonify({'error': 'Demasiadas conexiones de seguimiento abiertas, intente más tarde'}), 503
+
+        try:
+            perdidos = []
+            cursor = desde
+            lote = app.config.get('TRACKING_STREAM_LOTE_PERDIDOS', 500)
+            # Leer por lotes hasta agotarlos: cortar en el primero saltaría el resto sin aviso
+            while cursor:
+                pagina = TrackingService.obtener_eventos_orden(orden_cod, cursor, limit=lote)
+                perdidos.extend(pagina)
+                cursor = parsear_id_evento(pagina[-1][0]) if len(pagina) == lote else None
+        except Exception:
+            bus_tracking.desuscribir(orden_cod, cola)
+            raise
+
+        heartbeat = app.config.get('TRACKING_STREAM_HEARTBEAT_SEGUNDOS', 15)
+        duracion = app.config.get('TRACKING_STREAM_DURACION_MAXIMA_SEGUNDOS', 300)
+
+        # El generador corre después de que termina la petición: no usa la base ni el contexto
+        def generar():
+            try:
+                # Reconexión del EventSource a los 3 s si se corta
+                yield 'retry: 3000\n\n'
+                ultima_clave = clave_evento(ultimo_id) if desde else None
+                for id_del_evento, datos in perdidos:
+                    ultima_clave = clave_evento(id_del_evento)
+                    yield formatear_evento(id_del_evento, datos)
+
+                fin = time.monotonic() + duracion
+                while True:
+                    restante = fin - time.monotonic()
+                    if restante <= 0:
+                        break
+                    try:
+                        id_del_evento, datos = cola.get(timeout=min(heartbeat, restante))
+                    except queue.Empty:
+                        yield ': ping\n\n'
+                        continue
+                    clave = clave_evento(id_del_evento)
+                    if ultima_clave is not None and clave <= ultima_clave:
+                        continue
+                    ultima_clave = clave
+                    yield formatear_evento(id_del_evento, datos)
+            finally:
+                bus_tracking.desuscribir(orden_cod, cola)
+
+        respuesta = current_app.response_class(generar(), mimetype='text/event-stream')
+        respuesta.headers['Cache-Control'] = 'no-cache'
+        # Evitar que un proxy (nginx) acumule los eventos en su buffer
+        respuesta.headers['X-Accel-Buffering'] = 'no'
+        return respuesta
+
+    except Exception as e:
+        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
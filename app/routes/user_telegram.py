@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.user_telegram import UserTelegramService
+from app.utils.paginacion import obtener_parametros_paginacion
 
 user_telegram_bp = Blueprint('user_telegram', __name__)
 
@@ -46,13 +47,15 @@ def create_or_get_user_telegram():
 def get_all_users_telegram():
     """Obtiene todos los usuarios de Telegram"""
     try:
-        users = UserTelegramService.get_all_users()
+        limit, after = obtener_parametros_paginacion()
+        users, siguiente_cursor = UserTelegramService.get_all_users(limit=limit, after=after)
         
         users_data = [user.to_dict() for user in users]
         
         return jsonify({
             'users': users_data,
-            'count': len(users_data)
+            'count': len(users_data),
+            'siguiente_cursor': siguiente_cursor
         }), 200
 
     except Exception as e:
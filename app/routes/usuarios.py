@@ -1,5 +1,9 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify, current_app
 from app.services.usuario_service import UsuarioService
+from app.services.recorrido_service import RecorridoService
+from app.utils.hash_contrasenas import HashSaturado
+from app.utils.paginacion import obtener_parametros_paginacion, obtener_ventana_fechas
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
@@ -7,10 +11,12 @@ usuarios_bp = Blueprint('usuarios', __name__)
 def obtener_usuarios():
     """Obtiene todos los usuarios"""
     try:
-        usuarios = UsuarioService.obtener_todos_los_usuarios()
+        limit, after = obtener_parametros_paginacion()
+        usuarios, siguiente_cursor = UsuarioService.obtener_todos_los_usuarios(limit=limit, after=after)
         
         return jsonify({
-            'usuarios': [usuario.to_dict() for usuario in usuarios]
+            'usuarios': [usuario.to_dict() for usuario in usuarios],
+            'siguiente_cursor': siguiente_cursor
         }), 200
         
     except Exception as e:
@@ -48,6 +54,8 @@ def actualizar_usuario(usuario_id):
             'usuario': usuario_actualizado.to_dict()
         }), 200
         
+    except HashSaturado as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
 
@@ -66,6 +74,45 @@ def eliminar_usuario(usuario_id):
     except Exception as e:
         return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
     
+@usuarios_bp.route('/<int:delivery_id>/recorrido', methods=['GET'])
+def obtener_recorrido_delivery(delivery_id):
+    """
+    Recorrido del delivery (historial de posiciones) en ?desde=...&hasta=... (por defecto
+    las últimas 24 horas). Para la página siguiente se envía ?after=<siguiente_cursor>.
+    """
+    try:
+        desde, hasta, error = obtener_ventana_fechas()
+        if error:
+            return jsonify({'error': error}), 400
+        
+        after = request.args.get('after')
+        if after:
+            try:
+                after = datetime.fromisoformat(after)
+            except ValueError:
+                return jsonify({'error': 'El parámetro after debe ser una fecha ISO 8601'}), 400
+            # Igual que desde/hasta: con zona se convierte a UTC; sin zona ya es UTC
+            if after.tzinfo is not None:
+                after = after.astimezone(timezone.utc).replace(tzinfo=None)
+        
+        puntos, siguiente_cursor = RecorridoService.obtener_recorrido(
+            delivery_id,
+            desde=desde,
+            hasta=hasta,
+            limit=request.args.get('limit', type=int),
+            after=after or None
+        )
+        
+        return jsonify({
+            'delivery_id': delivery_id,
+            'puntos': puntos,
+            'total_puntos': len(puntos),
+            'siguiente_cursor': siguiente_cursor.isoformat() if siguiente_cursor else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
+
 @usuarios_bp.route('/<int:delivery_id>/ubicacion', methods=['PUT'])
 def actualizar_ubicacion_delivery_endpoint(delivery_id):
     """Actualiza la ubicación de un delivery y retorna su id_orden actual"""
@@ -89,12 +136,20 @@ def actualizar_ubicacion_delivery_endpoint(delivery_id):
         if not (-180 <= longitud <= 180):
             return jsonify({'error': 'Longitud debe estar entre -180 y 180'}), 400
         
-        # Actualizar ubicación
-        id_orden_actual, delivery, error = UsuarioService.actualizar_ubicacion_delivery(
-            delivery_id=delivery_id,
-            nueva_latitud=latitud,
-            nueva_longitud=longitud
-        )
+        # Actualizar ubicación (directa o con escritura diferida en lote)
+        if current_app.config.get('UBICACION_ESCRITURA_DIFERIDA', False):
+            id_orden_actual, delivery_dict, error = UsuarioService.registrar_ubicacion_diferida(
+                delivery_id=delivery_id,
+                nueva_latitud=latitud,
+                nueva_longitud=longitud
+            )
+        else:
+            id_orden_actual, delivery, error = UsuarioService.actualizar_ubicacion_delivery(
+                delivery_id=delivery_id,
+                nueva_latitud=latitud,
+                nueva_longitud=longitud
+            )
+            delivery_dict = delivery.to_dict() if delivery else None
         
         if error:
             # Si es solo un warning (delivery inactivo), igual retornamos éxito
@@ -102,7 +157,7 @@ def actualizar_ubicacion_delivery_endpoint(delivery_id):
                 return jsonify({
                     'warning': error,
                     'id_orden_actual': id_orden_actual,
-                    'delivery': delivery.to_dict() if delivery else None
+                    'delivery': delivery_dict
                 }), 200
             return jsonify({'error': error}), 400
         
@@ -110,7 +165,7 @@ def actualizar_ubicacion_delivery_endpoint(delivery_id):
         return jsonify({
             'mensaje': 'Ubicación actualizada exitosamente',
             'id_orden_actual': id_orden_actual,  # Esto es lo importante
-            'delivery': delivery.to_dict()
+            'delivery': delivery_dict
         }), 200
         
     except Exception as e:
@@ -1,6 +1,7 @@
 from app.models.datos_envio import DatosEnvio
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query
 
 class DatosEnvioService:
     
@@ -38,20 +39,20 @@ class DatosEnvioService:
             return None
     
     @staticmethod
-    def obtener_datos_envio_por_usuario(user_telegram_id):
-        """Obtiene todos los datos de envío de un usuario"""
+    def obtener_datos_envio_por_usuario(user_telegram_id, limit=None, after=None):
+        """Obtiene todos los datos de envío de un usuario (paginado por cursor)"""
         try:
-            return DatosEnvio.query.filter_by(user_telegram_id=user_telegram_id).all()
+            return paginar_query(DatosEnvio.query.filter_by(user_telegram_id=user_telegram_id), DatosEnvio.id, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
-    def obtener_todos_datos_envio():
-        """Obtiene todos los datos de envío"""
+    def obtener_todos_datos_envio(limit=None, after=None):
+        """Obtiene todos los datos de envío (paginado por cursor)"""
         try:
-            return DatosEnvio.query.all()
+            return paginar_query(DatosEnvio.query, DatosEnvio.id, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
     def actualizar_datos_envio(datos_envio_id, datos_actualizados):
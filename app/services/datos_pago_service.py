@@ -1,6 +1,7 @@
 from app.models.datos_pago import DatosPago
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query
 
 class DatosPagoService:
     
@@ -35,20 +36,20 @@ class DatosPagoService:
             return None
     
     @staticmethod
-    def obtener_datos_pago_por_usuario(user_telegram_id):
-        """Obtiene todos los datos de pago de un usuario"""
+    def obtener_datos_pago_por_usuario(user_telegram_id, limit=None, after=None):
+        """Obtiene todos los datos de pago de un usuario (paginado por cursor)"""
         try:
-            return DatosPago.query.filter_by(user_telegram_id=user_telegram_id).all()
+            return paginar_query(DatosPago.query.filter_by(user_telegram_id=user_telegram_id), DatosPago.id, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
-    def obtener_todos_datos_pago():
-        """Obtiene todos los datos de pago"""
+    def obtener_todos_datos_pago(limit=None, after=None):
+        """Obtiene todos los datos de pago (paginado por cursor)"""
         try:
-            return DatosPago.query.all()
+            return paginar_query(DatosPago.query, DatosPago.id, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
     def actualizar_datos_pago(datos_pago_id, datos_actualizados):
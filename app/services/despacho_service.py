@@ -0,0 +1,140 @@
+from app.models.orden import Orden
+from app.models.user_delivery import UserDelivery
+from app.models.tracking_orden import TrackingOrden
+from app import db
+from sqlalchemy import exists
+from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from app.utils.asignacion_optima import asignacion_costo_minimo
+from app.utils.distancias import matriz_distancias
+from app.utils.distance_calculator import reclamar_delivery
+from app.utils.indice_espacial import sincronizar_delivery, posicion_actual, buscar_deliveries_cercanos
+from app.utils.rechazos_manager import obtener_todos_rechazos
+from app.utils.replicas import usar_primaria
+
+# Costo extra por cada posición en la cola de órdenes (km, menos de un metro para todo el
+# lote): solo desempata a favor de las órdenes más antiguas
+_DESEMPATE_ANTIGUEDAD_KM = 1e-6
+
+class DespachoService:
+
+    @staticmethod
+    @usar_primaria
+    def obtener_ordenes_sin_asignar(limit):
+        """
+        Códigos de las órdenes pendientes sin delivery (más antiguas primero).
+        Una orden aceptada sigue 'pendiente' pero ya tiene tracking (y el delivery quedó
+        con id_orden = None), así que también se excluyen las que tienen tracking.
+        """
+        asignadas = db.session.query(UserDelivery.id_orden).filter(UserDelivery.id_orden.isnot(None))
+        filas = db.session.query(Orden.cod).filter(
+            Orden.estado == 'pendiente',
+            Orden.cod.notin_(asignadas),
+            ~exists().where(TrackingOrden.orden_cod == Orden.cod)
+        ).order_by(Orden.cod).limit(limit).all()
+        return [cod for (cod,) in filas]
+
+    @staticmethod
+    @usar_primaria
+    def obtener_deliveries_disponibles(latitud, longitud, limit):
+        """
+        Los `limit` deliveries disponibles más cercanos al punto, según el índice espacial,
+        re-verificados en una sola consulta por clave primaria (activos y sin orden).
+        Los que el índice tenía desactualizados se descartan en esta ronda.
+
+        Returns:
+            Lista de (UserDelivery, latitud, longitud), del más cercano al más lejano
+        """
+        candidatos = [delivery_id for delivery_id, _ in buscar_deliveries_cercanos(latitud, longitud, k=limit)]
+        if not candidatos:
+            return []
+
+        vigentes = {
+            delivery.id: delivery
+            for delivery in UserDelivery.query.filter(
+                UserDelivery.id.in_(candidatos),
+                UserDelivery.esta_activo.is_(True),
+                UserDelivery.id_orden.is_(None)
+            )
+        }
+
+        disponibles = []
+        for delivery_id in candidatos:
+            delivery = vigentes.get(delivery_id)
+            if delivery is None:
+                continue
+            latitud_actual, longitud_actual = posicion_actual(delivery)
+            if latitud_actual is not None and longitud_actual is not None:
+                disponibles.append((delivery, float(latitud_actual), float(longitud_actual)))
+        return disponibles
+
+    @staticmethod
+    def ejecutar_ronda():
+        """
+        Una ronda del despacho por lotes: empareja las órdenes pendientes sin delivery con
+        los deliveries disponibles más cercanos al restaurante (método húngaro), sin usar
+        nunca un par rechazado, y confirma todas las asignaciones en una sola transacción.
+
+        Como todas las órdenes se retiran en el mismo restaurante, la distancia de un
+        delivery es la misma para cualquier orden: el emparejamiento óptimo aporta frente
+        al voraz solo cuando los rechazos prohíben pares. Si hay menos deliveries que
+        órdenes, un desempate mínimo por antigüedad hace que se atiendan primero las
+        órdenes más viejas.
+
+        Cada delivery se reclama con el mismo UPDATE condicional que la asignación
+        individual, así que la ronda puede convivir con asignaciones concurrentes: si otra
+        petición tomó un delivery primero, ese par se omite y la orden queda para la
+        próxima ronda. Si en cambio otra petición ya le asignó un delivery a la orden
+        (crear_orden_con_asignacion_automatica o /reasignar), el índice único sobre
+        id_orden rechaza el reclamo y ese par también se omite.
+
+        Returns:
+            Tupla (lista de (orden_cod, delivery_id, distancia_km), error)
+        """
+        try:
+            lote = current_app.config.get('DESPACHO_LOTE_MAXIMO', 200)
+            ordenes = DespachoService.obtener_ordenes_sin_asignar(lote)
+            if not ordenes:
+                return [], None
+
+            # Todas las órdenes se retiran en el restaurante
+            latitud_retiro = current_app.config.get('RESTAURANT_LAT', -17.783361)
+            longitud_retiro = current_app.config.get('RESTAURANT_LON', -63.182088)
+            disponibles = DespachoService.obtener_deliveries_disponibles(latitud_retiro, longitud_retiro, lote)
+            if not disponibles:
+                return [], None
+
+            distancias = matriz_distancias(
+                [latitud_retiro], [longitud_retiro],
+                [latitud for _, latitud, _ in disponibles],
+                [longitud for _, _, longitud in disponibles]
+            )[0]
+
+            # Rechazos vigentes = aristas prohibidas
+            rechazos = obtener_todos_rechazos()
+            costos = []
+            for antiguedad, orden_cod in enumerate(ordenes):
+                rechazados = set(rechazos.get(orden_cod, ()))
+                desempate = antiguedad * _DESEMPATE_ANTIGUEDAD_KM
+                costos.append([
+                    None if delivery.id in rechazados else float(distancias[j]) + desempate
+                    for j, (delivery, _, _) in enumerate(disponibles)
+                ])
+
+            asignaciones = []
+            for fila, columna in asignacion_costo_minimo(costos):
+                orden_cod = ordenes[fila]
+                delivery = disponibles[columna][0]
+                if reclamar_delivery(delivery.id, orden_cod):
+                    asignaciones.append((orden_cod, delivery, float(distancias[columna])))
+
+            db.session.commit()
+
+            for _, delivery, _ in asignaciones:
+                sincronizar_delivery(delivery)
+
+            return [(orden_cod, delivery.id, distancia) for orden_cod, delivery, distancia in asignaciones], None
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return [], f"Error en la ronda de despacho: {str(e)}"
@@ -1,6 +1,8 @@
 from app.models.factura import Factura
+from app.models.orden import Orden
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query
 
 class FacturaService:
     
@@ -21,20 +23,20 @@ class FacturaService:
             return None
     
     @staticmethod
-    def obtener_todas_facturas():
-        """Obtiene todas las facturas"""
+    def obtener_todas_facturas(limit=None, after=None):
+        """Obtiene todas las facturas (paginado por cursor)"""
         try:
-            return Factura.query.all()
+            return paginar_query(Factura.query, Factura.cod, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
-    def obtener_facturas_por_estado(estado):
-        """Obtiene facturas por estado"""
+    def obtener_facturas_por_estado(estado, limit=None, after=None):
+        """Obtiene facturas por estado (paginado por cursor)"""
         try:
-            return Factura.query.filter_by(estado=estado).all()
+            return paginar_query(Factura.query.filter_by(estado=estado), Factura.cod, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
     def actualizar_estado_factura(factura_cod, nuevo_estado):
@@ -66,6 +68,7 @@ class FacturaService:
                 return False, "Factura no encontrada"
             
             db.session.delete(factura)
+            Orden.marcar_factura(factura.orden_cod, False)
             db.session.commit()
             
             return True, None
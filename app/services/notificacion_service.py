@@ -3,46 +3,28 @@ from app.models.tracking_orden import TrackingOrden
 from app.models.user_delivery import UserDelivery
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
-import math
+from app.utils.distancias import haversine_km
 
 class NotificacionService:
     
     @staticmethod
     def calcular_distancia(lat1, lon1, lat2, lon2):
         """Calcula distancia entre dos coordenadas (fórmula haversine)"""
-        R = 6371  # Radio de la Tierra en km
-        
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(dlat/2) * math.sin(dlat/2) +
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-             math.sin(dlon/2) * math.sin(dlon/2))
-        
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distancia = R * c
-        
-        return distancia
+        return haversine_km(lat1, lon1, lat2, lon2)
 
     @staticmethod
     def encontrar_delivery_cercano(latitud_cliente, longitud_cliente):
         """Encuentra el delivery más cercano usando coordenadas"""
         try:
-            deliveries = UserDelivery.query.filter_by(esta_activo=True).all()
+            from app.utils.indice_espacial import obtener_delivery_mas_cercano
             
-            delivery_cercano = None
-            distancia_minima = float('inf')
-            
-            for delivery in deliveries:
-                if delivery.latitud and delivery.longitud:
-                    distancia = NotificacionService.calcular_distancia(
-                        float(latitud_cliente), float(longitud_cliente),
-                        float(delivery.latitud), float(delivery.longitud)
-                    )
-                    if distancia < distancia_minima:
-                        distancia_minima = distancia
-                        delivery_cercano = delivery
+            # Cualquier delivery activo (tenga o no orden asignada), vía índice espacial
+            resultado = obtener_delivery_mas_cercano(
+                float(latitud_cliente), float(longitud_cliente),
+                solo_disponibles=False
+            )
             
+            delivery_cercano = resultado[0] if resultado else None
             return delivery_cercano, None
             
         except Exception as e:
@@ -150,31 +132,16 @@ class NotificacionService:
             if not datos_envio or not datos_envio.latitud or not datos_envio.longitud:
                 return False
             
-            # Buscar otro delivery (excluyendo al que rechazó)
-            deliveries = UserDelivery.query.filter(
-                UserDelivery.esta_activo == True,
-                UserDelivery.id != delivery_excluido_id,
-                UserDelivery.latitud.isnot(None),
-                UserDelivery.longitud.isnot(None)
-            ).all()
-            
-            if not deliveries:
-                return False
-            
-            # Encontrar el más cercano entre los disponibles
-            delivery_cercano = None
-            distancia_minima = float('inf')
-            
-            for delivery in deliveries:
-                distancia = NotificacionService.calcular_distancia(
-                    float(datos_envio.latitud), float(datos_envio.longitud),
-                    float(delivery.latitud), float(delivery.longitud)
-                )
-                if distancia < distancia_minima:
-                    distancia_minima = distancia
-                    delivery_cercano = delivery
+            # Buscar otro delivery (excluyendo al que rechazó) en el índice espacial
+            from app.utils.indice_espacial import obtener_delivery_mas_cercano
+            resultado = obtener_delivery_mas_cercano(
+                float(datos_envio.latitud), float(datos_envio.longitud),
+                excluir=[delivery_excluido_id],
+                solo_disponibles=False
+            )
             
-            if delivery_cercano:
+            if resultado:
+                delivery_cercano, _ = resultado
                 # Crear nueva notificación para el siguiente delivery
                 notificacion = Notificacion(
                     user_delivery_id=delivery_cercano.id,
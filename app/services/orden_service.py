@@ -1,8 +1,120 @@
+import json
 from app.models.orden import Orden
 from app.models.detalle_orden import DetalleOrden
 from app.models.factura import Factura
+from app.models.producto import Producto
+from app.models.datos_envio import DatosEnvio
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query, normalizar_limite
+from app.utils.serializacion import get_bolivia_time
+from app.utils.rechazos_manager import inicializar_rechazos_orden
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import selectinload
+from flask import current_app
+from app.utils.replicas import solo_lectura, usar_primaria
+
+
+def _iso_sql(columna, sufijo=''):
+    """
+    Expresión SQL (PostgreSQL) equivalente a datetime.isoformat(): omite los microsegundos
+    cuando son cero. Con sufijo se desplaza a UTC-4, igual que fecha_bolivia_iso.
+    """
+    if sufijo:
+        columna = f"({columna} - interval '4 hours')"
+    expresion = (
+        f"to_char({columna}, 'YYYY-MM-DD\"T\"HH24:MI:SS') || "
+        f"CASE WHEN date_part('microseconds', {columna})::int % 1000000 <> 0 "
+        f"THEN to_char({columna}, '.US') ELSE '' END"
+    )
+    return f"{expresion} || '{sufijo}'" if sufijo else expresion
+
+
+# Fragmentos json_build_object con las mismas claves que los to_dict de cada modelo
+_JSON_ORDEN_CAMPOS = f"""
+    'cod', o.cod,
+    'total', o.total,
+    'estado', o.estado,
+    'fecha_creacion', {_iso_sql('o.fecha_creacion', '-04:00')},
+    'user_telegram_id', o.user_telegram_id,
+    'detalles_count', o.detalles_count,
+    'tiene_factura', o.tiene_factura,
+    'timezone', 'America/La_Paz'
+"""
+
+_JSON_DETALLES = f"""
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', d.id,
+            'cantidad', d.cantidad,
+            'precio_unitario', d.precio_unitario,
+            'subtotal', d.precio_unitario * d.cantidad,
+            'fecha_agregacion', {_iso_sql('d.fecha_agregacion', '-04:00')},
+            'orden_cod', d.orden_cod,
+            'producto_id', d.producto_id,
+            'timezone', 'America/La_Paz'
+        ) ORDER BY d.id)
+        FROM detalle_orden d
+        WHERE d.orden_cod = o.cod
+    ), '[]'::json)
+"""
+
+_JSON_FACTURA = f"""
+    (
+        SELECT json_build_object(
+            'cod', f.cod,
+            'total', f.total,
+            'estado', f.estado,
+            'fecha_creacion', {_iso_sql('f.fecha_creacion')},
+            'tipo_pago', f.tipo_pago,
+            'orden_cod', f.orden_cod
+        )
+        FROM factura f
+        WHERE f.orden_cod = o.cod
+    )
+"""
+
+# GET /api/orden/<cod>: {'orden': {...}, 'detalles': [...], 'factura': {...} | null}
+_SQL_ORDEN_JSON = text(f"""
+    SELECT json_build_object(
+        'orden', json_build_object({_JSON_ORDEN_CAMPOS}),
+        'detalles', {_JSON_DETALLES},
+        'factura', {_JSON_FACTURA}
+    )::text
+    FROM orden o
+    WHERE o.cod = :cod
+""")
+
+# GET /api/orden/usuario/<id>: {'ordenes': [{... , 'detalles', 'factura'}], 'siguiente_cursor': ...}
+# Se leen limit + 1 filas para saber si hay otra página (igual que paginar_query)
+_SQL_ORDENES_USUARIO_JSON = f"""
+    WITH pagina AS (
+        SELECT o.*, row_number() OVER (ORDER BY o.cod) AS posicion
+        FROM (
+            SELECT *
+            FROM orden
+            WHERE user_telegram_id = :user_telegram_id {{filtro_cursor}}
+            ORDER BY cod
+            LIMIT :limit + 1
+        ) AS o
+    )
+    SELECT json_build_object(
+        'ordenes', COALESCE(
+            json_agg(json_build_object(
+                {_JSON_ORDEN_CAMPOS},
+                'detalles', {_JSON_DETALLES},
+                'factura', {_JSON_FACTURA}
+            ) ORDER BY o.cod) FILTER (WHERE o.posicion <= :limit),
+            '[]'::json
+        ),
+        'siguiente_cursor', CASE WHEN count(*) > :limit
+                                 THEN max(o.cod) FILTER (WHERE o.posicion <= :limit) END
+    )::text
+    FROM pagina AS o
+"""
+_SQL_ORDENES_USUARIO_JSON_INICIO = text(_SQL_ORDENES_USUARIO_JSON.format(filtro_cursor=''))
+_SQL_ORDENES_USUARIO_JSON_DESDE = text(_SQL_ORDENES_USUARIO_JSON.format(filtro_cursor='AND cod > :after'))
+
 
 class OrdenService:
     
@@ -23,6 +135,123 @@ class OrdenService:
             db.session.rollback()
             return None, f"Error al crear orden: {str(e)}"
     
+    @staticmethod
+    def checkout(user_telegram_id, lineas, datos_envio, tipo_pago=None, estado='pendiente'):
+        """
+        Crea en una sola transacción la orden, todos sus detalles, los datos de envío
+        y (si se indica tipo_pago) la factura.
+        
+        Los productos se validan con una única consulta IN y los detalles se insertan en lote;
+        se hace un solo commit, así que ante cualquier error no queda nada a medias.
+        
+        Args:
+            user_telegram_id: ID del usuario de Telegram
+            lineas: Lista de {'producto_id', 'cantidad', 'precio_unitario' (opcional, por defecto el precio del producto)}
+            datos_envio: Diccionario con los campos de DatosEnvio (sin orden_id ni user_telegram_id)
+            tipo_pago: Tipo de pago de la factura (opcional)
+            estado: Estado inicial de la orden
+        
+        Returns:
+            Tupla (orden, detalles, datos_envio, factura, error)
+        """
+        try:
+            if not isinstance(lineas, list) or not lineas:
+                return None, None, None, None, "La orden no tiene detalles"
+            
+            for coordenada in ('latitud', 'longitud'):
+                valor = datos_envio.get(coordenada)
+                if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+                    return None, None, None, None, f"datos_envio.{coordenada} debe ser numérica"
+            
+            for linea in lineas:
+                if not isinstance(linea, dict):
+                    return None, None, None, None, "Cada detalle debe ser un objeto"
+                producto_id = linea.get('producto_id')
+                cantidad = linea.get('cantidad')
+                precio = linea.get('precio_unitario')
+                # bool es subclase de int: true/false del JSON no son ids ni cantidades ni precios
+                if (not isinstance(producto_id, int) or isinstance(producto_id, bool)
+                        or not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad <= 0):
+                    return None, None, None, None, "Cada detalle requiere un producto_id entero y una cantidad entera positiva"
+                if precio is not None and (not isinstance(precio, (int, float))
+                                           or isinstance(precio, bool) or precio < 0):
+                    return None, None, None, None, "El precio_unitario debe ser un número mayor o igual a 0"
+            
+            # Validar todos los productos en una sola consulta
+            ids_productos = {linea['producto_id'] for linea in lineas}
+            productos = {
+                producto.id: producto
+                for producto in Producto.query.filter(Producto.id.in_(ids_productos)).all()
+            }
+            faltantes = sorted(ids_productos - productos.keys())
+            if faltantes:
+                return None, None, None, None, f"Productos no encontrados: {', '.join(map(str, faltantes))}"
+            
+            filas_detalle = [
+                {
+                    'producto_id': linea['producto_id'],
+                    'cantidad': linea['cantidad'],
+                    # Un precio explícito de 0 es válido (promoción): solo se usa el del catálogo si falta
+                    'precio_unitario': (
+                        productos[linea['producto_id']].price
+                        if linea.get('precio_unitario') is None else linea['precio_unitario']
+                    ),
+                    'fecha_agregacion': get_bolivia_time()
+                }
+                for linea in lineas
+            ]
+            
+            # Los contadores se fijan directamente: todas las líneas se conocen de antemano
+            orden = Orden(
+                user_telegram_id=user_telegram_id,
+                estado=estado,
+                total=sum(fila['precio_unitario'] * fila['cantidad'] for fila in filas_detalle),
+                detalles_count=len(filas_detalle),
+                tiene_factura=bool(tipo_pago)
+            )
+            db.session.add(orden)
+            db.session.flush()  # obtener orden.cod
+            
+            # Inserción en lote de todos los detalles (un solo INSERT ... RETURNING)
+            for fila in filas_detalle:
+                fila['orden_cod'] = orden.cod
+            detalles = db.session.scalars(
+                insert(DetalleOrden).returning(DetalleOrden), filas_detalle
+            ).all()
+            
+            envio = DatosEnvio(
+                latitud=datos_envio['latitud'],
+                longitud=datos_envio['longitud'],
+                ciudad=datos_envio['ciudad'],
+                region=datos_envio['region'],
+                codigo_postal=datos_envio['codigo_postal'],
+                nombre_completo=datos_envio['nombre_completo'],
+                telefono=datos_envio['telefono'],
+                comentario=datos_envio.get('comentario'),
+                user_telegram_id=user_telegram_id,
+                orden_id=orden.cod
+            )
+            db.session.add(envio)
+            
+            factura = None
+            if tipo_pago:
+                factura = Factura(
+                    total=orden.total,
+                    tipo_pago=tipo_pago,
+                    orden_cod=orden.cod
+                )
+                db.session.add(factura)
+            
+            db.session.commit()
+            
+            inicializar_rechazos_orden(orden.cod)
+            
+            return orden, detalles, envio, factura, None
+            
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, None, None, None, f"Error al procesar checkout: {str(e)}"
+    
     @staticmethod
     def obtener_orden_por_cod(orden_cod):
         """Obtiene una orden por código"""
@@ -32,28 +261,209 @@ class OrdenService:
             return None
     
     @staticmethod
-    def obtener_ordenes_por_usuario(user_telegram_id):
-        """Obtiene todas las órdenes de un usuario"""
+    def _query_ordenes_completas():
+        """
+        Query base de órdenes con detalles y factura precargados.
+        Usa selectinload: 1 consulta para órdenes + 1 para detalles + 1 para facturas,
+        sin importar cuántas órdenes se devuelvan.
+        """
+        return Orden.query.options(
+            selectinload(Orden.detalles),
+            selectinload(Orden.factura)
+        )
+    
+    @staticmethod
+    def obtener_todas_ordenes(limit=None, after=None):
+        """Obtiene todas las órdenes (paginado por cursor)"""
         try:
-            return Orden.query.filter_by(user_telegram_id=user_telegram_id).all()
+            return paginar_query(OrdenService._query_ordenes_completas(), Orden.cod, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
-    def obtener_todas_ordenes():
-        """Obtiene todas las órdenes"""
+    def serializar_orden_completa(orden):
+        """
+        Convierte una orden a diccionario incluyendo sus detalles y su factura.
+        Espera que la orden venga de _query_ordenes_completas para no disparar lazy loads.
+        """
+        orden_dict = orden.to_dict()
+        orden_dict['detalles'] = [detalle.to_dict() for detalle in orden.detalles]
+        orden_dict['factura'] = orden.factura.to_dict() if orden.factura else None
+        return orden_dict
+    
+    @staticmethod
+    @solo_lectura
+    def obtener_ordenes_completas(user_telegram_id=None, estado=None, limit=None, after=None):
+        """
+        Obtiene órdenes (opcionalmente filtradas por usuario y/o estado) ya serializadas
+        con sus detalles y factura, en un número constante de consultas.
+        
+        Args:
+            user_telegram_id: Filtrar por usuario de Telegram (opcional)
+            estado: Filtrar por estado de la orden (opcional)
+            limit: Tamaño de página (opcional, acotado por configuración)
+            after: Cursor (cod de la última orden de la página anterior)
+        
+        Returns:
+            Tupla (lista de diccionarios de órdenes con 'detalles' y 'factura', siguiente_cursor)
+        """
         try:
-            return Orden.query.all()
+            query = OrdenService._query_ordenes_completas()
+            
+            if user_telegram_id is not None:
+                query = query.filter_by(user_telegram_id=user_telegram_id)
+            if estado is not None:
+                query = query.filter_by(estado=estado)
+            
+            ordenes, siguiente_cursor = paginar_query(query, Orden.cod, limit=limit, after=after)
+            return [OrdenService.serializar_orden_completa(orden) for orden in ordenes], siguiente_cursor
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
-    def obtener_ordenes_por_estado(estado):
-        """Obtiene órdenes por estado"""
+    def _usar_json_sql():
+        """El documento JSON se arma en la base solo en PostgreSQL (y si no se desactivó por config)"""
+        return (
+            current_app.config.get('ORDEN_JSON_SQL', False)
+            and db.session.get_bind().dialect.name == 'postgresql'
+        )
+    
+    @staticmethod
+    @solo_lectura
+    def obtener_orden_json(orden_cod):
+        """
+        Documento JSON de una orden con sus detalles y su factura, listo para la respuesta.
+        
+        En PostgreSQL se arma completo con json_build_object/json_agg en una sola sentencia
+        (sin hidratar objetos ORM); en otros motores se usa el ORM y el proveedor JSON de Flask.
+        
+        Returns:
+            Texto JSON, o None si la orden no existe
+        """
         try:
-            return Orden.query.filter_by(estado=estado).all()
+            if OrdenService._usar_json_sql():
+                return db.session.execute(_SQL_ORDEN_JSON, {'cod': orden_cod}).scalar()
+            
+            documento = OrdenService._orden_documento(orden_cod)
+            return None if documento is None else current_app.json.dumps(documento)
         except SQLAlchemyError:
-            return []
+            return None
+    
+    @staticmethod
+    def _orden_documento(orden_cod):
+        """Documento de GET /api/orden/<cod> armado con el ORM (dict), o None"""
+        orden = OrdenService._query_ordenes_completas().filter(Orden.cod == orden_cod).first()
+        if not orden:
+            return None
+        return {
+            'orden': orden.to_dict(),
+            'detalles': [detalle.to_dict() for detalle in orden.detalles],
+            'factura': orden.factura.to_dict() if orden.factura else None
+        }
+    
+    @staticmethod
+    @usar_primaria
+    def comparar_orden_json(muestra=200):
+        """
+        Compara, para las `muestra` órdenes más recientes, el JSON armado en PostgreSQL
+        (ORDEN_JSON_SQL) con el del ORM, antes de activar la opción en producción.
+        
+        Returns:
+            Tupla (lista de (orden_cod, diferencias), error). Las diferencias son las claves
+            de primer nivel ('orden', 'detalles', 'factura') cuyo contenido no coincide.
+        """
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return [], "La comparación solo tiene sentido en PostgreSQL"
+        try:
+            codigos = [cod for (cod,) in db.session.query(Orden.cod).order_by(Orden.cod.desc()).limit(muestra)]
+            distintas = []
+            for orden_cod in codigos:
+                desde_sql = json.loads(db.session.execute(_SQL_ORDEN_JSON, {'cod': orden_cod}).scalar())
+                # Misma normalización que la respuesta real (fechas, decimales)
+                desde_orm = json.loads(current_app.json.dumps(OrdenService._orden_documento(orden_cod)))
+                diferencias = [clave for clave in ('orden', 'detalles', 'factura')
+                               if desde_sql.get(clave) != desde_orm.get(clave)]
+                if diferencias:
+                    distintas.append((orden_cod, diferencias))
+            return distintas, None
+        except SQLAlchemyError as e:
+            return [], f"Error al comparar el JSON de órdenes: {str(e)}"
+    
+    @staticmethod
+    @usar_primaria
+    def comparar_ordenes_usuario_json(muestra=20, limite_pagina=5, paginas=3):
+        """
+        Compara, para los `muestra` usuarios con más órdenes, las primeras `paginas` páginas
+        de GET /api/orden/usuario/<id> armadas en PostgreSQL (ORDEN_JSON_SQL) con las del ORM:
+        la lista de órdenes, la ventana de limit + 1 filas y el siguiente_cursor. Se sigue el
+        cursor del ORM, así que una diferencia no arrastra a las páginas siguientes.
+        
+        Returns:
+            Tupla (lista de (user_telegram_id, after, diferencias), error). Las diferencias
+            son las claves ('ordenes', 'siguiente_cursor') cuyo contenido no coincide.
+        """
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return [], "La comparación solo tiene sentido en PostgreSQL"
+        try:
+            usuarios = [
+                user_telegram_id for (user_telegram_id,) in db.session.query(Orden.user_telegram_id)
+                .group_by(Orden.user_telegram_id)
+                .order_by(func.count().desc(), Orden.user_telegram_id)
+                .limit(muestra)
+            ]
+            distintas = []
+            for user_telegram_id in usuarios:
+                after = None
+                for _ in range(paginas):
+                    desde_sql = json.loads(OrdenService._ordenes_usuario_sql(user_telegram_id, limite_pagina, after))
+                    ordenes, siguiente_cursor = paginar_query(
+                        OrdenService._query_ordenes_completas().filter_by(user_telegram_id=user_telegram_id),
+                        Orden.cod, limit=limite_pagina, after=after
+                    )
+                    # Misma normalización que la respuesta real (fechas, decimales)
+                    desde_orm = json.loads(current_app.json.dumps({
+                        'ordenes': [OrdenService.serializar_orden_completa(orden) for orden in ordenes],
+                        'siguiente_cursor': siguiente_cursor
+                    }))
+                    diferencias = [clave for clave in ('ordenes', 'siguiente_cursor')
+                                   if desde_sql.get(clave) != desde_orm.get(clave)]
+                    if diferencias:
+                        distintas.append((user_telegram_id, after, diferencias))
+                    if siguiente_cursor is None:
+                        break
+                    after = siguiente_cursor
+            return distintas, None
+        except SQLAlchemyError as e:
+            return [], f"Error al comparar el JSON de órdenes por usuario: {str(e)}"
+    
+    @staticmethod
+    def _ordenes_usuario_sql(user_telegram_id, limit, after=None):
+        """Página de órdenes de un usuario armada en PostgreSQL (texto JSON); limit ya normalizado"""
+        sentencia = _SQL_ORDENES_USUARIO_JSON_INICIO if after is None else _SQL_ORDENES_USUARIO_JSON_DESDE
+        parametros = {'user_telegram_id': user_telegram_id, 'limit': limit}
+        if after is not None:
+            parametros['after'] = after
+        return db.session.execute(sentencia, parametros).scalar()
+    
+    @staticmethod
+    @solo_lectura
+    def obtener_ordenes_usuario_json(user_telegram_id, limit=None, after=None):
+        """
+        Documento JSON {'ordenes': [...], 'siguiente_cursor': ...} con las órdenes de un usuario
+        (paginado por cursor), cada una con sus detalles y su factura.
+        En PostgreSQL se arma en la base en una sola sentencia; en otros motores con el ORM.
+        """
+        if OrdenService._usar_json_sql():
+            try:
+                return OrdenService._ordenes_usuario_sql(user_telegram_id, normalizar_limite(limit), after)
+            except SQLAlchemyError:
+                # Un error de la base no debe verse como "el usuario no tiene órdenes": usar el ORM
+                db.session.rollback()
+        
+        ordenes, siguiente_cursor = OrdenService.obtener_ordenes_completas(
+            user_telegram_id=user_telegram_id, limit=limit, after=after
+        )
+        return current_app.json.dumps({'ordenes': ordenes, 'siguiente_cursor': siguiente_cursor})
     
     @staticmethod
     def agregar_detalle_orden(orden_cod, producto_id, cantidad, precio_unitario):
@@ -81,8 +491,8 @@ class OrdenService:
             
             db.session.add(detalle)
             
-            # Recalcular total de la orden
-            orden.calcular_total()
+            # Actualizar total y conteo de la orden con deltas (O(1), sin recorrer los detalles)
+            Orden.aplicar_delta(orden_cod, delta_total=precio_unitario * cantidad, delta_detalles=1)
             db.session.commit()
             
             return detalle, None
@@ -123,11 +533,11 @@ class OrdenService:
             if not detalle:
                 return None, "Detalle no encontrado"
             
+            delta_total = detalle.precio_unitario * (nueva_cantidad - detalle.cantidad)
             detalle.cantidad = nueva_cantidad
             
-            # Recalcular total de la orden
-            orden = detalle.orden
-            orden.calcular_total()
+            # Ajustar solo la diferencia en el total de la orden
+            Orden.aplicar_delta(detalle.orden_cod, delta_total=delta_total)
             db.session.commit()
             
             return detalle, None
@@ -144,11 +554,12 @@ class OrdenService:
             if not detalle:
                 return False, "Detalle no encontrado"
             
-            orden = detalle.orden
+            orden_cod = detalle.orden_cod
+            subtotal = detalle.subtotal
             db.session.delete(detalle)
             
-            # Recalcular total de la orden
-            orden.calcular_total()
+            # Descontar el detalle del total y del conteo de la orden
+            Orden.aplicar_delta(orden_cod, delta_total=-subtotal, delta_detalles=-1)
             db.session.commit()
             
             return True, None
@@ -192,11 +603,11 @@ class OrdenService:
                 return None, "Orden no encontrada"
             
             # Verificar que la orden no tenga ya una factura
-            if orden.factura:
+            if orden.tiene_factura:
                 return None, "La orden ya tiene una factura asociada"
             
             # Verificar que la orden tenga detalles
-            if not orden.detalles:
+            if orden.detalles_count == 0:
                 return None, "La orden no tiene detalles"
             
             # Crear factura
@@ -207,6 +618,7 @@ class OrdenService:
             )
             
             db.session.add(factura)
+            orden.tiene_factura = True
             db.session.commit()
             
             return factura, None
@@ -215,6 +627,23 @@ class OrdenService:
             db.session.rollback()
             return None, f"Error al crear factura: {str(e)}"
     
+    @staticmethod
+    def reparar_contadores_ordenes():
+        """
+        Recalcula total, detalles_count y tiene_factura de todas las órdenes
+        con una sola sentencia UPDATE (corrige desvíos de los deltas).
+        
+        Returns:
+            Tupla (filas_actualizadas, error)
+        """
+        try:
+            resultado = db.session.execute(Orden.sentencia_reparar_contadores())
+            db.session.commit()
+            return resultado.rowcount, None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return 0, f"Error al reparar contadores de órdenes: {str(e)}"
+    
     @staticmethod
     def procesar_orden_completada(orden_cod, latitud_cliente=None, longitud_cliente=None):
         """Procesa una orden completada y busca delivery cercano"""
@@ -260,7 +689,6 @@ class OrdenService:
         Inicializa el registro de rechazos para esta orden.
         """
         from app.utils.distance_calculator import find_closest_delivery, assign_order_to_closest_delivery
-        from app.utils.rechazos_manager import inicializar_rechazos_orden
         
         try:
             # Primero crear la orden
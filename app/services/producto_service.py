@@ -1,6 +1,10 @@
 from app.models.producto import Producto
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query, normalizar_limite
+from app.utils.cache_catalogo import cache_catalogo
+from flask import current_app
+from app.utils.replicas import usar_primaria
 
 class ProductoService:
     
@@ -17,6 +21,7 @@ class ProductoService:
             
             db.session.add(producto)
             db.session.commit()
+            cache_catalogo.invalidar()
             return producto, None
             
         except SQLAlchemyError as e:
@@ -32,20 +37,48 @@ class ProductoService:
             return None
     
     @staticmethod
-    def obtener_todos_productos():
-        """Obtiene todos los productos activos"""
+    def obtener_todos_productos(limit=None, after=None):
+        """Obtiene todos los productos activos (paginado por cursor)"""
         try:
-            return Producto.query.all()
+            return paginar_query(Producto.query, Producto.id, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
     
     @staticmethod
-    def obtener_productos_por_categoria(categoria):
-        """Obtiene productos por categoría"""
+    def obtener_productos_por_categoria(categoria, limit=None, after=None):
+        """Obtiene productos por categoría (paginado por cursor)"""
         try:
-            return Producto.query.filter_by(category=categoria).all()
+            return paginar_query(Producto.query.filter_by(category=categoria), Producto.id, limit=limit, after=after)
         except SQLAlchemyError:
-            return []
+            return [], None
+    
+    @staticmethod
+    @usar_primaria
+    def _cargar_catalogo():
+        """
+        Lee y serializa todos los productos (solo se usa al reconstruir el caché).
+        Lee de la primaria: lo que se cachea aquí se sirve hasta la próxima invalidación.
+        """
+        return [producto.to_dict() for producto in Producto.query.all()]
+    
+    @staticmethod
+    def obtener_catalogo(categoria=None, limit=None, after=None):
+        """
+        Obtiene una página del catálogo (completo o de una categoría) desde el caché en memoria.
+        
+        Returns:
+            Tupla (productos_serializados, siguiente_cursor, etag). etag es None si falló la carga.
+        """
+        try:
+            return cache_catalogo.obtener_pagina(
+                ProductoService._cargar_catalogo,
+                current_app.config.get('CATALOGO_CACHE_TTL_SEGUNDOS', 300),
+                normalizar_limite(limit),
+                after=after,
+                categoria=categoria
+            )
+        except SQLAlchemyError:
+            return [], None, None
     
     @staticmethod
     def actualizar_producto(producto_id, datos_actualizados):
@@ -62,6 +95,7 @@ class ProductoService:
                     setattr(producto, campo, datos_actualizados[campo])
             
             db.session.commit()
+            cache_catalogo.invalidar()
             return producto, None
             
         except SQLAlchemyError as e:
@@ -78,6 +112,7 @@ class ProductoService:
             
             db.session.delete(producto)
             db.session.commit()
+            cache_catalogo.invalidar()
             return True, None
             
         except SQLAlchemyError as e:
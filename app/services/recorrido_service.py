@@ -0,0 +1,127 @@
+from app.models.posicion_delivery import PosicionDelivery
+from app import db
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from app.utils.replicas import solo_lectura
+
+# Borra cada punto que tenga otro anterior del mismo delivery dentro del mismo intervalo
+# (ventanas de :intervalo segundos desde la época): queda el primero de cada ventana.
+# La subconsulta recorre la clave primaria (delivery_id, fecha).
+_SQL_REDUCIR = {
+    'postgresql': text(
+        'DELETE FROM posicion_delivery AS p '
+        'WHERE p.fecha < :limite AND EXISTS ('
+        ' SELECT 1 FROM posicion_delivery AS q'
+        ' WHERE q.delivery_id = p.delivery_id AND q.fecha < p.fecha'
+        " AND q.fecha >= to_timestamp(floor(extract(epoch FROM p.fecha) / :intervalo) * :intervalo) AT TIME ZONE 'UTC')"
+    ),
+    'sqlite': text(
+        'DELETE FROM posicion_delivery '
+        'WHERE fecha < :limite AND EXISTS ('
+        ' SELECT 1 FROM posicion_delivery AS q'
+        ' WHERE q.delivery_id = posicion_delivery.delivery_id AND q.fecha < posicion_delivery.fecha'
+        " AND q.fecha >= datetime((CAST(strftime('%s', posicion_delivery.fecha) AS INTEGER) / :intervalo) * :intervalo, 'unixepoch'))"
+    ),
+}
+
+class RecorridoService:
+
+    @staticmethod
+    @solo_lectura
+    def obtener_recorrido(delivery_id, desde=None, hasta=None, limit=None, after=None):
+        """
+        Puntos del recorrido de un delivery en una ventana de tiempo, en orden cronológico.
+
+        Args:
+            delivery_id: ID del delivery
+            desde, hasta: Ventana en UTC sin zona (por defecto, las últimas 24 horas)
+            limit: Máximo de puntos (acotado a HISTORIAL_POSICIONES_LIMITE_MAXIMO)
+            after: Fecha del último punto recibido (cursor exclusivo)
+
+        Returns:
+            Tupla (puntos, siguiente_cursor). siguiente_cursor es la fecha del último punto
+            si quedan más, o None.
+        """
+        limite_maximo = current_app.config.get('HISTORIAL_POSICIONES_LIMITE_MAXIMO', 5000)
+        limit = min(limit, limite_maximo) if limit and limit > 0 else limite_maximo
+        if desde is None:
+            desde = (hasta or datetime.utcnow()) - timedelta(hours=24)
+
+        try:
+            query = db.session.query(
+                PosicionDelivery.fecha,
+                PosicionDelivery.latitud,
+                PosicionDelivery.longitud
+            ).filter(
+                PosicionDelivery.delivery_id == delivery_id,
+                PosicionDelivery.fecha >= desde
+            )
+            if hasta is not None:
+                query = query.filter(PosicionDelivery.fecha < hasta)
+            if after is not None:
+                query = query.filter(PosicionDelivery.fecha > after)
+
+            # Un elemento extra para saber si hay otra página
+            filas = query.order_by(PosicionDelivery.fecha).limit(limit + 1).all()
+            siguiente_cursor = None
+            if len(filas) > limit:
+                filas = filas[:limit]
+                siguiente_cursor = filas[-1].fecha
+            return [PosicionDelivery.serializar_fila(fila) for fila in filas], siguiente_cursor
+        except SQLAlchemyError:
+            return [], None
+
+    @staticmethod
+    def reglas_reduccion(texto=None):
+        """
+        Interpreta HISTORIAL_POSICIONES_REDUCCION ('24:60,168:600').
+
+        Returns:
+            Lista de (antigüedad, segundos entre puntos), de la más reciente a la más antigua
+        """
+        if texto is None:
+            texto = current_app.config.get('HISTORIAL_POSICIONES_REDUCCION', '')
+        reglas = []
+        for regla in filter(None, (parte.strip() for parte in texto.split(','))):
+            horas, segundos = regla.split(':')
+            reglas.append((timedelta(hours=float(horas)), int(segundos)))
+        return sorted(reglas)
+
+    @staticmethod
+    def reducir_historial(ahora=None):
+        """
+        Retención del historial: reduce los puntos viejos a uno por intervalo según
+        HISTORIAL_POSICIONES_REDUCCION y borra los que superan HISTORIAL_POSICIONES_RETENCION_DIAS.
+        Pensado para correr periódicamente (flask reducir-historial-posiciones).
+
+        Returns:
+            Tupla (puntos_eliminados, error)
+        """
+        ahora = ahora or datetime.utcnow()
+        try:
+            reglas = RecorridoService.reglas_reduccion()
+        except ValueError:
+            return 0, "HISTORIAL_POSICIONES_REDUCCION no válido (formato 'horas:segundos,...')"
+
+        try:
+            eliminados = 0
+            dias = current_app.config.get('HISTORIAL_POSICIONES_RETENCION_DIAS', 0)
+            if dias:
+                eliminados += PosicionDelivery.query.filter(
+                    PosicionDelivery.fecha < ahora - timedelta(days=dias)
+                ).delete(synchronize_session=False)
+
+            sentencia = _SQL_REDUCIR.get(db.session.get_bind().dialect.name)
+            if sentencia is not None:
+                for antiguedad, intervalo in reglas:
+                    resultado = db.session.execute(sentencia, {'limite': ahora - antiguedad, 'intervalo': intervalo})
+                    eliminados += resultado.rowcount
+
+            db.session.commit()
+            return eliminados, None
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return 0, f"Error al reducir el historial de posiciones: {str(e)}"
@@ -0,0 +1,77 @@
+from app.models.token_revocado import TokenRevocado
+from app import db
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from app.utils.revocacion_tokens import lista_revocacion
+
+class TokenService:
+    
+    @staticmethod
+    def revocar_token(payload):
+        """
+        Revoca un token de refresco concreto (logout).
+
+        Args:
+            payload: Claims del token (get_jwt())
+
+        Returns:
+            Tupla (entrada, error)
+        """
+        try:
+            entrada = db.session.merge(TokenRevocado(
+                clave=f"jti:{payload['jti']}",
+                delivery_id=payload['id'],
+                expira=datetime.utcfromtimestamp(payload['exp']),
+                fecha_revocacion=datetime.utcnow()
+            ))
+            db.session.commit()
+            lista_revocacion.agregar(entrada)
+            return entrada, None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, f"Error al revocar el token: {str(e)}"
+    
+    @staticmethod
+    def revocar_tokens_usuario(delivery_id):
+        """
+        Invalida todos los tokens emitidos hasta ahora para un delivery (cambio de
+        contraseña o baja). Los emitidos en el mismo segundo siguen valiendo: iat tiene
+        resolución de segundos.
+
+        Returns:
+            Tupla (entrada, error)
+        """
+        ahora = datetime.utcnow()
+        try:
+            entrada = db.session.merge(TokenRevocado(
+                clave=f"usuario:{delivery_id}",
+                delivery_id=delivery_id,
+                emitidos_antes=ahora.replace(microsecond=0),
+                expira=ahora + current_app.config['JWT_REFRESH_TOKEN_EXPIRES'],
+                fecha_revocacion=ahora
+            ))
+            db.session.commit()
+            lista_revocacion.agregar(entrada)
+            return entrada, None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, f"Error al revocar los tokens del usuario: {str(e)}"
+    
+    @staticmethod
+    def purgar_vencidos():
+        """
+        Borra las entradas cuyos tokens ya vencieron (flask purgar-tokens-revocados).
+
+        Returns:
+            Tupla (entradas_eliminadas, error)
+        """
+        try:
+            eliminadas = TokenRevocado.query.filter(
+                TokenRevocado.expira <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            return eliminadas, None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return 0, f"Error al purgar tokens revocados: {str(e)}"
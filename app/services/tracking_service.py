@@ -4,9 +4,14 @@ from app.models.user_telgram import UserTelegram
 from app.models.user_delivery import UserDelivery
 from app.models.datos_envio import DatosEnvio
 from app import db
+from sqlalchemy import func, or_, and_
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.indice_espacial import sincronizar_delivery
+from flask import current_app
 import requests
 import os
+from app.utils.replicas import solo_lectura, usar_primaria
+from app.utils.eventos_tracking import id_evento, publicar_evento
 
 class TrackingService:
     
@@ -39,6 +44,10 @@ class TrackingService:
             
             db.session.add(tracking)
             db.session.commit()
+            
+            # El delivery quedó libre: reflejarlo en el índice espacial
+            sincronizar_delivery(user_delivery)
+            TrackingService.publicar_cambio(tracking)
             return tracking, None
             
         except SQLAlchemyError as e:
@@ -83,12 +92,53 @@ class TrackingService:
             # fecha_actualizacion se actualiza automáticamente por onupdate
             
             db.session.commit()
+            TrackingService.publicar_cambio(tracking)
             return tracking, None
             
         except SQLAlchemyError as e:
             db.session.rollback()
             return None, f"Error al actualizar tracking: {str(e)}"
 
+    @staticmethod
+    def evento_tracking(tracking):
+        """(id de evento SSE, JSON del tracking) para un tracking ya confirmado"""
+        version = tracking.fecha_actualizacion or tracking.fecha_creacion
+        return id_evento(version, tracking.id), current_app.json.dumps(tracking.to_dict())
+
+    @staticmethod
+    def publicar_cambio(tracking):
+        """Avisa a los streams abiertos de la orden; un fallo aquí no deshace el cambio"""
+        try:
+            id_del_evento, datos = TrackingService.evento_tracking(tracking)
+            publicar_evento(tracking.orden_cod, id_del_evento, datos)
+        except Exception as e:
+            print(f"Advertencia: No se pudo publicar el evento de tracking: {str(e)}")
+
+    @staticmethod
+    @usar_primaria
+    def obtener_eventos_orden(orden_cod, despues_de, limit=500):
+        """
+        Cambios de tracking de la orden posteriores a un evento ya recibido (para Last-Event-ID).
+
+        Args:
+            orden_cod: Código de la orden
+            despues_de: Tupla (versión, tracking_id) del último evento recibido
+            limit: Máximo de eventos a devolver
+
+        Returns:
+            Lista de (id de evento, JSON del tracking) en orden cronológico
+        """
+        try:
+            fecha, tracking_id = despues_de
+            version = func.coalesce(TrackingOrden.fecha_actualizacion, TrackingOrden.fecha_creacion)
+            trackings = TrackingOrden.query.filter(
+                TrackingOrden.orden_cod == orden_cod,
+                or_(version > fecha, and_(version == fecha, TrackingOrden.id > tracking_id))
+            ).order_by(version, TrackingOrden.id).limit(limit).all()
+            return [TrackingService.evento_tracking(tracking) for tracking in trackings]
+        except SQLAlchemyError:
+            return []
+
     @staticmethod
     def eliminar_tracking(tracking_id):
         """Elimina físicamente un registro de tracking"""
@@ -106,124 +156,174 @@ class TrackingService:
             return False, f"Error al eliminar tracking: {str(e)}"
 
     @staticmethod
-    def obtener_historial_por_delivery(user_delivery_id, limit=None):
+    def _query_historial(desde=None, hasta=None):
+        """
+        Query base del historial: columnas del tracking + datos de envío de la orden
+        en una sola consulta (LEFT OUTER JOIN, sin objetos ORM ni consultas por fila).
+        
+        Si una orden tiene varios datos de envío se toma el primero (menor id), igual
+        que el .first() que se usaba antes.
+        """
+        primer_envio = db.session.query(func.min(DatosEnvio.id)).filter(
+            DatosEnvio.orden_id == TrackingOrden.orden_cod
+        ).correlate(TrackingOrden).scalar_subquery()
+        
+        query = db.session.query(
+            TrackingOrden.id,
+            TrackingOrden.orden_cod,
+            TrackingOrden.user_delivery_id,
+            TrackingOrden.estado,
+            TrackingOrden.latitud,
+            TrackingOrden.longitud,
+            TrackingOrden.comentario,
+            TrackingOrden.fecha_creacion,
+            TrackingOrden.fecha_actualizacion,
+            DatosEnvio.id.label('envio_id'),
+            DatosEnvio.nombre_completo.label('envio_nombre_completo'),
+            DatosEnvio.telefono.label('envio_telefono'),
+            DatosEnvio.comentario.label('envio_comentario')
+        ).outerjoin(
+            DatosEnvio, DatosEnvio.id == primer_envio
+        )
+        
+        if desde is not None:
+            query = query.filter(TrackingOrden.fecha_creacion >= desde)
+        if hasta is not None:
+            query = query.filter(TrackingOrden.fecha_creacion < hasta)
+        
+        return query.order_by(TrackingOrden.fecha_creacion.desc(), TrackingOrden.id.desc())
+    
+    @staticmethod
+    def _serializar_historial(filas):
+        """Convierte las filas del historial al mismo formato que to_dict + 'datos_envio'"""
+        resultado = []
+        for fila in filas:
+            tracking_dict = TrackingOrden.serializar_fila(fila)
+            
+            # Agregar datos de envío si existen
+            if fila.envio_id is not None:
+                tracking_dict['datos_envio'] = {
+                    'nombre_completo': fila.envio_nombre_completo,
+                    'telefono': fila.envio_telefono,
+                    'comentario': fila.envio_comentario
+                }
+            else:
+                tracking_dict['datos_envio'] = None
+            
+            resultado.append(tracking_dict)
+        return resultado
+
+    @staticmethod
+    @solo_lectura
+    def obtener_historial_por_delivery(user_delivery_id, limit=None, desde=None, hasta=None):
         """
         Obtiene el historial de tracking de un delivery específico con datos de envío.
         
         Args:
             user_delivery_id: ID del delivery
             limit: Límite de resultados (opcional)
+            desde: Solo trackings creados desde esta fecha, inclusive (opcional)
+            hasta: Solo trackings creados antes de esta fecha (opcional)
         """
         try:
-            query = TrackingOrden.query.filter_by(
-                user_delivery_id=user_delivery_id
-            ).order_by(
-                TrackingOrden.fecha_creacion.desc()
+            query = TrackingService._query_historial(desde, hasta).filter(
+                TrackingOrden.user_delivery_id == user_delivery_id
             )
             
             if limit:
                 query = query.limit(limit)
             
-            trackings = query.all()
-            
-            # Crear resultado con información adicional de datos de envío
-            resultado = []
-            for tracking in trackings:
-                tracking_dict = tracking.to_dict()
-                
-                # Obtener datos de envío de la orden
-                datos_envio = DatosEnvio.query.filter_by(orden_id=tracking.orden_cod).first()
-                
-                # Agregar datos de envío si existen
-                if datos_envio:
-                    tracking_dict['datos_envio'] = {
-                        'nombre_completo': datos_envio.nombre_completo,
-                        'telefono': datos_envio.telefono,
-                        'comentario': datos_envio.comentario
-                    }
-                else:
-                    tracking_dict['datos_envio'] = None
-                
-                resultado.append(tracking_dict)
-            
-            return resultado
+            return TrackingService._serializar_historial(query.all())
         except SQLAlchemyError:
             return []
 
     @staticmethod
-    def obtener_trackings_por_orden(orden_cod):
-        """Obtiene todos los trackings de una orden específica con datos de envío"""
+    @solo_lectura
+    def obtener_trackings_por_orden(orden_cod, limit=None, desde=None, hasta=None):
+        """Obtiene los trackings de una orden específica con datos de envío (más recientes primero)"""
         try:
-            trackings = TrackingOrden.query.filter_by(
-                orden_cod=orden_cod
-            ).order_by(
-                TrackingOrden.fecha_creacion.desc()
-            ).all()
-            
-            # Obtener datos de envío de la orden
-            datos_envio = DatosEnvio.query.filter_by(orden_id=orden_cod).first()
-            
-            # Crear resultado con información adicional
-            resultado = []
-            for tracking in trackings:
-                tracking_dict = tracking.to_dict()
-                
-                # Agregar datos de envío si existen
-                if datos_envio:
-                    tracking_dict['datos_envio'] = {
-                        'nombre_completo': datos_envio.nombre_completo,
-                        'telefono': datos_envio.telefono,
-                        'comentario': datos_envio.comentario
-                    }
-                else:
-                    tracking_dict['datos_envio'] = None
-                
-                resultado.append(tracking_dict)
+            query = TrackingService._query_historial(desde, hasta).filter(
+                TrackingOrden.orden_cod == orden_cod
+            )
+            
+            if limit:
+                query = query.limit(limit)
             
-            return resultado
+            return TrackingService._serializar_historial(query.all())
         except SQLAlchemyError:
             return []
     
     @staticmethod
-    def enviar_notificacion_telegram(tracking_id, estado):
+    def obtener_destino_notificacion(tracking_id):
+        """
+        Resuelve tracking -> orden -> chat_id de Telegram en una sola consulta.
+        
+        Returns:
+            Tupla (orden_cod, chat_id) o None si falta alguno de los registros
+        """
+        return db.session.query(
+            Orden.cod, UserTelegram.chat_id
+        ).join(
+            TrackingOrden, TrackingOrden.orden_cod == Orden.cod
+        ).join(
+            UserTelegram, UserTelegram.id == Orden.user_telegram_id
+        ).filter(
+            TrackingOrden.id == tracking_id
+        ).first()
+    
+    @staticmethod
+    def encolar_notificacion_telegram(tracking_id, estado):
+        """
+        Encola la notificación de Telegram para enviarla en segundo plano.
+        La ruta puede responder apenas hizo commit, sin esperar a la API de Telegram.
+        
+        Returns:
+            tuple: (success: bool, error: str or None)
+        """
+        from app.utils.telegram_dispatcher import obtener_despachador
+        
+        app = current_app._get_current_object()
+        if not app.config.get('TELEGRAM_ENVIO_ASINCRONO', True):
+            return TrackingService.enviar_notificacion_telegram(tracking_id, estado)
+        
+        if not obtener_despachador(app).encolar(tracking_id, estado):
+            return False, "Cola de notificaciones de Telegram llena"
+        return True, None
+    
+    @staticmethod
+    def enviar_notificacion_telegram(tracking_id, estado, session=None, timeout=None):
         """
         Envía una notificación al usuario de Telegram cuando cambia el estado del tracking.
         
         Args:
             tracking_id: ID del tracking
             estado: Nuevo estado del tracking
+            session: requests.Session a reutilizar (opcional, mantiene conexiones abiertas)
+            timeout: Timeout de la petición HTTP en segundos (por defecto TELEGRAM_TIMEOUT)
         
         Returns:
             tuple: (success: bool, error: str or None)
         """
         try:
-            # Obtener el tracking
-            tracking = TrackingOrden.query.get(tracking_id)
-            if not tracking:
-                return False, "Tracking no encontrado"
-            
-            # Obtener la orden asociada
-            orden = Orden.query.get(tracking.orden_cod)
-            if not orden:
-                return False, "Orden no encontrada"
+            # Obtener orden y chat_id del tracking en una sola consulta
+            destino = TrackingService.obtener_destino_notificacion(tracking_id)
+            if not destino:
+                return False, "Tracking, orden o usuario de Telegram no encontrado"
             
-            # Obtener el usuario de Telegram
-            user_telegram = UserTelegram.query.get(orden.user_telegram_id)
-            if not user_telegram:
-                return False, "Usuario de Telegram no encontrado"
+            orden_cod, chat_id = destino
             
-            # Obtener el token del bot desde las variables de entorno
-            bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
+            # Obtener el token del bot desde la configuración o las variables de entorno
+            bot_token = current_app.config.get('TELEGRAM_BOT_TOKEN') or os.environ.get('TELEGRAM_BOT_TOKEN')
             if not bot_token:
                 return False, "Token del bot de Telegram no configurado en variables de entorno"
             
             # Definir mensajes según el estado
             mensajes = {
-                'asignada': f'🚚 ¡Tu pedido #{orden.cod} ha sido asignado a un delivery!\n\nEstaremos recogiendo tu pedido pronto.',
-                'recogiendo': f'📦 El delivery está recogiendo tu pedido #{orden.cod}\n\n¡Ya casi estamos en camino!',
-                'en_camino': f'🛵 ¡Tu pedido #{orden.cod} está en camino!\n\nLlegará pronto a tu destino.',
-                'entregada': f'✅ ¡Tu pedido #{orden.cod} ha sido entregado!\n\nGracias por tu preferencia. 🎉',
-                'cancelada': f'❌ Tu pedido #{orden.cod} ha sido cancelado.\n\nSi tienes preguntas, contáctanos.'
+                'asignada': f'🚚 ¡Tu pedido #{orden_cod} ha sido asignado a un delivery!\n\nEstaremos recogiendo tu pedido pronto.',
+                'recogiendo': f'📦 El delivery está recogiendo tu pedido #{orden_cod}\n\n¡Ya casi estamos en camino!',
+                'en_camino': f'🛵 ¡Tu pedido #{orden_cod} está en camino!\n\nLlegará pronto a tu destino.',
+                'entregada': f'✅ ¡Tu pedido #{orden_cod} ha sido entregado!\n\nGracias por tu preferencia. 🎉',
+                'cancelada': f'❌ Tu pedido #{orden_cod} ha sido cancelado.\n\nSi tienes preguntas, contáctanos.'
             }
             
             mensaje = mensajes.get(estado, f'Estado actualizado: {estado}')
@@ -231,12 +331,14 @@ class TrackingService:
             # Enviar mensaje a Telegram
             url = f'https://api.telegram.org/bot{bot_token}/sendMessage'
             payload = {
-                'chat_id': user_telegram.chat_id,
+                'chat_id': chat_id,
                 'text': mensaje,
                 'parse_mode': 'HTML'
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            if timeout is None:
+                timeout = current_app.config.get('TELEGRAM_TIMEOUT', 10)
+            response = (session or requests).post(url, json=payload, timeout=timeout)
             
             if response.status_code == 200:
                 return True, None
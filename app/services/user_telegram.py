@@ -1,6 +1,7 @@
 from app.models.user_telgram import UserTelegram
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query
 
 class UserTelegramService:
     
@@ -28,9 +29,9 @@ class UserTelegramService:
             raise e
 
     @staticmethod
-    def get_all_users():
-        """Obtiene todos los usuarios de Telegram"""
-        return UserTelegram.query.all()
+    def get_all_users(limit=None, after=None):
+        """Obtiene todos los usuarios de Telegram (paginado por cursor)"""
+        return paginar_query(UserTelegram.query, UserTelegram.id, limit=limit, after=after)
 
     @staticmethod
     def get_user_by_id(user_id):
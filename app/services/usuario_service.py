@@ -1,6 +1,10 @@
 from app.models.user_delivery import UserDelivery
 from app import db
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.paginacion import paginar_query
+from app.utils.indice_espacial import sincronizar_delivery
+from app.utils.hash_contrasenas import HashSaturado, necesita_rehash
+from app.services.token_service import TokenService
 
 class UsuarioService:
     
@@ -48,18 +52,34 @@ class UsuarioService:
         try:
             usuario = UserDelivery.query.filter_by(username=username, esta_activo=True).first()
             if usuario and usuario.check_password(password):
+                UsuarioService._rehash_si_corresponde(usuario, password)
                 return usuario, None
             return None, "Credenciales inválidas"
         except SQLAlchemyError:
             return None, "Error en la autenticación"
     
     @staticmethod
-    def obtener_todos_los_usuarios():
-        """Obtiene todos los usuarios"""
+    def _rehash_si_corresponde(usuario, password):
+        """
+        Regenera el hash si se guardó con parámetros distintos a HASH_METODO.
+        Es opcional: si el pool está saturado o falla el commit, el login sigue igual.
+        """
         try:
-            return UserDelivery.query.all()
+            if necesita_rehash(usuario.password_hash):
+                usuario.set_password(password)
+                db.session.commit()
+        except HashSaturado:
+            pass
         except SQLAlchemyError:
-            return []
+            db.session.rollback()
+    
+    @staticmethod
+    def obtener_todos_los_usuarios(limit=None, after=None):
+        """Obtiene todos los usuarios (paginado por cursor)"""
+        try:
+            return paginar_query(UserDelivery.query, UserDelivery.id, limit=limit, after=after)
+        except SQLAlchemyError:
+            return [], None
     
     @staticmethod
     def actualizar_usuario(usuario_id, datos_actualizados):
@@ -77,8 +97,14 @@ class UsuarioService:
                 usuario.set_password(datos_actualizados['password'])
             
             db.session.commit()
+            if 'password' in datos_actualizados:
+                UsuarioService._revocar_tokens(usuario.id)
             return usuario, None
             
+        except HashSaturado:
+            # No dejar los otros cambios pendientes en la sesión; la ruta responde 503
+            db.session.rollback()
+            raise
         except SQLAlchemyError as e:
             db.session.rollback()
             return None, f"Error al actualizar usuario: {str(e)}"
@@ -93,11 +119,20 @@ class UsuarioService:
             
             usuario.esta_activo = False
             db.session.commit()
+            sincronizar_delivery(usuario)
+            UsuarioService._revocar_tokens(usuario.id)
             return True, None
             
         except SQLAlchemyError as e:
             db.session.rollback()
             return False, f"Error al eliminar usuario: {str(e)}"
+    
+    @staticmethod
+    def _revocar_tokens(usuario_id):
+        """Invalida los tokens de refresco ya emitidos (el cambio ya se guardó)"""
+        _, error = TokenService.revocar_tokens_usuario(usuario_id)
+        if error:
+            print(f"Advertencia: {error}")
         
     @staticmethod
     def actualizar_ubicacion_delivery(delivery_id, nueva_latitud, nueva_longitud):
@@ -115,7 +150,6 @@ class UsuarioService:
             - delivery_actualizado: El objeto UserDelivery actualizado
             - error: Mensaje de error si ocurre
         """
-        print(nueva_latitud, nueva_longitud)
         try:
             # Obtener el delivery
             delivery = UserDelivery.query.get(delivery_id)
@@ -124,6 +158,7 @@ class UsuarioService:
             
             # Verificar que el delivery esté activo
             if not delivery.esta_activo:
+                sincronizar_delivery(delivery)
                 return delivery.id_orden, delivery, "Delivery inactivo (ubicación actualizada igualmente)"
             
             # Actualizar ubicación
@@ -132,9 +167,72 @@ class UsuarioService:
             
             db.session.commit()
             
+            # Mantener al día el índice espacial usado para asignar órdenes
+            sincronizar_delivery(delivery)
+            UsuarioService._agregar_historial(delivery_id, nueva_latitud, nueva_longitud)
+            
             # Retornar id_orden actual (puede ser None o un número)
             return delivery.id_orden, delivery, None
             
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, None, f"Error en la base de datos: {str(e)}"
+        except Exception as e:
+            return None, None, f"Error al actualizar ubicación: {str(e)}"
+    
+    @staticmethod
+    def _agregar_historial(delivery_id, latitud, longitud):
+        """Encola la posición para el historial de recorridos (se inserta en lote)"""
+        from flask import current_app
+        from app.utils.buffer_ubicaciones import buffer_ubicaciones
+        
+        app = current_app._get_current_object()
+        if not app.config.get('HISTORIAL_POSICIONES_ACTIVO', True):
+            return
+        buffer_ubicaciones.iniciar(app)
+        buffer_ubicaciones.agregar_historial(delivery_id, latitud, longitud)
+    
+    @staticmethod
+    def registrar_ubicacion_diferida(delivery_id, nueva_latitud, nueva_longitud):
+        """
+        Variante de actualizar_ubicacion_delivery con escritura diferida (UBICACION_ESCRITURA_DIFERIDA).
+        Guarda la posición en memoria y la escribe en lote más tarde; el id_orden sale del caché.
+        
+        Returns:
+            Tuple (id_orden_actual, delivery_dict, error)
+        """
+        from flask import current_app
+        from app.utils.buffer_ubicaciones import buffer_ubicaciones
+        from app.utils.indice_espacial import actualizar_posicion_delivery
+        
+        try:
+            app = current_app._get_current_object()
+            buffer_ubicaciones.iniciar(app)
+            
+            perfil = buffer_ubicaciones.obtener_perfil(
+                delivery_id, app.config.get('UBICACION_CACHE_TTL_SEGUNDOS', 5)
+            )
+            if not perfil:
+                return None, None, "Delivery no encontrado"
+            
+            if not perfil['esta_activo']:
+                return perfil['id_orden'], perfil, "Delivery inactivo (ubicación actualizada igualmente)"
+            
+            aceptada = buffer_ubicaciones.registrar(
+                delivery_id, nueva_latitud, nueva_longitud,
+                app.config.get('UBICACION_BANDA_MUERTA_METROS', 10)
+            )
+            
+            if aceptada:
+                perfil['latitud'], perfil['longitud'] = nueva_latitud, nueva_longitud
+                UsuarioService._agregar_historial(delivery_id, nueva_latitud, nueva_longitud)
+                actualizar_posicion_delivery(
+                    delivery_id, nueva_latitud, nueva_longitud,
+                    perfil['esta_activo'], perfil['id_orden']
+                )
+            
+            return perfil['id_orden'], perfil, None
+            
         except SQLAlchemyError as e:
             db.session.rollback()
             return None, None, f"Error en la base de datos: {str(e)}"
@@ -0,0 +1,94 @@
+"""
+Asignación de costo mínimo (método húngaro) entre órdenes y deliveries.
+
+A diferencia de asignar cada orden al delivery más cercano en orden de llegada, resuelve
+todas las órdenes pendientes a la vez minimizando la suma de distancias. Los pares
+prohibidos (p. ej. un delivery que ya rechazó esa orden) se marcan con costo None y
+nunca se devuelven.
+"""
+import math
+from typing import List, Optional, Sequence, Tuple
+
+# Costo usado internamente para los pares prohibidos (mayor que cualquier distancia real)
+_COSTO_PROHIBIDO = 1e12
+
+
+def asignacion_costo_minimo(costos: Sequence[Sequence[Optional[float]]]) -> List[Tuple[int, int]]:
+    """
+    Empareja filas (órdenes) con columnas (deliveries) minimizando el costo total.
+    La matriz puede ser rectangular: se asignan min(filas, columnas) pares como máximo.
+
+    Args:
+        costos: Matriz filas x columnas; None (o inf) marca un par prohibido
+
+    Returns:
+        Lista de pares (fila, columna) asignados, sin pares prohibidos
+    """
+    filas = len(costos)
+    columnas = len(costos[0]) if filas else 0
+    if not filas or not columnas:
+        return []
+
+    def costo(i, j):
+        valor = costos[i][j]
+        if valor is None or math.isinf(valor) or math.isnan(valor):
+            return _COSTO_PROHIBIDO
+        return float(valor)
+
+    # El algoritmo requiere filas <= columnas; si no, se resuelve la traspuesta
+    traspuesta = filas > columnas
+    if traspuesta:
+        filas, columnas = columnas, filas
+        obtener = lambda i, j: costo(j, i)
+    else:
+        obtener = costo
+
+    # Método húngaro con potenciales, O(filas^2 * columnas). Índices desde 1; 0 es auxiliar.
+    u = [0.0] * (filas + 1)
+    v = [0.0] * (columnas + 1)
+    asignada = [0] * (columnas + 1)  # asignada[j] = fila asignada a la columna j
+    camino = [0] * (columnas + 1)
+
+    for i in range(1, filas + 1):
+        asignada[0] = i
+        j0 = 0
+        minimos = [math.inf] * (columnas + 1)
+        usadas = [False] * (columnas + 1)
+        while True:
+            usadas[j0] = True
+            i0 = asignada[j0]
+            delta = math.inf
+            j1 = 0
+            for j in range(1, columnas + 1):
+                if usadas[j]:
+                    continue
+                reducido = obtener(i0 - 1, j - 1) - u[i0] - v[j]
+                if reducido < minimos[j]:
+                    minimos[j] = reducido
+                    camino[j] = j0
+                if minimos[j] < delta:
+                    delta = minimos[j]
+                    j1 = j
+            for j in range(columnas + 1):
+                if usadas[j]:
+                    u[asignada[j]] += delta
+                    v[j] -= delta
+                else:
+                    minimos[j] -= delta
+            j0 = j1
+            if asignada[j0] == 0:
+                break
+        # Recorrer el camino aumentante
+        while j0:
+            j1 = camino[j0]
+            asignada[j0] = asignada[j1]
+            j0 = j1
+
+    pares = []
+    for j in range(1, columnas + 1):
+        i = asignada[j]
+        if i == 0 or obtener(i - 1, j - 1) >= _COSTO_PROHIBIDO:
+            continue
+        pares.append((j - 1, i - 1) if traspuesta else (i - 1, j - 1))
+    pares.sort()
+    return pares
@@ -0,0 +1,247 @@
+"""
+Escritura diferida (write-behind) de las ubicaciones GPS de los deliveries.
+
+En lugar de hacer SELECT + UPDATE + COMMIT por cada ping, se guarda en memoria solo la
+última posición de cada delivery, se descartan los movimientos menores a una banda muerta
+y un hilo escribe todo en lote cada UBICACION_INTERVALO_FLUSH_SEGUNDOS
+(UPDATE ... FROM (VALUES ...) en PostgreSQL). Así las escrituras crecen con la cantidad
+de deliveries y no con la frecuencia de los pings.
+
+Para responder el id_orden actual sin leer la base en cada ping se mantiene un caché del
+perfil de cada delivery que expira a los UBICACION_CACHE_TTL_SEGUNDOS, y se invalida
+cuando este proceso le asigna o libera una orden.
+
+Además acumula el historial de posiciones (tabla posicion_delivery): cada posición aceptada
+se agrega a una cola en memoria y el mismo hilo la inserta en lote, sin un INSERT por ping.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional, Tuple
+from app.utils.distancias import haversine_km
+
+# Filas por sentencia UPDATE en el flush
+TAMANO_LOTE = 500
+
+
+class BufferUbicaciones:
+    """Últimas posiciones pendientes de escribir + caché de perfiles de delivery"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {delivery_id: (latitud, longitud)} pendientes de escribir
+        self._pendientes: Dict[int, Tuple[float, float]] = {}
+        # {delivery_id: (latitud, longitud)} última posición aceptada (para la banda muerta)
+        self._aceptadas: Dict[int, Tuple[float, float]] = {}
+        # {delivery_id: (perfil_dict, cargado_en)}
+        self._perfiles: Dict[int, Tuple[dict, float]] = {}
+        # (delivery_id, fecha_utc, latitud, longitud) pendientes de insertar en el historial;
+        # acotada: si la base no responde se pierden los puntos más viejos, no la memoria
+        self._historial: Deque[Tuple[int, datetime, float, float]] = deque(maxlen=100000)
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self.app = None
+
+    # ---------- caché de perfiles ----------
+
+    def obtener_perfil(self, delivery_id: int, ttl: float) -> Optional[dict]:
+        """Perfil (to_dict) del delivery desde el caché, o desde la base si expiró"""
+        from app.models.user_delivery import UserDelivery
+
+        with self._lock:
+            cacheado = self._perfiles.get(delivery_id)
+        if cacheado and time.monotonic() - cacheado[1] <= ttl:
+            return dict(cacheado[0])
+
+        delivery = UserDelivery.query.get(delivery_id)
+        if not delivery:
+            return None
+
+        perfil = delivery.to_dict()
+        with self._lock:
+            # Una posición aún no escrita es más reciente que la de la base
+            if delivery_id in self._pendientes:
+                perfil['latitud'], perfil['longitud'] = self._pendientes[delivery_id]
+            self._perfiles[delivery_id] = (perfil, time.monotonic())
+        return dict(perfil)
+
+    def invalidar(self, delivery_id: int):
+        """Fuerza a recargar el perfil en el próximo ping (p. ej. tras asignar una orden)"""
+        with self._lock:
+            self._perfiles.pop(delivery_id, None)
+
+    # ---------- ingesta ----------
+
+    def registrar(self, delivery_id: int, latitud: float, longitud: float, banda_muerta_m: float) -> bool:
+        """
+        Registra una posición. Devuelve False si se descartó por estar dentro de la banda muerta.
+        """
+        with self._lock:
+            anterior = self._aceptadas.get(delivery_id)
+            if anterior is not None and haversine_km(anterior[0], anterior[1], latitud, longitud) * 1000 < banda_muerta_m:
+                return False
+
+            self._aceptadas[delivery_id] = (latitud, longitud)
+            self._pendientes[delivery_id] = (latitud, longitud)
+
+            cacheado = self._perfiles.get(delivery_id)
+            if cacheado:
+                cacheado[0]['latitud'], cacheado[0]['longitud'] = latitud, longitud
+            return True
+
+    def agregar_historial(self, delivery_id: int, latitud: float, longitud: float):
+        """Encola una posición para el historial de recorridos"""
+        with self._lock:
+            self._historial.append((delivery_id, datetime.utcnow(), latitud, longitud))
+
+    def posicion_pendiente(self, delivery_id: int) -> Optional[Tuple[float, float]]:
+        """Última posición aceptada que todavía no se escribió en la base"""
+        with self._lock:
+            return self._pendientes.get(delivery_id)
+
+    def pendientes(self) -> Dict[int, Tuple[float, float]]:
+        with self._lock:
+            return dict(self._pendientes)
+
+    # ---------- flush ----------
+
+    def flush(self) -> int:
+        """
+        Escribe en lote todas las posiciones pendientes. Requiere contexto de aplicación.
+
+        Returns:
+            Cantidad de deliveries actualizados
+        """
+        from app import db
+
+        with self._lock:
+            lote = dict(self._pendientes)
+        if not lote:
+            return 0
+
+        filas = [(delivery_id, lat, lon) for delivery_id, (lat, lon) in lote.items()]
+        try:
+            for inicio in range(0, len(filas), TAMANO_LOTE):
+                _actualizar_lote(db, filas[inicio:inicio + TAMANO_LOTE])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Quitar solo lo escrito; si llegó una posición más nueva durante el flush, queda pendiente
+        with self._lock:
+            for delivery_id, posicion in lote.items():
+                if self._pendientes.get(delivery_id) == posicion:
+                    del self._pendientes[delivery_id]
+        return len(filas)
+
+    def flush_historial(self) -> int:
+        """
+        Inserta en lote las posiciones encoladas para el historial. Requiere contexto de aplicación.
+
+        Returns:
+            Cantidad de puntos insertados
+        """
+        from app import db
+
+        with self._lock:
+            puntos = list(self._historial)
+            self._historial.clear()
+        if not puntos:
+            return 0
+
+        try:
+            for inicio in range(0, len(puntos), TAMANO_LOTE):
+                _insertar_historial(db, puntos[inicio:inicio + TAMANO_LOTE])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(puntos)
+
+    def iniciar(self, app):
+        """Arranca (una sola vez) el hilo que hace flush periódico"""
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self.app = app
+            self._hilo = threading.Thread(target=self._ciclo, name='buffer-ubicaciones', daemon=True)
+            self._hilo.start()
+        atexit.register(self._flush_final)
+
+    def _ciclo(self):
+        intervalo = self.app.config.get('UBICACION_INTERVALO_FLUSH_SEGUNDOS', 2)
+        while not self._detener.wait(intervalo):
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Advertencia: Error al escribir ubicaciones en lote: {str(e)}")
+            try:
+                with self.app.app_context():
+                    self.flush_historial()
+            except Exception as e:
+                print(f"Advertencia: Error al escribir el historial de posiciones: {str(e)}")
+
+    def _flush_final(self):
+        self._detener.set()
+        if self.app is not None:
+            try:
+                with self.app.app_context():
+                    self.flush()
+                    self.flush_historial()
+            except Exception:
+                pass
+
+
+def _actualizar_lote(db, filas):
+    """Un UPDATE por lote: UPDATE ... FROM (VALUES ...) en PostgreSQL, executemany en otros motores"""
+    from sqlalchemy import text
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        valores = []
+        parametros = {}
+        for i, (delivery_id, lat, lon) in enumerate(filas):
+            valores.append(f'(:id{i}, :lat{i}, :lon{i})')
+            parametros.update({f'id{i}': delivery_id, f'lat{i}': lat, f'lon{i}': lon})
+        sql = text(
+            'UPDATE user_delivery AS u '
+            'SET latitud = v.lat::numeric, longitud = v.lon::numeric '
+            f'FROM (VALUES {", ".join(valores)}) AS v(id, lat, lon) '
+            'WHERE u.id = v.id'
+        )
+        db.session.execute(sql, parametros)
+    else:
+        db.session.execute(
+            text('UPDATE user_delivery SET latitud = :lat, longitud = :lon WHERE id = :id'),
+            [{'id': delivery_id, 'lat': lat, 'lon': lon} for delivery_id, lat, lon in filas]
+        )
+
+
+def _insertar_historial(db, puntos):
+    """INSERT de varias filas en posicion_delivery, ignorando puntos repetidos (misma clave)"""
+    from app.models.posicion_delivery import PosicionDelivery
+
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        sentencia = insert(PosicionDelivery).on_conflict_do_nothing()
+    elif dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        sentencia = insert(PosicionDelivery).on_conflict_do_nothing()
+    else:
+        from sqlalchemy import insert
+        sentencia = insert(PosicionDelivery)
+
+    db.session.execute(sentencia, [
+        {'delivery_id': delivery_id, 'fecha': fecha, 'latitud': lat, 'longitud': lon}
+        for delivery_id, fecha, lat, lon in puntos
+    ])
+
+
+# Buffer global del proceso
+buffer_ubicaciones = BufferUbicaciones()
@@ -0,0 +1,112 @@
+"""
+Caché en memoria del catálogo de productos.
+El catálogo cambia pocas veces al día pero el bot lo pide constantemente, así que se
+guarda ya serializado (lista completa y por categoría) junto con un hash de su contenido.
+Ese hash sirve para armar ETags fuertes: un If-None-Match que coincide se responde con
+304 sin tocar la base ni volver a serializar.
+
+Las escrituras de ProductoService invalidan el caché; además expira a los
+CATALOGO_CACHE_TTL_SEGUNDOS para recoger cambios hechos por otros workers.
+"""
+import bisect
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class CacheCatalogo:
+    """Catálogo serializado + índice por categoría, reconstruido bajo demanda"""
+
+    # Cargas seguidas que puede descartar una escritura concurrente antes de responder igual
+    # con la última cargada (consistente con su propio hash, aunque no se publique)
+    MAXIMO_INTENTOS_CARGA = 3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        # Última versión publicada: (productos, por_categoria, ids, hash). Los IDs ordenados
+        # de cada lista sirven para ubicar el cursor con búsqueda binaria
+        self._instantanea: Optional[Tuple[List[dict], Dict[str, List[dict]], Dict[Optional[str], List[int]], str]] = None
+        self._vigente = False
+        self._cargado_en = 0.0
+
+    def invalidar(self):
+        """Marca el catálogo como viejo (llamar después de crear/actualizar/eliminar productos)"""
+        with self._lock:
+            self._version += 1
+            self._vigente = False
+
+    @staticmethod
+    def _construir(productos: List[dict]):
+        productos = sorted(productos, key=lambda producto: producto['id'])
+        por_categoria: Dict[str, List[dict]] = {}
+        for producto in productos:
+            por_categoria.setdefault(producto['category'], []).append(producto)
+        ids: Dict[Optional[str], List[int]] = {None: [producto['id'] for producto in productos]}
+        for nombre, lista in por_categoria.items():
+            ids[nombre] = [producto['id'] for producto in lista]
+        contenido = json.dumps(productos, sort_keys=True, default=str).encode('utf-8')
+        return productos, por_categoria, ids, hashlib.sha1(contenido).hexdigest()[:20]
+
+    def _obtener_instantanea(self, cargar: Callable[[], List[dict]], ttl: float):
+        """
+        Devuelve una versión completa del catálogo, recargándola si está vencida o invalidada.
+        Si hubo una escritura mientras se cargaba, ese resultado ya nació viejo: no se publica
+        y se vuelve a cargar.
+        """
+        instantanea = None
+        for _ in range(self.MAXIMO_INTENTOS_CARGA):
+            with self._lock:
+                if self._vigente and time.monotonic() - self._cargado_en <= ttl:
+                    return self._instantanea
+                version = self._version
+
+            instantanea = self._construir(cargar())
+
+            with self._lock:
+                if version == self._version:
+                    self._instantanea = instantanea
+                    self._vigente = True
+                    self._cargado_en = time.monotonic()
+                    return instantanea
+        return instantanea
+
+    def obtener_pagina(self, cargar: Callable[[], List[dict]], ttl: float,
+                       limit: int, after: Optional[int] = None,
+                       categoria: Optional[str] = None) -> Tuple[List[dict], Optional[int], str]:
+        """
+        Devuelve una página del catálogo (o de una categoría) desde memoria.
+
+        Args:
+            cargar: Función que lee y serializa todos los productos desde la base
+            ttl: Segundos de validez del caché
+            limit: Tamaño de página ya normalizado
+            after: Cursor (id del último producto de la página anterior)
+            categoria: Filtrar por categoría (opcional)
+
+        Returns:
+            Tupla (productos, siguiente_cursor, etag)
+        """
+        productos, por_categoria, ids_por_lista, hash_catalogo = self._obtener_instantanea(cargar, ttl)
+        if categoria is not None:
+            productos = por_categoria.get(categoria, [])
+        ids = ids_por_lista.get(categoria, [])
+
+        inicio = 0
+        if after is not None:
+            inicio = bisect.bisect_right(ids, after)
+        pagina = productos[inicio:inicio + limit]
+        siguiente_cursor = pagina[-1]['id'] if len(productos) > inicio + limit else None
+
+        return pagina, siguiente_cursor, self.etag(hash_catalogo, limit, after, categoria)
+
+    @staticmethod
+    def etag(hash_catalogo: str, limit: int, after: Optional[int], categoria: Optional[str]) -> str:
+        parametros = f'{categoria or ""}|{limit}|{"" if after is None else after}'
+        return f'{hash_catalogo}-{hashlib.sha1(parametros.encode("utf-8")).hexdigest()[:8]}'
+
+
+# Caché global del proceso
+cache_catalogo = CacheCatalogo()
@@ -0,0 +1,53 @@
+"""
+Hilo en segundo plano que ejecuta el despacho por lotes (DespachoService.ejecutar_ronda)
+cada DESPACHO_INTERVALO_SEGUNDOS, para que las órdenes que quedaron pendientes sin
+delivery se reintenten solas. Se activa con DESPACHO_LOTE_ACTIVO; también puede correrse
+como proceso aparte con `flask despachar-ordenes --continuo`.
+"""
+import threading
+from typing import Optional
+
+
+class DespachadorLotes:
+    """Hilo daemon que llama periódicamente a la ronda de despacho"""
+
+    def __init__(self, app, intervalo: float = 5):
+        self.app = app
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._hilo = threading.Thread(target=self._ciclo, name='despachador-lotes', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _ciclo(self):
+        from app.services.despacho_service import DespachoService
+
+        while not self._detener.wait(self.intervalo):
+            try:
+                with self.app.app_context():
+                    asignaciones, error = DespachoService.ejecutar_ronda()
+                if error:
+                    print(f"Advertencia: {error}")
+            except Exception as e:
+                print(f"Advertencia: Error en el despachador por lotes: {str(e)}")
+
+
+_despachador: Optional[DespachadorLotes] = None
+_lock = threading.Lock()
+
+
+def iniciar_despachador_lotes(app) -> DespachadorLotes:
+    """Arranca (una sola vez por proceso) el despachador por lotes"""
+    global _despachador
+    with _lock:
+        if _despachador is None:
+            _despachador = DespachadorLotes(app, intervalo=app.config.get('DESPACHO_INTERVALO_SEGUNDOS', 5))
+            _despachador.iniciar()
+    return _despachador
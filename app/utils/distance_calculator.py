@@ -1,28 +1,15 @@
 """
 Utilidades para cálculo de distancias entre coordenadas
-CON gestión de rechazos usando diccionario global.
+CON gestión de rechazos (ver rechazos_manager).
 """
-import math
 from typing import List, Tuple, Optional
 from app.models.user_delivery import UserDelivery
-from app.utils.rechazos_manager import delivery_ha_rechazado
+from app.utils.distancias import haversine_km
+from app.utils.rechazos_manager import obtener_rechazos_orden
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calcula la distancia en kilómetros entre dos puntos geográficos."""
-    R = 6371.0
-    
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
+    return haversine_km(lat1, lon1, lat2, lon2)
 
 
 def find_closest_delivery(
@@ -44,52 +31,65 @@ def find_closest_delivery(
     Returns:
         Tupla (delivery, distancia_en_km) o None si no hay deliveries
     """
-    # Obtener todos los deliveries activos
-    query = UserDelivery.query.filter_by(esta_activo=True)
-    
-    if include_only_available:
-        query = query.filter_by(id_orden=None)
+    from app.utils.indice_espacial import obtener_delivery_mas_cercano
     
-    deliveries = query.all()
+    # Deliveries que ya rechazaron esta orden (si se especificó orden_id)
+    excluidos = obtener_rechazos_orden(orden_id) if orden_id else []
     
-    if not deliveries:
-        return None
-    
-    # Filtrar deliveries que ya rechazaron esta orden (si se especificó orden_id)
-    if orden_id:
-        deliveries_filtrados = []
-        for delivery in deliveries:
-            # EXCLUIR si el delivery ya rechazó esta orden
-            if not delivery_ha_rechazado(orden_id, delivery.id):
-                deliveries_filtrados.append(delivery)
-        
-        # Si después de filtrar no quedan deliveries
-        if not deliveries_filtrados:
-            return None
-        
-        deliveries = deliveries_filtrados
+    # Búsqueda por anillos en el índice espacial en memoria (sin escanear user_delivery)
+    return obtener_delivery_mas_cercano(
+        restaurant_lat, restaurant_lon,
+        excluir=excluidos,
+        solo_disponibles=include_only_available
+    )
+
+
+# Candidatos a probar si otros procesos nos ganan los más cercanos
+MAX_INTENTOS_ASIGNACION = 10
+
+
+def reclamar_delivery(delivery_id: int, orden_cod: int) -> bool:
+    """
+    Asigna la orden al delivery solo si sigue libre, con un único UPDATE condicional:
+    UPDATE user_delivery SET id_orden = :orden WHERE id = :delivery AND id_orden IS NULL AND esta_activo.
     
-    # Calcular distancia de cada delivery al restaurante
-    closest_delivery = None
-    min_distance = float('inf')
+    La condición la evalúa la base con el bloqueo de fila del UPDATE, así que dos peticiones
+    concurrentes nunca se quedan con el mismo delivery, sin bloquear la tabla.
+    El lado de la orden lo cuida el índice único parcial ux_user_delivery_id_orden: si otra
+    petición ya le dio un delivery a la orden, el UPDATE viola el índice y se deshace solo
+    su savepoint, sin perder el resto de la transacción (p. ej. la ronda por lotes).
+    No hace commit.
     
-    for delivery in deliveries:
-        if delivery.latitud is None or delivery.longitud is None:
-            continue
-            
-        distance = haversine_distance(
-            restaurant_lat, restaurant_lon,
-            float(delivery.latitud), float(delivery.longitud)
-        )
-        
-        if distance < min_distance:
-            min_distance = distance
-            closest_delivery = delivery
+    Returns:
+        True si esta transacción reclamó al delivery
+    """
+    from app import db
+    from sqlalchemy import update
+    from sqlalchemy.exc import IntegrityError
     
-    if closest_delivery:
-        return (closest_delivery, min_distance)
+    try:
+        with db.session.begin_nested():
+            resultado = db.session.execute(
+                update(UserDelivery)
+                .where(
+                    UserDelivery.id == delivery_id,
+                    UserDelivery.id_orden.is_(None),
+                    UserDelivery.esta_activo.is_(True)
+                )
+                .values(id_orden=orden_cod)
+                .execution_options(synchronize_session=False)
+            )
+    except IntegrityError:
+        return False
+    return resultado.rowcount == 1
+
+
+def orden_tiene_delivery(orden_cod: int) -> bool:
+    """True si algún delivery ya tiene la orden asignada"""
+    from app import db
+    from sqlalchemy import exists
     
-    return None
+    return db.session.query(exists().where(UserDelivery.id_orden == orden_cod)).scalar()
 
 
 def assign_order_to_closest_delivery(
@@ -99,39 +99,50 @@ def assign_order_to_closest_delivery(
     Asigna una orden al delivery más cercano al restaurante.
     Automáticamente excluye deliveries que ya rechazaron esta orden.
     
+    El delivery se reclama con un UPDATE condicional (ver reclamar_delivery); si otra
+    petición lo tomó primero se prueba con el siguiente más cercano.
+    
     Args:
         orden_cod: Código de la orden a asignar
-        restaurant_lat: Latitud del restaurante
-        restaurant_lon: Longitud del restaurante
     
     Returns:
         Tuple (success, message, delivery_asignado)
     """
     from app import db
+    from app.utils.indice_espacial import obtener_delivery_mas_cercano, sincronizar_delivery
     restaurant_lat = -17.7833073230331
     restaurant_lon = -63.182132346593605
     try:
-        # Buscar el delivery más cercano disponible QUE NO HAYA RECHAZADO ESTA ORDEN
-        result = find_closest_delivery(
-            restaurant_lat, restaurant_lon,
-            orden_id=orden_cod,  # ¡IMPORTANTE! Excluye rechazos
-            include_only_available=True
-        )
+        # Deliveries que ya rechazaron esta orden
+        excluidos = set(obtener_rechazos_orden(orden_cod))
         
-        if not result:
-            return False, "No hay deliveries disponibles para esta orden", None
-        
-        delivery, distance = result
-        
-        # Doble verificación (por si acaso)
-        if delivery.id_orden is not None:
-            return False, f"El delivery {delivery.username} ya tiene una orden asignada", None
-        
-        # Asignar la orden al delivery
-        delivery.id_orden = orden_cod
-        db.session.commit()
+        for _ in range(MAX_INTENTOS_ASIGNACION):
+            result = obtener_delivery_mas_cercano(
+                restaurant_lat, restaurant_lon,
+                excluir=excluidos,
+                solo_disponibles=True
+            )
+            
+            if not result:
+                return False, "No hay deliveries disponibles para esta orden", None
+            
+            delivery, distance = result
+            
+            if reclamar_delivery(delivery.id, orden_cod):
+                db.session.commit()
+                sincronizar_delivery(delivery)
+                return True, f"Orden {orden_cod} asignada a {delivery.username} (distancia: {distance:.2f} km)", delivery
+            
+            # Otra petición asignó la orden mientras tanto (p. ej. la ronda por lotes)
+            if orden_tiene_delivery(orden_cod):
+                return False, f"La orden {orden_cod} ya tiene un delivery asignado", None
+            
+            # Otra petición lo reclamó antes: refrescar su estado en el índice y seguir con el siguiente
+            db.session.expire(delivery)
+            sincronizar_delivery(delivery)
+            excluidos.add(delivery.id)
         
-        return True, f"Orden {orden_cod} asignada a {delivery.username} (distancia: {distance:.2f} km)", delivery
+        return False, "No se pudo asignar la orden: todos los deliveries cercanos fueron tomados", None
         
     except Exception as e:
         db.session.rollback()
@@ -150,16 +161,23 @@ def registrar_rechazo_y_liberar_delivery(orden_id: int, delivery_id: int) -> boo
         True si se procesó correctamente
     """
     from app import db
+    from sqlalchemy import update
     from app.utils.rechazos_manager import registrar_rechazo
+    from app.utils.indice_espacial import sincronizar_delivery
     
     try:
-        # 1. Liberar al delivery (quitarle la orden asignada)
-        delivery = UserDelivery.query.get(delivery_id)
-        if delivery and delivery.id_orden == orden_id:
-            delivery.id_orden = None
+        # 1. Liberar al delivery solo si todavía tiene esta orden (UPDATE condicional)
+        liberado = db.session.execute(
+            update(UserDelivery)
+            .where(UserDelivery.id == delivery_id, UserDelivery.id_orden == orden_id)
+            .values(id_orden=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if liberado:
             db.session.commit()
+            sincronizar_delivery(db.session.get(UserDelivery, delivery_id))
         
-        # 2. Registrar el rechazo en el diccionario global
+        # 2. Registrar el rechazo (memoria o tabla rechazo_orden según configuración)
         registrar_rechazo(orden_id, delivery_id)
         
         return True
@@ -0,0 +1,72 @@
+"""
+Cálculo de distancias geográficas (fórmula haversine) en un solo lugar.
+Usa NumPy para calcular en bloque distancias punto→muchos y matrices
+órdenes × deliveries; si NumPy no está instalado cae a una implementación escalar.
+"""
+import math
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - entorno sin NumPy
+    np = None
+
+# Radio medio de la Tierra en km
+RADIO_TIERRA_KM = 6371.0
+
+# Con pocos puntos el costo fijo de crear arrays supera al del bucle escalar
+UMBRAL_VECTORIZADO = 16
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia en kilómetros entre dos puntos (versión escalar)."""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2 - lon1)
+
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def distancias_desde_punto(latitud: float, longitud: float,
+                           latitudes: Sequence[float], longitudes: Sequence[float]) -> List[float]:
+    """
+    Distancias en km desde un punto a cada uno de los puntos dados.
+
+    Args:
+        latitud, longitud: Punto de origen
+        latitudes, longitudes: Coordenadas de destino (misma longitud)
+
+    Returns:
+        Lista de distancias en el mismo orden que los destinos
+    """
+    if np is None or len(latitudes) < UMBRAL_VECTORIZADO:
+        return [haversine_km(latitud, longitud, float(lat), float(lon))
+                for lat, lon in zip(latitudes, longitudes)]
+
+    return matriz_distancias([latitud], [longitud], latitudes, longitudes)[0].tolist()
+
+
+def matriz_distancias(latitudes_a: Sequence[float], longitudes_a: Sequence[float],
+                      latitudes_b: Sequence[float], longitudes_b: Sequence[float]):
+    """
+    Matriz de distancias en km entre dos conjuntos de puntos (p. ej. órdenes × deliveries)
+    en una sola llamada vectorizada.
+
+    Returns:
+        ndarray de forma (len(a), len(b)) si NumPy está disponible,
+        o lista de listas con la misma forma en caso contrario
+    """
+    if np is None:
+        return [[haversine_km(float(lat_a), float(lon_a), float(lat_b), float(lon_b))
+                 for lat_b, lon_b in zip(latitudes_b, longitudes_b)]
+                for lat_a, lon_a in zip(latitudes_a, longitudes_a)]
+
+    lat_a = np.radians(np.asarray(latitudes_a, dtype=np.float64))[:, None]
+    lon_a = np.radians(np.asarray(longitudes_a, dtype=np.float64))[:, None]
+    lat_b = np.radians(np.asarray(latitudes_b, dtype=np.float64))[None, :]
+    lon_b = np.radians(np.asarray(longitudes_b, dtype=np.float64))[None, :]
+
+    a = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
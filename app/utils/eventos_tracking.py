@@ -0,0 +1,229 @@
+"""
+Eventos en vivo del tracking de órdenes (Server-Sent Events).
+
+Cada vez que TrackingService crea o actualiza un tracking publica un evento para su
+orden; GET /api/tracking/orden/<cod>/stream mantiene una conexión abierta por cliente
+y le reenvía los eventos de esa orden, en lugar de que el cliente vuelva a pedir todo
+el historial cada pocos segundos.
+
+- Dentro del proceso: un bus publicar/suscribir con una cola acotada por conexión.
+- Entre workers (PostgreSQL): cada publicación se envía también con NOTIFY al canal
+  CANAL_NOTIFY y un hilo por proceso hace LISTEN y reenvía a sus suscriptores locales
+  los eventos publicados por otros procesos.
+- Reanudación: el id de cada evento codifica (versión del tracking, id del tracking), así
+  que con Last-Event-ID se pueden leer de la base los cambios que el cliente se perdió.
+"""
+import json
+import os
+import queue
+import select
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+CANAL_NOTIFY = 'tracking_orden'
+
+# NOTIFY admite payloads de hasta ~8000 bytes
+_MAXIMO_PAYLOAD_NOTIFY = 7900
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+# Identifica a este proceso para ignorar sus propios NOTIFY
+_ORIGEN = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+
+def id_evento(version: datetime, tracking_id: int) -> str:
+    """Id SSE de un cambio de tracking: '<microsegundos de la versión>-<tracking_id>'"""
+    return f'{(version.replace(tzinfo=None) - _EPOCA) // _MICROSEGUNDO}-{tracking_id}'
+
+
+def parsear_id_evento(texto: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Inverso de id_evento; None si el texto no es un id válido"""
+    try:
+        micros, tracking_id = texto.strip().split('-')
+        return _EPOCA + int(micros) * _MICROSEGUNDO, int(tracking_id)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def clave_evento(texto: str) -> Tuple[int, int]:
+    """Clave ordenable de un id de evento (para descartar duplicados)"""
+    micros, tracking_id = texto.split('-')
+    return int(micros), int(tracking_id)
+
+
+def formatear_evento(id_del_evento: str, datos: str, nombre: str = 'tracking') -> str:
+    """Mensaje SSE (datos ya serializados como JSON, en una sola línea)"""
+    return f'id: {id_del_evento}\nevent: {nombre}\ndata: {datos}\n\n'
+
+
+class BusTracking:
+    """Publicar/suscribir en memoria por orden, con una cola acotada por suscriptor"""
+
+    def __init__(self, tamano_cola: int = 100):
+        self._lock = threading.Lock()
+        self._suscriptores: Dict[int, Set[queue.Queue]] = {}
+        self._total = 0
+        self.tamano_cola = tamano_cola
+
+    def suscribir(self, orden_cod: int, maximo: Optional[int] = None) -> Optional[queue.Queue]:
+        """
+        Registra una conexión que escucha la orden.
+
+        Returns:
+            La cola de eventos, o None si el proceso ya tiene `maximo` conexiones abiertas
+        """
+        cola: queue.Queue = queue.Queue(maxsize=self.tamano_cola)
+        with self._lock:
+            if maximo is not None and self._total >= maximo:
+                return None
+            self._suscriptores.setdefault(orden_cod, set()).add(cola)
+            self._total += 1
+        return cola
+
+    def desuscribir(self, orden_cod: int, cola: queue.Queue):
+        with self._lock:
+            colas = self._suscriptores.get(orden_cod)
+            if colas is None or cola not in colas:
+                return
+            colas.discard(cola)
+            self._total -= 1
+            if not colas:
+                del self._suscriptores[orden_cod]
+
+    def conexiones(self) -> int:
+        """Cantidad de conexiones abiertas en este proceso"""
+        with self._lock:
+            return self._total
+
+    def publicar(self, orden_cod: int, id_del_evento: str, datos: str) -> int:
+        """
+        Entrega el evento a las conexiones locales de la orden. No bloquea: un cliente
+        demasiado lento pierde eventos (los recupera al reconectar con Last-Event-ID).
+
+        Returns:
+            Cantidad de conexiones que recibieron el evento
+        """
+        with self._lock:
+            colas = list(self._suscriptores.get(orden_cod, ()))
+        entregados = 0
+        for cola in colas:
+            try:
+                cola.put_nowait((id_del_evento, datos))
+                entregados += 1
+            except queue.Full:
+                pass
+        return entregados
+
+
+class PuenteNotify:
+    """Hilo que hace LISTEN en PostgreSQL y reenvía al bus local los eventos de otros procesos"""
+
+    def __init__(self, app, bus: BusTracking):
+        self.app = app
+        self.bus = bus
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._ciclo, name='tracking-listen', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _ciclo(self):
+        from app import db
+
+        with self.app.app_context():
+            engine = db.engine
+        while not self._detener.is_set():
+            try:
+                self._escuchar(engine)
+            except Exception as e:
+                print(f"Advertencia: Se perdió el LISTEN de tracking, reintentando: {str(e)}")
+                self._detener.wait(5)
+
+    def _escuchar(self, engine):
+        # Conexión propia fuera del pool: queda en LISTEN mientras viva el proceso
+        conexion = engine.raw_connection()
+        conexion.detach()
+        try:
+            dbapi = conexion.driver_connection
+            dbapi.autocommit = True
+            cursor = dbapi.cursor()
+            cursor.execute(f'LISTEN {CANAL_NOTIFY}')
+            while not self._detener.is_set():
+                if select.select([dbapi], [], [], 5) == ([], [], []):
+                    continue
+                dbapi.poll()
+                while dbapi.notifies:
+                    self._recibir(dbapi.notifies.pop(0).payload)
+        finally:
+            conexion.close()
+
+    def _recibir(self, payload: str):
+        try:
+            mensaje = json.loads(payload)
+        except ValueError:
+            return
+        if mensaje.get('origen') == _ORIGEN:
+            return
+        self.bus.publicar(mensaje['orden_cod'], mensaje['id'], mensaje['datos'])
+
+
+# Bus global del proceso
+bus_tracking = BusTracking()
+_puente: Optional[PuenteNotify] = None
+_lock_puente = threading.Lock()
+
+
+def _usar_notify(app, engine) -> bool:
+    return app.config.get('TRACKING_STREAM_NOTIFY', True) and engine.dialect.name == 'postgresql'
+
+
+def iniciar_puente(app):
+    """Arranca (una sola vez por proceso) el LISTEN de PostgreSQL, si corresponde"""
+    global _puente
+    from app import db
+
+    if _puente is not None:
+        return
+    with app.app_context():
+        if not _usar_notify(app, db.engine):
+            return
+    with _lock_puente:
+        if _puente is None:
+            _puente = PuenteNotify(app, bus_tracking)
+            _puente.iniciar()
+
+
+def publicar_evento(orden_cod: int, id_del_evento: str, datos: str):
+    """
+    Publica el cambio de un tracking: a las conexiones de este proceso y, en PostgreSQL,
+    a las de los demás workers vía NOTIFY. Llamar después del commit.
+    """
+    from flask import current_app
+    from sqlalchemy import text
+    from app import db
+
+    bus_tracking.publicar(orden_cod, id_del_evento, datos)
+
+    if not _usar_notify(current_app, db.engine):
+        return
+    payload = json.dumps({'origen': _ORIGEN, 'orden_cod': orden_cod, 'id': id_del_evento, 'datos': datos})
+    if len(payload.encode('utf-8')) > _MAXIMO_PAYLOAD_NOTIFY:
+        # Demasiado grande para NOTIFY: los otros workers lo verán al reconectar
+        return
+    # Conexión aparte de la primaria (pg_notify es un SELECT y no debe ir a la réplica)
+    with db.engine.begin() as conexion:
+        conexion.execute(text('SELECT pg_notify(:canal, :payload)'),
+                         {'canal': CANAL_NOTIFY, 'payload': payload})
@@ -0,0 +1,169 @@
+"""
+Hash y verificación de contraseñas en un pool de procesos acotado.
+
+generate_password_hash/check_password_hash son caros a propósito. Si se ejecutan dentro
+del worker retienen el GIL y frenan las demás peticiones, sobre todo en el cambio de
+turno, cuando todos los deliveries inician sesión a la vez. Por eso se ejecutan en
+HASH_POOL_PROCESOS procesos dedicados, con a lo sumo HASH_POOL_COLA_MAXIMA trabajos en
+espera. Si el pool está lleno, se lanza HashSaturado de inmediato (la ruta responde 503)
+en lugar de acumular peticiones.
+
+HASH_METODO define los parámetros actuales (formato de Werkzeug, p. ej.
+'pbkdf2:sha256:600000' o 'scrypt:32768:8:1'). Un hash guardado con otros parámetros se
+regenera en el siguiente login exitoso (necesita_rehash).
+
+Los procesos del pool se crean con forkserver (spawn donde no existe), no con fork: un
+fork copiaría un worker web que ya tiene hilos corriendo (buffer de ubicaciones, recarga
+de revocaciones, envíos a Telegram). Si un proceso del pool muere (OOM, segfault) el
+pool queda roto; se descarta, la petición recibe HashSaturado y la siguiente crea uno nuevo.
+
+Con HASH_POOL_PROCESOS = 0 todo se calcula en el mismo proceso, como antes.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+METODO_POR_DEFECTO = 'pbkdf2:sha256:600000'
+
+
+class HashSaturado(Exception):
+    """El pool de hash tiene la cola llena: reintentar más tarde"""
+
+
+# Funciones de nivel de módulo: son las que se envían a los procesos del pool
+
+def _generar(password: str, metodo: str) -> str:
+    return generate_password_hash(password, method=metodo)
+
+
+def _verificar(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+class PoolHash:
+    """ProcessPoolExecutor con un límite de trabajos en curso + en espera"""
+
+    def __init__(self, procesos: int, cola_maxima: int, timeout: float):
+        self.procesos = procesos
+        self.timeout = timeout
+        self._cupos = threading.BoundedSemaphore(procesos + cola_maxima)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto())
+        return self._executor
+
+    def _descartar_executor(self, executor: ProcessPoolExecutor):
+        """Quita un pool roto; el próximo trabajo crea uno nuevo"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def ejecutar(self, funcion, *args):
+        """
+        Ejecuta funcion(*args) en el pool y espera el resultado.
+
+        Raises:
+            HashSaturado: si ya hay procesos + cola_maxima trabajos pendientes, el
+                resultado no llega en HASH_TIMEOUT_SEGUNDOS o el pool se rompió
+        """
+        if not self._cupos.acquire(blocking=False):
+            raise HashSaturado("Demasiados inicios de sesión simultáneos, intente de nuevo en unos segundos")
+        executor = self._obtener_executor()
+        try:
+            futuro = executor.submit(funcion, *args)
+        except BrokenProcessPool:
+            self._cupos.release()
+            self._descartar_executor(executor)
+            raise HashSaturado("El servicio de contraseñas se está reiniciando, intente de nuevo en unos segundos")
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TiempoAgotado:
+            raise HashSaturado("El cálculo del hash tardó demasiado, intente de nuevo en unos segundos")
+        except BrokenProcessPool:
+            self._descartar_executor(executor)
+            raise HashSaturado("El servicio de contraseñas se está reiniciando, intente de nuevo en unos segundos")
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _contexto():
+    """forkserver si la plataforma lo tiene (Linux, macOS); spawn en los demás casos"""
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(metodo)
+
+
+_pool: Optional[PoolHash] = None
+_lock_pool = threading.Lock()
+
+
+def _obtener_pool() -> Optional[PoolHash]:
+    """Pool del proceso según la configuración, o None para calcular en línea"""
+    global _pool
+    if not has_app_context():
+        return None
+    procesos = current_app.config.get('HASH_POOL_PROCESOS', 0)
+    if procesos <= 0:
+        return None
+    if _pool is None:
+        with _lock_pool:
+            if _pool is None:
+                _pool = PoolHash(
+                    procesos,
+                    current_app.config.get('HASH_POOL_COLA_MAXIMA', 16),
+                    current_app.config.get('HASH_TIMEOUT_SEGUNDOS', 10)
+                )
+    return _pool
+
+
+def metodo_configurado() -> str:
+    if has_app_context():
+        return current_app.config.get('HASH_METODO', METODO_POR_DEFECTO)
+    return METODO_POR_DEFECTO
+
+
+def generar_hash(password: str) -> str:
+    """Hash de la contraseña con HASH_METODO (en el pool si está activo)"""
+    metodo = metodo_configurado()
+    pool = _obtener_pool()
+    if pool is None:
+        return _generar(password, metodo)
+    return pool.ejecutar(_generar, password, metodo)
+
+
+def verificar_contrasena(password_hash: str, password: str) -> bool:
+    """Compara la contraseña con el hash guardado (en el pool si está activo)"""
+    pool = _obtener_pool()
+    if pool is None:
+        return _verificar(password_hash, password)
+    return pool.ejecutar(_verificar, password_hash, password)
+
+
+# {HASH_METODO: prefijo completo del hash, p. ej. 'scrypt' -> 'scrypt:32768:8:1'}
+_prefijos = {}
+
+
+def necesita_rehash(password_hash: str) -> bool:
+    """True si el hash se generó con parámetros distintos a los de HASH_METODO"""
+    metodo = metodo_configurado()
+    prefijo = _prefijos.get(metodo)
+    if prefijo is None:
+        # Werkzeug completa los parámetros por defecto: se genera un hash descartable
+        # (una sola vez por método) para conocer el prefijo exacto
+        prefijo = _prefijos[metodo] = generar_hash('').split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != prefijo
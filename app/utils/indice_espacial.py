@@ -0,0 +1,299 @@
+"""
+Índice espacial en memoria (grilla de celdas lat/lon) de las posiciones de los deliveries.
+Permite responder "los k deliveries más cercanos que no estén excluidos" expandiendo
+anillos de celdas alrededor del punto, sin escanear la tabla user_delivery en cada asignación.
+
+El índice se carga una vez desde la base de datos y luego se mantiene al día desde los
+servicios que cambian ubicación, estado activo u orden asignada de un delivery.
+Como vive en memoria de cada proceso, se recarga completo cada INDICE_ESPACIAL_TTL_SEGUNDOS
+para absorber cambios hechos por otros workers; quien lo consulta debe re-verificar el
+candidato elegido por su clave primaria antes de asignarle una orden.
+"""
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from flask import current_app
+from app.utils.distancias import RADIO_TIERRA_KM, distancias_desde_punto
+from app.utils.replicas import usar_primaria
+
+# Kilómetros por grado de latitud, con la misma esfera que haversine_km (~111.19)
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+
+class IndiceEspacialDeliveries:
+    """Grilla de celdas de tamaño fijo (en grados) con las posiciones de los deliveries."""
+
+    def __init__(self, tamano_celda: float = 0.01):
+        self.tamano_celda = tamano_celda
+        self._lock = threading.RLock()
+        self._celdas: Dict[Tuple[int, int], Set[int]] = {}
+        # {delivery_id: (latitud, longitud, esta_activo, id_orden)}
+        self._deliveries: Dict[int, Tuple[float, float, bool, Optional[int]]] = {}
+        self.cargado_en: Optional[float] = None
+
+    def _celda(self, latitud: float, longitud: float) -> Tuple[int, int]:
+        return (int(math.floor(latitud / self.tamano_celda)),
+                int(math.floor(longitud / self.tamano_celda)))
+
+    def actualizar(self, delivery_id: int, latitud, longitud,
+                   esta_activo: bool = True, id_orden: Optional[int] = None):
+        """
+        Inserta o mueve un delivery en el índice.
+        Si no tiene coordenadas se elimina (no puede participar en la búsqueda).
+        """
+        with self._lock:
+            self.eliminar(delivery_id)
+            if latitud is None or longitud is None:
+                return
+            latitud, longitud = float(latitud), float(longitud)
+            self._deliveries[delivery_id] = (latitud, longitud, bool(esta_activo), id_orden)
+            self._celdas.setdefault(self._celda(latitud, longitud), set()).add(delivery_id)
+
+    def eliminar(self, delivery_id: int):
+        """Quita un delivery del índice (si estaba)"""
+        with self._lock:
+            datos = self._deliveries.pop(delivery_id, None)
+            if datos is None:
+                return
+            celda = self._celda(datos[0], datos[1])
+            ids = self._celdas.get(celda)
+            if ids is not None:
+                ids.discard(delivery_id)
+                if not ids:
+                    del self._celdas[celda]
+
+    def reemplazar(self, filas: Iterable[Tuple[int, float, float, bool, Optional[int]]]):
+        """Reconstruye el índice completo a partir de filas (id, lat, lon, activo, id_orden)"""
+        with self._lock:
+            self._celdas = {}
+            self._deliveries = {}
+            for delivery_id, latitud, longitud, esta_activo, id_orden in filas:
+                self.actualizar(delivery_id, latitud, longitud, esta_activo, id_orden)
+            self.cargado_en = time.monotonic()
+
+    def _es_candidato(self, delivery_id: int, solo_disponibles: bool, excluir: Set[int]) -> bool:
+        _, _, esta_activo, id_orden = self._deliveries[delivery_id]
+        if not esta_activo or delivery_id in excluir:
+            return False
+        if solo_disponibles and id_orden is not None:
+            return False
+        return True
+
+    def _medir(self, latitud: float, longitud: float, ids: List[int]) -> List[Tuple[float, int]]:
+        """Calcula en bloque la distancia desde el punto a cada delivery de la lista"""
+        if not ids:
+            return []
+        latitudes = [self._deliveries[delivery_id][0] for delivery_id in ids]
+        longitudes = [self._deliveries[delivery_id][1] for delivery_id in ids]
+        return list(zip(distancias_desde_punto(latitud, longitud, latitudes, longitudes), ids))
+
+    def _anillo(self, centro: Tuple[int, int], radio: int):
+        """Celdas que están exactamente a 'radio' celdas (Chebyshev) del centro"""
+        fila, columna = centro
+        if radio == 0:
+            yield centro
+            return
+        for dc in range(-radio, radio + 1):
+            yield (fila - radio, columna + dc)
+            yield (fila + radio, columna + dc)
+        for df in range(-radio + 1, radio):
+            yield (fila + df, columna - radio)
+            yield (fila + df, columna + radio)
+
+    def cercanos(self, latitud: float, longitud: float, k: int = 1,
+                 excluir: Optional[Iterable[int]] = None,
+                 solo_disponibles: bool = True) -> List[Tuple[int, float]]:
+        """
+        Obtiene los k deliveries más cercanos a un punto.
+
+        Args:
+            latitud, longitud: Punto de referencia (restaurante o cliente)
+            k: Cantidad máxima de resultados
+            excluir: IDs de deliveries a ignorar (p. ej. los que rechazaron la orden)
+            solo_disponibles: Si True, ignora deliveries con orden asignada
+
+        Returns:
+            Lista [(delivery_id, distancia_km)] ordenada de menor a mayor distancia
+        """
+        excluir = set(excluir or ())
+        latitud, longitud = float(latitud), float(longitud)
+
+        with self._lock:
+            if not self._deliveries:
+                return []
+
+            centro = self._celda(latitud, longitud)
+            # Distancia mínima garantizada por cada anillo recorrido (el lado corto de la celda)
+            km_por_anillo = self.tamano_celda * KM_POR_GRADO * max(math.cos(math.radians(latitud)), 0.01)
+
+            encontrados: List[Tuple[float, int]] = []
+            visitados = 0
+            radio = 0
+
+            while visitados < len(self._deliveries):
+                # Si el anillo tiene más celdas que las ocupadas, es más barato revisar todo
+                if radio > 0 and 8 * radio > len(self._celdas):
+                    ids = [delivery_id for delivery_id in self._deliveries
+                           if self._es_candidato(delivery_id, solo_disponibles, excluir)]
+                    encontrados = self._medir(latitud, longitud, ids)
+                    break
+
+                ids = []
+                for celda in self._anillo(centro, radio):
+                    for delivery_id in self._celdas.get(celda, ()):
+                        visitados += 1
+                        if self._es_candidato(delivery_id, solo_disponibles, excluir):
+                            ids.append(delivery_id)
+                encontrados.extend(self._medir(latitud, longitud, ids))
+
+                # Cualquier punto fuera de los anillos recorridos está a más de radio * km_por_anillo
+                if len(encontrados) >= k:
+                    encontrados.sort()
+                    if encontrados[k - 1][0] <= radio * km_por_anillo:
+                        break
+                radio += 1
+
+            encontrados.sort()
+            return [(delivery_id, distancia) for distancia, delivery_id in encontrados[:k]]
+
+    def posicion(self, delivery_id: int) -> Optional[Tuple[float, float]]:
+        """Posición (lat, lon) registrada en el índice para un delivery"""
+        datos = self._deliveries.get(delivery_id)
+        return datos[:2] if datos else None
+
+    def __len__(self):
+        return len(self._deliveries)
+
+
+# Índice global del proceso
+_indice = IndiceEspacialDeliveries()
+
+
+def obtener_indice() -> IndiceEspacialDeliveries:
+    """
+    Devuelve el índice global, cargándolo (o recargándolo si expiró el TTL) desde la base de datos.
+    Requiere contexto de aplicación.
+    """
+    ttl = current_app.config.get('INDICE_ESPACIAL_TTL_SEGUNDOS', 60)
+    if _indice.cargado_en is None or time.monotonic() - _indice.cargado_en > ttl:
+        recargar_indice()
+    return _indice
+
+
+def recargar_indice():
+    """Reconstruye el índice leyendo solo las columnas necesarias de user_delivery"""
+    from app import db
+    from app.models.user_delivery import UserDelivery
+
+    _indice.tamano_celda = current_app.config.get('INDICE_ESPACIAL_TAMANO_CELDA', _indice.tamano_celda)
+    filas = db.session.query(
+        UserDelivery.id, UserDelivery.latitud, UserDelivery.longitud,
+        UserDelivery.esta_activo, UserDelivery.id_orden
+    ).filter(
+        UserDelivery.esta_activo == True,
+        UserDelivery.latitud.isnot(None),
+        UserDelivery.longitud.isnot(None)
+    ).all()
+    from app.utils.buffer_ubicaciones import buffer_ubicaciones
+
+    # Las posiciones aún no escritas en la base son más recientes que las leídas
+    pendientes = buffer_ubicaciones.pendientes()
+    _indice.reemplazar(
+        (delivery_id, *pendientes.get(delivery_id, (latitud, longitud)), esta_activo, id_orden)
+        for delivery_id, latitud, longitud, esta_activo, id_orden in filas
+    )
+
+
+def posicion_actual(delivery) -> Tuple[Optional[float], Optional[float]]:
+    """Posición más reciente conocida: la pendiente en el buffer de escritura diferida o la de la base"""
+    from app.utils.buffer_ubicaciones import buffer_ubicaciones
+
+    pendiente = buffer_ubicaciones.posicion_pendiente(delivery.id)
+    if pendiente is not None:
+        return pendiente
+    return delivery.latitud, delivery.longitud
+
+
+def sincronizar_delivery(delivery):
+    """
+    Refleja en el índice el estado actual de un UserDelivery
+    (ubicación, activo y orden asignada). Llamar después de cada commit que los cambie.
+    """
+    from app.utils.buffer_ubicaciones import buffer_ubicaciones
+
+    if delivery is None:
+        return
+    latitud, longitud = posicion_actual(delivery)
+    _indice.actualizar(delivery.id, latitud, longitud, delivery.esta_activo, delivery.id_orden)
+    # El perfil cacheado para el endpoint de ubicación puede tener un id_orden viejo
+    buffer_ubicaciones.invalidar(delivery.id)
+
+
+def actualizar_posicion_delivery(delivery_id: int, latitud: float, longitud: float,
+                                 esta_activo: bool, id_orden: Optional[int]):
+    """Mueve un delivery en el índice sin pasar por la base (ingesta con escritura diferida)"""
+    _indice.actualizar(delivery_id, latitud, longitud, esta_activo, id_orden)
+
+
+def buscar_deliveries_cercanos(latitud: float, longitud: float, k: int = 1,
+                               excluir: Optional[Iterable[int]] = None,
+                               solo_disponibles: bool = True) -> List[Tuple[int, float]]:
+    """Atajo para obtener_indice().cercanos(...)"""
+    return obtener_indice().cercanos(latitud, longitud, k=k, excluir=excluir,
+                                     solo_disponibles=solo_disponibles)
+
+
+@usar_primaria
+def obtener_delivery_mas_cercano(latitud: float, longitud: float,
+                                 excluir: Optional[Iterable[int]] = None,
+                                 solo_disponibles: bool = True,
+                                 lote: int = 5):
+    """
+    Busca en el índice el delivery más cercano y lo re-verifica contra la base de datos
+    por clave primaria (estado activo, orden asignada y ubicación). Si el índice estaba
+    desactualizado para ese delivery, lo corrige y sigue con el siguiente candidato.
+
+    Returns:
+        Tupla (UserDelivery, distancia_km) o None si no hay candidatos
+    """
+    from app.models.user_delivery import UserDelivery
+
+    indice = obtener_indice()
+    excluir = set(excluir or ())
+
+    while True:
+        candidatos = indice.cercanos(latitud, longitud, k=lote, excluir=excluir,
+                                     solo_disponibles=solo_disponibles)
+        if not candidatos:
+            return None
+
+        indice_corregido = False
+        for delivery_id, distancia in candidatos:
+            delivery = UserDelivery.query.get(delivery_id)
+            if delivery is None:
+                indice.eliminar(delivery_id)
+                indice_corregido = True
+                continue
+
+            posicion = indice.posicion(delivery_id)
+            latitud_actual, longitud_actual = posicion_actual(delivery)
+            vigente = (
+                delivery.esta_activo
+                and (not solo_disponibles or delivery.id_orden is None)
+                and latitud_actual is not None and longitud_actual is not None
+                and posicion is not None
+                and abs(float(latitud_actual) - posicion[0]) < 1e-6
+                and abs(float(longitud_actual) - posicion[1]) < 1e-6
+            )
+            if vigente:
+                return delivery, distancia
+
+            sincronizar_delivery(delivery)
+            indice_corregido = True
+            # Si solo cambió la ubicación hay que volver a ordenar los candidatos
+            if delivery.esta_activo and (not solo_disponibles or delivery.id_orden is None):
+                break
+
+        if not indice_corregido:
+            return None
@@ -0,0 +1,275 @@
+"""
+Métricas del servicio en formato de texto de Prometheus (GET /api/metrics).
+
+- Latencia de cada petición por blueprint/endpoint/método (histograma) y peticiones por código.
+- Sentencias SQL y tiempo en la base por petición (eventos before/after_cursor_execute).
+- Espera para obtener una conexión del pool y conexiones prestadas en este momento.
+
+Solo se instala si METRICAS_ACTIVAS está encendido: con la opción apagada no se registra
+ningún hook ni listener, así que no cuesta nada. Los valores son por proceso; con varios
+workers, Prometheus debe raspar cada uno.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_SENTENCIAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LIMITES_ESPERA_POOL = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Endpoint usado para el SQL que no ocurre dentro de una petición (hilos en segundo plano, CLI)
+FUERA_DE_PETICION = '(fuera de peticion)'
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence, extra: str = '') -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+class Metrica:
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def encabezado(self) -> List[str]:
+        return [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[tuple, float] = {}
+
+    def incrementar(self, valores: tuple = (), cantidad: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self.encabezado() + [
+            f'{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}' for clave, valor in valores
+        ]
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+        # {etiquetas: [conteos por cubeta (sin acumular) + desbordes, suma, total]}
+        self._series: Dict[tuple, list] = {}
+
+    def observar(self, valores: tuple, valor: float):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self) -> List[str]:
+        with self._lock:
+            series = sorted((clave, (list(conteos), suma, total)) for clave, (conteos, suma, total) in self._series.items())
+        lineas = self.encabezado()
+        for clave, (conteos, suma, total) in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites, conteos):
+                acumulado += conteo
+                cubeta = _etiquetas(self.etiquetas, clave, f'le="{_numero(limite)}"')
+                lineas.append(f'{self.nombre}_bucket{cubeta} {acumulado}')
+            infinito = _etiquetas(self.etiquetas, clave, 'le="+Inf"')
+            lineas.append(f'{self.nombre}_bucket{infinito} {total}')
+            lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}')
+            lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}')
+        return lineas
+
+
+class Medidor(Metrica):
+    """Gauge calculado al momento de exponer: leer(): {etiquetas: valor}"""
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), leer: Optional[Callable[[], Dict[tuple, float]]] = None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.leer = leer or (lambda: {})
+
+    def exponer(self) -> List[str]:
+        try:
+            valores = sorted(self.leer().items())
+        except Exception:
+            valores = []
+        return self.encabezado() + [
+            f'{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}' for clave, valor in valores
+        ]
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: List[Metrica] = []
+
+    def registrar(self, metrica: Metrica) -> Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def exponer(self) -> str:
+        lineas: List[str] = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
+
+
+# Registro global del proceso
+registro = RegistroMetricas()
+
+duracion_peticiones = registro.registrar(Histograma(
+    'http_request_duration_seconds', 'Latencia de las peticiones HTTP.',
+    ('blueprint', 'endpoint', 'method')))
+peticiones = registro.registrar(Contador(
+    'http_requests_total', 'Peticiones HTTP atendidas por código de estado.',
+    ('blueprint', 'endpoint', 'method', 'status')))
+sentencias_por_peticion = registro.registrar(Histograma(
+    'http_request_sql_statements', 'Sentencias SQL ejecutadas por petición.',
+    ('blueprint', 'endpoint'), LIMITES_SENTENCIAS))
+sentencias_sql = registro.registrar(Contador(
+    'sql_statements_total', 'Sentencias SQL ejecutadas.', ('blueprint', 'endpoint')))
+tiempo_sql = registro.registrar(Contador(
+    'sql_duration_seconds_total', 'Tiempo total esperando a la base de datos.', ('blueprint', 'endpoint')))
+espera_pool = registro.registrar(Histograma(
+    'db_pool_checkout_wait_seconds', 'Espera para obtener una conexión del pool.', ('bind',),
+    LIMITES_ESPERA_POOL))
+
+# Engines instrumentados: {nombre del bind: engine}
+_engines: Dict[str, object] = {}
+
+
+def _conexiones_prestadas() -> Dict[tuple, float]:
+    estado = {}
+    for nombre, engine in list(_engines.items()):
+        prestadas = getattr(engine.pool, 'checkedout', None)
+        if prestadas is not None:
+            estado[(nombre,)] = prestadas()
+    return estado
+
+
+conexiones_prestadas = registro.registrar(Medidor(
+    'db_pool_checked_out_connections', 'Conexiones del pool prestadas en este momento.', ('bind',),
+    _conexiones_prestadas))
+
+
+def _endpoint_actual() -> Tuple[str, str]:
+    return request.blueprint or '', request.endpoint or '(sin ruta)'
+
+
+# ---------- peticiones ----------
+
+def _antes_de_peticion():
+    g._metricas_inicio = time.perf_counter()
+    g._metricas_sql = [0, 0.0]
+
+
+def _despues_de_peticion(respuesta):
+    inicio = g.get('_metricas_inicio')
+    if inicio is None:
+        return respuesta
+    blueprint, endpoint = _endpoint_actual()
+    duracion_peticiones.observar((blueprint, endpoint, request.method), time.perf_counter() - inicio)
+    peticiones.incrementar((blueprint, endpoint, request.method, str(respuesta.status_code)))
+    cantidad, _ = g.get('_metricas_sql', (0, 0.0))
+    sentencias_por_peticion.observar((blueprint, endpoint), cantidad)
+    return respuesta
+
+
+# ---------- SQL ----------
+
+def sql_de_peticion() -> Tuple[int, float]:
+    """(sentencias, segundos en la base) de la petición actual"""
+    if not has_request_context():
+        return 0, 0.0
+    cantidad, segundos = g.get('_metricas_sql', (0, 0.0))
+    return cantidad, segundos
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metricas_inicio_sql', []).append(time.perf_counter())
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    pila = conn.info.get('_metricas_inicio_sql')
+    if not pila:
+        return
+    duracion = time.perf_counter() - pila.pop()
+    if has_request_context():
+        acumulado = g.get('_metricas_sql')
+        if acumulado is not None:
+            acumulado[0] += 1
+            acumulado[1] += duracion
+        etiquetas = _endpoint_actual()
+    else:
+        etiquetas = ('', FUERA_DE_PETICION)
+    sentencias_sql.incrementar(etiquetas)
+    tiempo_sql.incrementar(etiquetas, duracion)
+
+
+def _error_de_sentencia(contexto_excepcion):
+    # Una sentencia que falla no pasa por after_cursor_execute: descartar su inicio
+    conexion = contexto_excepcion.connection
+    if conexion is not None:
+        pila = conexion.info.get('_metricas_inicio_sql')
+        if pila:
+            pila.pop()
+
+
+# ---------- pool ----------
+
+def _medir_pool(nombre_bind: str, pool):
+    """Envuelve la obtención de conexiones del pool para medir cuánto espera cada checkout"""
+    obtener = pool._do_get
+
+    def obtener_medido():
+        inicio = time.perf_counter()
+        try:
+            return obtener()
+        finally:
+            espera_pool.observar((nombre_bind,), time.perf_counter() - inicio)
+
+    pool._do_get = obtener_medido
+
+
+def instalar_metricas(app, db):
+    """Registra los hooks de petición y los listeners de SQLAlchemy en los engines de la app"""
+    app.before_request(_antes_de_peticion)
+    app.after_request(_despues_de_peticion)
+
+    with app.app_context():
+        engines = {nombre or 'default': engine for nombre, engine in db.engines.items()}
+
+    for nombre, engine in engines.items():
+        if _engines.get(nombre) is engine:
+            continue
+        event.listen(engine, 'before_cursor_execute', _antes_de_sentencia)
+        event.listen(engine, 'after_cursor_execute', _despues_de_sentencia)
+        event.listen(engine, 'handle_error', _error_de_sentencia)
+        _medir_pool(nombre, engine.pool)
+        _engines[nombre] = engine
@@ -0,0 +1,45 @@
+"""
+Modo cooperativo (gevent): cada petición corre en un greenlet en lugar de ocupar un hilo
+del sistema operativo.
+
+Las rutas de tracking, orden y user_telegram pasan casi todo su tiempo esperando a
+PostgreSQL o a la red (y el stream SSE del tracking, minutos enteros). Con monkey patching
+de gevent esas esperas ceden el control: sockets, select, time.sleep, queue y threading
+se vuelven cooperativos, y psycopg2 espera con gevent gracias a psycogreen. Un proceso
+atiende así cientos de peticiones lentas a la vez sin reescribir rutas ni servicios.
+
+Se activa con SERVIDOR_COOPERATIVO=true (python run.py) o con `gunicorn -k gevent`.
+El parche de gevent debe aplicarse antes de importar la app: lo hace run.py.
+"""
+import sys
+
+# Greenlets atendidos a la vez por el servidor de run.py
+CONEXIONES_MAXIMAS_POR_DEFECTO = 1000
+
+
+def gevent_activo() -> bool:
+    """True si el proceso ya fue parcheado por gevent (run.py o worker gevent de gunicorn)"""
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
+
+def parchear_psycopg():
+    """Hace que psycopg2 espere a PostgreSQL cediendo el control a otros greenlets"""
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        print("Advertencia: psycogreen no está instalado; las consultas a PostgreSQL bloquean el proceso en modo cooperativo")
+        return
+    patch_psycopg()
+
+
+def servir(app, host: str = '0.0.0.0', port: int = 5000, conexiones_maximas: int = CONEXIONES_MAXIMAS_POR_DEFECTO):
+    """Sirve la app con el servidor WSGI de gevent, con un greenlet por conexión"""
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    servidor = WSGIServer((host, port), app, spawn=Pool(conexiones_maximas))
+    print(f"Servidor cooperativo (gevent) en http://{host}:{port} (hasta {conexiones_maximas} conexiones)")
+    servidor.serve_forever()
@@ -0,0 +1,92 @@
+"""
+Utilidades de paginación por cursor (keyset).
+En lugar de OFFSET se filtra por la clave primaria (WHERE pk > :after ORDER BY pk LIMIT :limit),
+así cada página cuesta lo mismo sin importar el tamaño de la tabla.
+"""
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from flask import current_app, request
+
+
+def obtener_parametros_paginacion() -> Tuple[Optional[int], Optional[int]]:
+    """
+    Lee los parámetros de paginación de la petición actual.
+    
+    Returns:
+        Tupla (limit, after) tomada de ?limit=...&after=... (None si no vienen)
+    """
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after', type=int)
+    return limit, after
+
+
+def obtener_ventana_fechas() -> Tuple[Optional[datetime], Optional[datetime], Optional[str]]:
+    """
+    Lee la ventana de fechas ?desde=...&hasta=... (ISO 8601) de la petición actual.
+    Las fechas con zona horaria se pasan a UTC sin zona, que es como se comparan
+    con las columnas DateTime; las fechas sin zona se toman tal cual.
+    
+    Returns:
+        Tupla (desde, hasta, error). error es un mensaje si algún parámetro es inválido.
+    """
+    fechas = []
+    for nombre in ('desde', 'hasta'):
+        valor = request.args.get(nombre)
+        if not valor:
+            fechas.append(None)
+            continue
+        try:
+            fecha = datetime.fromisoformat(valor)
+        except ValueError:
+            return None, None, f"El parámetro {nombre} debe ser una fecha ISO 8601"
+        if fecha.tzinfo is not None:
+            fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+        fechas.append(fecha)
+    return fechas[0], fechas[1], None
+
+
+def normalizar_limite(limit: Optional[int]) -> int:
+    """
+    Acota el tamaño de página a los valores configurados.
+    
+    Args:
+        limit: Límite solicitado por el cliente (puede ser None)
+    
+    Returns:
+        Límite efectivo entre 1 y PAGINACION_LIMITE_MAXIMO
+    """
+    limite_defecto = current_app.config.get('PAGINACION_LIMITE_DEFECTO', 50)
+    limite_maximo = current_app.config.get('PAGINACION_LIMITE_MAXIMO', 200)
+    
+    if not limit or limit <= 0:
+        return limite_defecto
+    return min(limit, limite_maximo)
+
+
+def paginar_query(query, columna_cursor, limit: Optional[int] = None, after: Optional[int] = None):
+    """
+    Aplica paginación keyset a una query de SQLAlchemy.
+    
+    Args:
+        query: Query base (ya filtrada)
+        columna_cursor: Columna única y ordenable usada como cursor (normalmente la PK)
+        limit: Cantidad máxima de elementos por página
+        after: Último valor de cursor recibido por el cliente (exclusivo)
+    
+    Returns:
+        Tupla (items, siguiente_cursor). siguiente_cursor es None en la última página.
+    """
+    limit = normalizar_limite(limit)
+    
+    if after is not None:
+        query = query.filter(columna_cursor > after)
+    
+    # Pedimos un elemento extra para saber si hay otra página sin hacer COUNT(*)
+    items = query.order_by(columna_cursor.asc()).limit(limit + 1).all()
+    
+    siguiente_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        siguiente_cursor = getattr(items[-1], columna_cursor.key)
+    
+    return items, siguiente_cursor
@@ -0,0 +1,123 @@
+"""
+Presupuesto de sentencias SQL por petición, para detectar regresiones N+1.
+
+Cada ruta declara cuántas sentencias puede ejecutar con @presupuesto_sql(n); las que no
+declaran nada heredan el presupuesto de su blueprint (presupuesto_blueprint) o, si no,
+PRESUPUESTO_SQL_DEFECTO. Un listener before_cursor_execute cuenta las sentencias de la
+petición actual y, según PRESUPUESTO_SQL_MODO:
+
+- 'off': no se instala nada (producción).
+- 'log': al terminar la petición se imprime el exceso, con las sentencias repetidas y la
+  pila de las que pasaron el límite.
+- 'error': la primera sentencia que pasa el límite lanza PresupuestoSQLExcedido, así la
+  petición falla en los tests.
+"""
+import traceback
+from collections import Counter
+from typing import Dict, Optional
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Pilas guardadas como máximo por petición (las primeras sentencias fuera del presupuesto)
+MAXIMO_PILAS = 5
+
+_SIN_LIMITE = object()
+_presupuestos_blueprint: Dict[str, Optional[int]] = {}
+
+
+class PresupuestoSQLExcedido(Exception):
+    """La petición ejecutó más sentencias SQL que las permitidas para su ruta"""
+
+
+def presupuesto_sql(maximo: Optional[int]):
+    """
+    Declara el máximo de sentencias SQL de una vista (None = sin límite).
+
+    Ejemplo:
+        @orden_bp.route('/', methods=['GET'])
+        @presupuesto_sql(3)
+        def obtener_todas_ordenes(): ...
+    """
+    def decorador(vista):
+        vista.presupuesto_sql = _SIN_LIMITE if maximo is None else maximo
+        return vista
+    return decorador
+
+
+def presupuesto_blueprint(blueprint, maximo: Optional[int]):
+    """Presupuesto por defecto de todas las rutas de un blueprint"""
+    _presupuestos_blueprint[blueprint.name] = maximo
+
+
+def _presupuesto_actual() -> Optional[int]:
+    vista = current_app.view_functions.get(request.endpoint)
+    declarado = getattr(vista, 'presupuesto_sql', None)
+    if declarado is _SIN_LIMITE:
+        return None
+    if declarado is not None:
+        return declarado
+    if request.blueprint in _presupuestos_blueprint:
+        return _presupuestos_blueprint[request.blueprint]
+    return current_app.config.get('PRESUPUESTO_SQL_DEFECTO')
+
+
+def _antes_de_peticion():
+    g._presupuesto_sql = {
+        'maximo': _presupuesto_actual() if request.endpoint else None,
+        'sentencias': [],
+        'pilas': [],
+    }
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    estado = g.get('_presupuesto_sql')
+    if estado is None:
+        return
+    estado['sentencias'].append(statement)
+    maximo = estado['maximo']
+    if maximo is None or len(estado['sentencias']) <= maximo:
+        return
+
+    if current_app.config.get('PRESUPUESTO_SQL_MODO') == 'error':
+        raise PresupuestoSQLExcedido(
+            f"{request.method} {request.path} ({request.endpoint}) superó su presupuesto de "
+            f"{maximo} sentencias SQL. Sentencia {len(estado['sentencias'])}: {statement}"
+        )
+    if len(estado['pilas']) < MAXIMO_PILAS:
+        # Sin los marcos del propio listener ni de SQLAlchemy
+        pila = [marco for marco in traceback.extract_stack()[:-1] if '/sqlalchemy/' not in marco.filename]
+        estado['pilas'].append((statement, ''.join(traceback.format_list(pila[-8:]))))
+
+
+def _despues_de_peticion(respuesta):
+    estado = g.get('_presupuesto_sql')
+    if not estado or estado['maximo'] is None or len(estado['sentencias']) <= estado['maximo']:
+        return respuesta
+    if current_app.config.get('PRESUPUESTO_SQL_MODO') == 'error':
+        # Ya falló con PresupuestoSQLExcedido
+        return respuesta
+
+    repetidas = [
+        f"  {veces}x {sentencia}" for sentencia, veces in Counter(estado['sentencias']).most_common(5) if veces > 1
+    ]
+    pilas = [f"  -- {sentencia}\n{pila}" for sentencia, pila in estado['pilas']]
+    print(
+        f"Advertencia: {request.method} {request.path} ({request.endpoint}) ejecutó "
+        f"{len(estado['sentencias'])} sentencias SQL (presupuesto {estado['maximo']})\n"
+        + ('Sentencias repetidas (posible N+1):\n' + '\n'.join(repetidas) + '\n' if repetidas else '')
+        + 'Primeras sentencias fuera del presupuesto:\n' + '\n'.join(pilas)
+    )
+    return respuesta
+
+
+def instalar_presupuesto_sql(app, db):
+    """Registra los hooks de petición y el listener de SQLAlchemy en los engines de la app"""
+    app.before_request(_antes_de_peticion)
+    app.after_request(_despues_de_peticion)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if not event.contains(engine, 'before_cursor_execute', _antes_de_sentencia):
+            event.listen(engine, 'before_cursor_execute', _antes_de_sentencia)
@@ -1,94 +1,224 @@
 """
-Gestor simple de rechazos usando un diccionario global.
-{orden_id: [lista_de_delivery_ids_que_rechazaron]}
+Gestor de rechazos de órdenes por parte de los deliveries.
+{orden_id: {delivery_ids_que_rechazaron}}
+
+El almacenamiento es intercambiable según RECHAZOS_BACKEND:
+- 'memoria': diccionario de conjuntos en el proceso (rápido, pero cada worker tiene el suyo)
+- 'db': tabla rechazo_orden con clave (orden_id, delivery_id), compartida entre workers
+  y persistente entre reinicios
+
+En ambos casos los rechazos expiran después de RECHAZOS_TTL_SEGUNDOS.
 """
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Set
+from flask import current_app, has_app_context
+from sqlalchemy import or_
+from app.models.rechazo_orden import RechazoOrden
+
+TTL_POR_DEFECTO = 6 * 60 * 60  # 6 horas
+
+
+class AlmacenRechazosMemoria:
+    """Rechazos en un diccionario del proceso: {orden_id: {delivery_id: fecha_rechazo}}"""
+
+    def __init__(self):
+        self._rechazos: Dict[int, Dict[int, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def _vigentes(self, orden_id: int, limite: datetime) -> Dict[int, datetime]:
+        rechazos = self._rechazos.get(orden_id, {})
+        expirados = [delivery_id for delivery_id, fecha in rechazos.items() if fecha < limite]
+        for delivery_id in expirados:
+            del rechazos[delivery_id]
+        return rechazos
+
+    def inicializar(self, orden_id: int):
+        with self._lock:
+            self._rechazos[orden_id] = {}
+
+    def registrar(self, orden_id: int, delivery_id: int):
+        with self._lock:
+            self._rechazos.setdefault(orden_id, {})[delivery_id] = datetime.utcnow()
+
+    def obtener(self, orden_id: int, limite: datetime) -> Set[int]:
+        with self._lock:
+            return set(self._vigentes(orden_id, limite))
+
+    def ha_rechazado(self, orden_id: int, delivery_id: int, limite: datetime) -> bool:
+        with self._lock:
+            fecha = self._rechazos.get(orden_id, {}).get(delivery_id)
+            return fecha is not None and fecha >= limite
+
+    def limpiar_orden(self, orden_id: int):
+        with self._lock:
+            self._rechazos.pop(orden_id, None)
+
+    def todos(self, limite: datetime) -> Dict[int, Set[int]]:
+        with self._lock:
+            return {orden_id: set(self._vigentes(orden_id, limite)) for orden_id in list(self._rechazos)}
+
+    def limpiar_antiguos(self, ordenes_activas: Set[int], limite: datetime):
+        with self._lock:
+            for orden_id in list(self._rechazos):
+                if orden_id not in ordenes_activas or not self._vigentes(orden_id, limite):
+                    del self._rechazos[orden_id]
+
+
+class AlmacenRechazosDB:
+    """Rechazos en la tabla rechazo_orden, compartidos por todos los workers"""
+
+    def inicializar(self, orden_id: int):
+        # Una orden nueva no tiene filas; las de órdenes borradas caen por ON DELETE CASCADE
+        pass
+
+    def registrar(self, orden_id: int, delivery_id: int):
+        from app import db
+        try:
+            rechazo = db.session.get(RechazoOrden, (orden_id, delivery_id))
+            if rechazo:
+                rechazo.fecha_rechazo = datetime.utcnow()
+            else:
+                db.session.add(RechazoOrden(orden_id=orden_id, delivery_id=delivery_id))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def obtener(self, orden_id: int, limite: datetime) -> Set[int]:
+        from app import db
+        filas = db.session.query(RechazoOrden.delivery_id).filter(
+            RechazoOrden.orden_id == orden_id,
+            RechazoOrden.fecha_rechazo >= limite
+        ).all()
+        return {delivery_id for (delivery_id,) in filas}
+
+    def ha_rechazado(self, orden_id: int, delivery_id: int, limite: datetime) -> bool:
+        rechazo = RechazoOrden.query.filter(
+            RechazoOrden.orden_id == orden_id,
+            RechazoOrden.delivery_id == delivery_id,
+            RechazoOrden.fecha_rechazo >= limite
+        ).first()
+        return rechazo is not None
+
+    def limpiar_orden(self, orden_id: int):
+        from app import db
+        RechazoOrden.query.filter_by(orden_id=orden_id).delete(synchronize_session=False)
+        db.session.commit()
+
+    def todos(self, limite: datetime) -> Dict[int, Set[int]]:
+        from app import db
+        resultado: Dict[int, Set[int]] = {}
+        filas = db.session.query(RechazoOrden.orden_id, RechazoOrden.delivery_id).filter(
+            RechazoOrden.fecha_rechazo >= limite
+        ).all()
+        for orden_id, delivery_id in filas:
+            resultado.setdefault(orden_id, set()).add(delivery_id)
+        return resultado
+
+    def limpiar_antiguos(self, ordenes_activas: Set[int], limite: datetime):
+        from app import db
+        query = RechazoOrden.query
+        if ordenes_activas:
+            query = query.filter(or_(
+                RechazoOrden.fecha_rechazo < limite,
+                RechazoOrden.orden_id.notin_(ordenes_activas)
+            ))
+        query.delete(synchronize_session=False)
+        db.session.commit()
+
+
+_almacen_memoria = AlmacenRechazosMemoria()
+_almacen_db = AlmacenRechazosDB()
+
+
+def _almacen():
+    """Devuelve el almacén configurado en RECHAZOS_BACKEND (memoria por defecto)"""
+    if has_app_context() and current_app.config.get('RECHAZOS_BACKEND', 'memoria') == 'db':
+        return _almacen_db
+    return _almacen_memoria
+
+
+def _limite_vigencia() -> datetime:
+    """Fecha a partir de la cual un rechazo sigue vigente"""
+    ttl = TTL_POR_DEFECTO
+    if has_app_context():
+        ttl = current_app.config.get('RECHAZOS_TTL_SEGUNDOS', TTL_POR_DEFECTO)
+    return datetime.utcnow() - timedelta(seconds=ttl)
 
-# Diccionario global para almacenar rechazos
-_rechazos_global = {}  # Formato: {orden_id: [delivery_id1, delivery_id2, ...]}
 
 def inicializar_rechazos_orden(orden_id: int):
     """
-    Inicializa una entrada para una nueva orden en el diccionario de rechazos.
+    Inicializa una entrada para una nueva orden en el registro de rechazos.
     Debe llamarse cuando se crea una nueva orden.
-    
+
     Args:
         orden_id: ID de la orden
     """
-    _rechazos_global[orden_id] = []
+    _almacen().inicializar(orden_id)
 
 def registrar_rechazo(orden_id: int, delivery_id: int):
     """
     Registra que un delivery ha rechazado una orden.
-    
+
     Args:
         orden_id: ID de la orden rechazada
         delivery_id: ID del delivery que rechazó
     """
-    if orden_id in _rechazos_global:
-        if delivery_id not in _rechazos_global[orden_id]:
-            _rechazos_global[orden_id].append(delivery_id)
-    else:
-        # Si la orden no estaba inicializada, la inicializamos
-        _rechazos_global[orden_id] = [delivery_id]
+    _almacen().registrar(orden_id, delivery_id)
 
 def obtener_rechazos_orden(orden_id: int) -> list:
     """
     Obtiene la lista de deliveries que han rechazado una orden.
-    
+
     Args:
         orden_id: ID de la orden
-    
+
     Returns:
         Lista de delivery IDs que rechazaron la orden
     """
-    return _rechazos_global.get(orden_id, []).copy()
+    return list(_almacen().obtener(orden_id, _limite_vigencia()))
 
 def delivery_ha_rechazado(orden_id: int, delivery_id: int) -> bool:
     """
     Verifica si un delivery específico ha rechazado una orden.
-    
+
     Args:
         orden_id: ID de la orden
         delivery_id: ID del delivery
-    
+
     Returns:
         True si el delivery ya rechazó esta orden
     """
-    if orden_id not in _rechazos_global:
-        return False
-    return delivery_id in _rechazos_global[orden_id]
+    return _almacen().ha_rechazado(orden_id, delivery_id, _limite_vigencia())
 
 def limpiar_rechazos_orden(orden_id: int):
     """
     Elimina los registros de rechazos para una orden.
     Útil cuando la orden es completada o cancelada definitivamente.
-    
+
     Args:
         orden_id: ID de la orden a limpiar
     """
-    if orden_id in _rechazos_global:
-        del _rechazos_global[orden_id]
+    _almacen().limpiar_orden(orden_id)
 
 def obtener_todos_rechazos() -> dict:
     """
-    Obtiene todos los rechazos registrados (para debugging/monitoreo).
-    
+    Obtiene todos los rechazos vigentes (para debugging/monitoreo).
+
     Returns:
-        Diccionario completo de rechazos
+        Diccionario {orden_id: [delivery_ids]}
     """
-    return _rechazos_global.copy()
+    return {
+        orden_id: list(deliveries)
+        for orden_id, deliveries in _almacen().todos(_limite_vigencia()).items()
+    }
 
-def limpiar_rechazos_antiguos(ordenes_activas: list):
+def limpiar_rechazos_antiguos(ordenes_activas: Iterable[int]):
     """
-    Limpia rechazos de órdenes que ya no están activas.
-    
+    Limpia rechazos de órdenes que ya no están activas y los que expiraron por TTL.
+
     Args:
-        ordenes_activas: Lista de IDs de órdenes que SÍ están activas
+        ordenes_activas: IDs de órdenes que SÍ están activas
     """
-    ordenes_a_limpiar = []
-    for orden_id in _rechazos_global.keys():
-        if orden_id not in ordenes_activas:
-            ordenes_a_limpiar.append(orden_id)
-    
-    for orden_id in ordenes_a_limpiar:
-        del _rechazos_global[orden_id]
\ No newline at end of file
+    _almacen().limpiar_antiguos(set(ordenes_activas), _limite_vigencia())
@@ -0,0 +1,115 @@
+"""
+Enrutamiento de lecturas a una réplica de solo lectura.
+
+Si se configura DATABASE_REPLICA_URL, la réplica queda registrada como el bind 'replica'
+(SQLALCHEMY_BINDS) y la sesión decide en cada sentencia a qué base enviarla:
+
+- Escrituras (flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE) -> siempre la primaria.
+- Lecturas de peticiones GET/HEAD y de métodos marcados con @solo_lectura -> la réplica.
+- En cuanto la petición (o el contexto de aplicación) escribe algo, todas sus lecturas
+  siguientes van a la primaria, para que vea sus propios cambios aunque la réplica
+  tenga retraso.
+- Métodos marcados con @usar_primaria leen siempre de la primaria.
+
+Sin réplica configurada todo va a la base principal, igual que antes.
+"""
+import contextvars
+import re
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.elements import TextClause
+
+CLAVE_REPLICA = 'replica'
+
+# None: decidir por el método HTTP | 'replica' | 'primaria'
+_modo = contextvars.ContextVar('modo_replica', default=None)
+
+# SQL textual: lee si empieza con SELECT/WITH y no modifica ni bloquea filas
+# (WITH ... UPDATE/DELETE/INSERT, SELECT ... FOR UPDATE/SHARE)
+_TEXTO_LECTURA = re.compile(r'\s*(select|with)\b', re.IGNORECASE)
+_TEXTO_ESCRITURA = re.compile(r'\b(insert|update|delete|merge)\b|\bfor\s+(no\s+key\s+)?(update|share|key\s+share)\b', re.IGNORECASE)
+
+
+def marcar_escritura():
+    """Fija la primaria para el resto de la petición / contexto de aplicación actual"""
+    if has_app_context():
+        g._replica_escritura = True
+
+
+def hubo_escritura() -> bool:
+    return has_app_context() and g.get('_replica_escritura', False)
+
+
+def _es_lectura(clause) -> bool:
+    """True si la sentencia solo lee (SELECT sin FOR UPDATE)"""
+    if isinstance(clause, TextClause):
+        return bool(_TEXTO_LECTURA.match(clause.text)) and not _TEXTO_ESCRITURA.search(clause.text)
+    if not getattr(clause, 'is_select', False):
+        return False
+    return getattr(clause, '_for_update_arg', None) is None
+
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que envía las lecturas a la réplica cuando corresponde"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None and self._usar_replica(clause):
+            replica = self._db.engines.get(CLAVE_REPLICA)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _usar_replica(self, clause) -> bool:
+        if self._flushing:
+            return False
+        if not _es_lectura(clause):
+            # text() no marca is_dml: cualquier SQL textual que no sea lectura cuenta como escritura
+            if getattr(clause, 'is_dml', False) or isinstance(clause, TextClause):
+                marcar_escritura()
+            return False
+        if hubo_escritura():
+            return False
+
+        modo = _modo.get()
+        if modo is not None:
+            return modo == 'replica'
+        return has_request_context() and request.method in ('GET', 'HEAD')
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _despues_de_flush(session, flush_context):
+    marcar_escritura()
+
+
+@contextmanager
+def modo_lectura(modo):
+    """Fuerza 'replica' o 'primaria' para las lecturas dentro del bloque"""
+    token = _modo.set(modo)
+    try:
+        yield
+    finally:
+        _modo.reset(token)
+
+
+def solo_lectura(funcion):
+    """Marca un método de servicio que solo lee: puede ir a la réplica aunque la petición no sea GET"""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        # Dentro de un bloque que exige la primaria se respeta esa decisión
+        if _modo.get() == 'primaria':
+            return funcion(*args, **kwargs)
+        with modo_lectura('replica'):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+def usar_primaria(funcion):
+    """Marca un método que necesita datos frescos: siempre lee de la primaria"""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with modo_lectura('primaria'):
+            return funcion(*args, **kwargs)
+    return envoltura
@@ -0,0 +1,155 @@
+"""
+Lista de revocación de tokens de refresco, en memoria y persistida en token_revocado.
+
+Renovar el token de acceso (POST /api/auth/refresh) no verifica la contraseña ni busca al
+delivery: basta con la firma del token de refresco y con consultar esta lista, que es un
+par de diccionarios. Un hilo daemon la recarga de la tabla cada
+TOKENS_REVOCACION_RECARGA_SEGUNDOS (solo las entradas nuevas), así las revocaciones hechas
+en otro proceso llegan a todos los workers sin que las peticiones ejecuten SQL.
+
+Mientras la lista no se cargó por primera vez, los tokens de refresco se rechazan (el
+cliente vuelve al login con contraseña); los de acceso se aceptan.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from flask import current_app
+from app.utils.replicas import modo_lectura
+
+# Solapamiento de cada recarga incremental (TOKENS_REVOCACION_MARGEN_SEGUNDOS), ver recargar()
+MARGEN_RECARGA = timedelta(minutes=5)
+
+
+def _epoca(fecha: datetime) -> int:
+    return int((fecha - datetime(1970, 1, 1)).total_seconds())
+
+
+class ListaRevocacion:
+    """jti revocados y, por delivery, la fecha antes de la cual sus tokens no valen"""
+
+    def __init__(self):
+        self._jtis: Dict[str, int] = {}  # {jti: expira (época)}
+        self._usuarios: Dict[int, int] = {}  # {delivery_id: emitidos_antes (época)}
+        self._ultima_fecha: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self.cargada = threading.Event()
+
+    def esta_revocado(self, payload: dict) -> bool:
+        if not self.cargada.is_set():
+            return payload.get('type') == 'refresh'
+        if payload.get('jti') in self._jtis:
+            return True
+        emitidos_antes = self._usuarios.get(payload.get('id'))
+        return emitidos_antes is not None and payload.get('iat', 0) < emitidos_antes
+
+    def agregar(self, entrada):
+        """Incorpora una fila de TokenRevocado"""
+        with self._lock:
+            tipo, valor = entrada.clave.split(':', 1)
+            if tipo == 'jti':
+                self._jtis[valor] = _epoca(entrada.expira)
+            elif tipo == 'usuario' and entrada.emitidos_antes is not None:
+                corte = _epoca(entrada.emitidos_antes)
+                self._usuarios[entrada.delivery_id] = max(corte, self._usuarios.get(entrada.delivery_id, 0))
+
+    def recargar(self, margen: timedelta = MARGEN_RECARGA):
+        """
+        Trae de la tabla las entradas nuevas y descarta de memoria las vencidas.
+
+        fecha_revocacion la pone TokenService con datetime.utcnow() antes del commit, no es
+        la hora del commit: una fila puede aparecer con una fecha anterior a la última ya
+        vista. Cada recarga vuelve a leer `margen` hacia atrás, así que el margen debe cubrir
+        la transacción de revocación más larga más el desfase de reloj entre hosts; una fila
+        que tarde más en confirmarse no llega a este proceso hasta que se reinicie. Releer
+        entradas ya cargadas no cambia nada (agregar es idempotente).
+        """
+        from app.models.token_revocado import TokenRevocado
+
+        ahora = datetime.utcnow()
+        with modo_lectura('primaria'):
+            query = TokenRevocado.query.filter(TokenRevocado.expira > ahora)
+            if self._ultima_fecha is not None:
+                query = query.filter(TokenRevocado.fecha_revocacion >= self._ultima_fecha - margen)
+            entradas = query.all()
+
+        for entrada in entradas:
+            self.agregar(entrada)
+            if self._ultima_fecha is None or entrada.fecha_revocacion > self._ultima_fecha:
+                self._ultima_fecha = entrada.fecha_revocacion
+        if self._ultima_fecha is None:
+            self._ultima_fecha = ahora
+
+        # Un corte por delivery no vence en memoria: es un entero por delivery
+        limite = _epoca(ahora)
+        with self._lock:
+            self._jtis = {jti: expira for jti, expira in self._jtis.items() if expira > limite}
+        self.cargada.set()
+
+
+class RecargaRevocacion:
+    """Hilo daemon que recarga periódicamente la lista de revocación"""
+
+    def __init__(self, app, lista: ListaRevocacion, intervalo: float = 30,
+                 margen: timedelta = MARGEN_RECARGA):
+        self.app = app
+        self.lista = lista
+        self.intervalo = intervalo
+        self.margen = margen
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._hilo = threading.Thread(target=self._ciclo, name='recarga-revocacion', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _ciclo(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.lista.recargar(self.margen)
+            except Exception as e:
+                print(f"Advertencia: Error al recargar la lista de revocación de tokens: {str(e)}")
+            if self._detener.wait(self.intervalo):
+                return
+
+
+lista_revocacion = ListaRevocacion()
+_recarga: Optional[RecargaRevocacion] = None
+_lock = threading.Lock()
+
+
+def _iniciar_recarga():
+    """Arranca (una sola vez por proceso, al primer uso) el hilo de recarga"""
+    global _recarga
+    if _recarga is not None:
+        return
+    with _lock:
+        if _recarga is None:
+            app = current_app._get_current_object()
+            _recarga = RecargaRevocacion(
+                app, lista_revocacion,
+                intervalo=app.config.get('TOKENS_REVOCACION_RECARGA_SEGUNDOS', 30),
+                margen=timedelta(seconds=app.config.get(
+                    'TOKENS_REVOCACION_MARGEN_SEGUNDOS', MARGEN_RECARGA.total_seconds()
+                ))
+            )
+            _recarga.iniciar()
+
+
+def token_revocado(jwt_header, jwt_payload) -> bool:
+    """token_in_blocklist_loader de flask_jwt_extended"""
+    _iniciar_recarga()
+    if not lista_revocacion.cargada.is_set():
+        # Primer uso del proceso: esperar la carga inicial del hilo (sin SQL en la petición)
+        lista_revocacion.cargada.wait(current_app.config.get('TOKENS_REVOCACION_ESPERA_SEGUNDOS', 2))
+    return lista_revocacion.esta_revocado(jwt_payload)
+
+
+def instalar_revocacion(jwt):
+    """Registra la consulta a la lista de revocación en el JWTManager"""
+    jwt.token_in_blocklist_loader(token_revocado)
@@ -1,25 +1,37 @@
-from flask_jwt_extended import create_access_token, get_jwt
-import datetime
-import time
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt
 
-def crear_token_usuario(usuario):
-    """Crea un token JWT con la estructura exacta que necesitas"""
-    
-    # Calcular timestamps
-    now = datetime.datetime.utcnow()
-    nbf_timestamp = int(time.mktime(now.timetuple()))  # Not Before
-    exp_timestamp = int(time.mktime((now + datetime.timedelta(hours=24)).timetuple()))  # Expiration
-    
-    # Configurar claims personalizados
-    additional_claims = {
-        'id': usuario.id,
-        'username': usuario.username,
-        'nbf': nbf_timestamp,
-        'exp': exp_timestamp
+def _claims_usuario(id, username):
+    """Claims propios que llevan tanto el token de acceso como el de refresco"""
+    return {
+        'id': id,
+        'username': username
     }
-    
+
+def crear_token_usuario(usuario):
+    """
+    Crea el token JWT de acceso. nbf y exp los agrega flask_jwt_extended
+    (exp según JWT_ACCESS_TOKEN_EXPIRES).
+    """
     token = create_access_token(
         identity=usuario.username,  # O puedes usar usuario.id
-        additional_claims=additional_claims
+        additional_claims=_claims_usuario(usuario.id, usuario.username)
     )
     return token
+
+def crear_token_refresco(usuario):
+    """Crea el token de refresco (JWT_REFRESH_TOKEN_EXPIRES), con un jti revocable"""
+    return create_refresh_token(
+        identity=usuario.username,
+        additional_claims=_claims_usuario(usuario.id, usuario.username)
+    )
+
+def renovar_token_acceso():
+    """
+    Nuevo token de acceso a partir del token de refresco de la petición actual.
+    No consulta la base: los claims del token de refresco ya están firmados.
+    """
+    claims = get_jwt()
+    return create_access_token(
+        identity=claims['sub'],
+        additional_claims=_claims_usuario(claims['id'], claims['username'])
+    )
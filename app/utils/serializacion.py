@@ -0,0 +1,117 @@
+"""
+Serialización compartida de los modelos.
+
+- Un único objeto de zona horaria de Bolivia (antes cada to_dict llamaba a
+  pytz.timezone('America/La_Paz') por fila) y un único get_bolivia_time.
+- Planes de serialización por modelo: la lista de campos y sus conversiones se arma una
+  sola vez al importar el modelo; cada fila se lee con un attrgetter y solo se convierten
+  los campos que lo necesitan (fechas y Numeric).
+- Proveedor JSON de Flask que usa orjson si está instalado y cae al de la librería
+  estándar en caso contrario.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+import pytz
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - entorno sin orjson
+    orjson = None
+
+NOMBRE_ZONA_BOLIVIA = 'America/La_Paz'
+ZONA_BOLIVIA = pytz.timezone(NOMBRE_ZONA_BOLIVIA)
+
+# Bolivia usa UTC-4 fijo (sin horario de verano) desde el 21/03/1932: para fechas
+# posteriores la conversión se reduce a restar 4 horas, sin pasar por pytz
+_DESFASE_BOLIVIA = timedelta(hours=-4)
+_SUFIJO_BOLIVIA = '-04:00'
+_INICIO_DESFASE_FIJO = datetime(1932, 3, 21, 4)
+
+
+def get_bolivia_time() -> datetime:
+    """Obtiene la hora actual en zona horaria de Bolivia (UTC-4)"""
+    return datetime.now(ZONA_BOLIVIA)
+
+
+def fecha_bolivia_iso(fecha: datetime) -> str:
+    """ISO 8601 en hora de Bolivia; las fechas sin zona se interpretan como UTC"""
+    if fecha.tzinfo is None:
+        if fecha >= _INICIO_DESFASE_FIJO:
+            return (fecha + _DESFASE_BOLIVIA).isoformat() + _SUFIJO_BOLIVIA
+        fecha = pytz.utc.localize(fecha)
+    return fecha.astimezone(ZONA_BOLIVIA).isoformat()
+
+
+def fecha_iso(fecha: datetime) -> str:
+    """ISO 8601 sin conversión de zona"""
+    return fecha.isoformat()
+
+
+def decimal_a_float(valor: Decimal) -> float:
+    return float(valor)
+
+
+class PlanSerializacion:
+    """
+    Lista precalculada de campos de un modelo y sus conversiones.
+
+    Ejemplo:
+        _PLAN = PlanSerializacion(('id', None), ('fecha_creacion', fecha_bolivia_iso),
+                                  timezone=NOMBRE_ZONA_BOLIVIA)
+        _PLAN.serializar(objeto)  ->  {'id': ..., 'fecha_creacion': '...', 'timezone': '...'}
+
+    Los valores None no pasan por el convertidor. Los argumentos con nombre se agregan
+    como constantes a cada diccionario.
+    """
+
+    def __init__(self, *campos: Tuple[str, Optional[Callable[[Any], Any]]], **constantes):
+        self._claves = tuple(nombre for nombre, _ in campos)
+        getter = attrgetter(*self._claves)
+        # attrgetter con un solo nombre devuelve el valor, no una tupla
+        self._leer = getter if len(self._claves) > 1 else (lambda objeto: (getter(objeto),))
+        self._conversiones = tuple(
+            (indice, convertidor) for indice, (_, convertidor) in enumerate(campos) if convertidor
+        )
+        self._constantes = constantes
+
+    def serializar(self, objeto) -> dict:
+        valores = list(self._leer(objeto))
+        for indice, convertidor in self._conversiones:
+            valor = valores[indice]
+            if valor is not None:
+                valores[indice] = convertidor(valor)
+        resultado = dict(zip(self._claves, valores))
+        if self._constantes:
+            resultado.update(self._constantes)
+        return resultado
+
+    def serializar_lista(self, objetos: Iterable) -> List[dict]:
+        serializar = self.serializar
+        return [serializar(objeto) for objeto in objetos]
+
+
+class ProveedorJSONRapido(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask basado en orjson. Mantiene el comportamiento del proveedor por
+    defecto (claves ordenadas, fechas en formato HTTP, Decimal como texto) y, si orjson
+    no está disponible o no puede codificar el objeto, delega en la implementación estándar.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs.get('cls') is not None:
+            return super().dumps(obj, **kwargs)
+
+        opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            opciones |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent') is not None:
+            opciones |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=opciones).decode('utf-8')
+        except TypeError:
+            # p. ej. enteros de más de 64 bits
+            return super().dumps(obj, **kwargs)
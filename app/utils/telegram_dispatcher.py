@@ -0,0 +1,88 @@
+"""
+Despachador en segundo plano de notificaciones de Telegram.
+Las rutas solo encolan (tracking_id, estado) y responden inmediatamente; un pool acotado
+de hilos resuelve el chat_id y envía el mensaje reutilizando una sesión HTTP keep-alive
+(sin un handshake TCP+TLS nuevo por cada mensaje).
+"""
+import queue
+import threading
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class DespachadorTelegram:
+    """Cola acotada + pool fijo de hilos que envían mensajes a la API de Telegram"""
+
+    def __init__(self, app, num_workers: int = 2, tamano_cola: int = 1000, timeout: float = 10):
+        self.app = app
+        self.timeout = timeout
+        self._cola: "queue.Queue" = queue.Queue(maxsize=tamano_cola)
+
+        # Una sola sesión compartida: mantiene abiertas las conexiones a api.telegram.org
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=num_workers)
+        self.session.mount('https://', adaptador)
+
+        self._hilos = []
+        for i in range(num_workers):
+            hilo = threading.Thread(target=self._trabajar, name=f'telegram-dispatcher-{i}', daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def encolar(self, tracking_id: int, estado: str) -> bool:
+        """
+        Encola una notificación. No bloquea.
+
+        Returns:
+            False si la cola está llena (la notificación se descarta)
+        """
+        try:
+            self._cola.put_nowait((tracking_id, estado))
+            return True
+        except queue.Full:
+            return False
+
+    def pendientes(self) -> int:
+        """Cantidad aproximada de notificaciones en cola"""
+        return self._cola.qsize()
+
+    def esperar(self):
+        """Bloquea hasta que se procesen todas las notificaciones encoladas (útil en tests)"""
+        self._cola.join()
+
+    def _trabajar(self):
+        from app.services.tracking_service import TrackingService
+
+        while True:
+            tracking_id, estado = self._cola.get()
+            try:
+                with self.app.app_context():
+                    success, error = TrackingService.enviar_notificacion_telegram(
+                        tracking_id, estado, session=self.session, timeout=self.timeout
+                    )
+                if not success:
+                    print(f"Advertencia: No se pudo enviar notificación de Telegram: {error}")
+            except Exception as e:
+                print(f"Advertencia: Error en el despachador de Telegram: {str(e)}")
+            finally:
+                self._cola.task_done()
+
+
+_despachador: Optional[DespachadorTelegram] = None
+_lock = threading.Lock()
+
+
+def obtener_despachador(app) -> DespachadorTelegram:
+    """Devuelve el despachador del proceso, creándolo la primera vez"""
+    global _despachador
+    if _despachador is None:
+        with _lock:
+            if _despachador is None:
+                _despachador = DespachadorTelegram(
+                    app,
+                    num_workers=app.config.get('TELEGRAM_WORKERS', 2),
+                    tamano_cola=app.config.get('TELEGRAM_COLA_MAXIMA', 1000),
+                    timeout=app.config.get('TELEGRAM_TIMEOUT', 10)
+                )
+    return _despachador
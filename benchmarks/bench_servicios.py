@@ -0,0 +1,435 @@
+"""
+Micro-benchmarks de la capa de servicios y de la serialización.
+
+Corre contra SQLite con TestingConfig (una base temporal por escenario, sembrada con
+inserciones en lote) y mide:
+
+- OrdenService: listados paginados (completas, por estado, por usuario en JSON) y detalle
+- TrackingService: historial por orden y por delivery
+- find_closest_delivery con 10/100/1000 deliveries (índice espacial + rechazos)
+- to_dict de los modelos y codificación JSON con el proveedor de la app
+- rechazos_manager con el almacén en memoria y en base de datos
+
+Los resultados (min/mediana/media/p95 en milisegundos por llamada) se escriben en JSON,
+junto con el commit y la versión de Python, para comparar antes y después de un cambio.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_servicios.py
+    python benchmarks/bench_servicios.py --escalas 1000,10000 --repeticiones 50
+    python benchmarks/bench_servicios.py --salida despues.json --comparar antes.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from sqlalchemy import insert  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.config.config import TestingConfig  # noqa: E402
+
+# Coordenadas del restaurante de TestingConfig
+LATITUD_BASE = TestingConfig.RESTAURANT_LAT
+LONGITUD_BASE = TestingConfig.RESTAURANT_LON
+
+TAMANO_LOTE_SIEMBRA = 10000
+PRODUCTOS = 50
+DETALLES_POR_ORDEN = 3
+TRACKINGS_POR_ORDEN = 2
+DELIVERIES_SIEMBRA = 100
+
+MODELOS = ('user_telgram', 'user_delivery', 'producto', 'orden', 'detalle_orden', 'factura',
+           'datos_envio', 'datos_pago', 'tracking_orden', 'rechazo_orden', 'posicion_delivery')
+
+
+# ==================== MEDICIÓN ====================
+
+def medir(funcion, repeticiones, despues=None):
+    """
+    Ejecuta `funcion` una vez de calentamiento y luego `repeticiones` veces.
+    `despues` corre fuera del tiempo medido (p. ej. limpiar la sesión como al final de una petición).
+
+    Returns:
+        Diccionario con min/mediana/media/p95 en milisegundos
+    """
+    funcion()
+    if despues:
+        despues()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if despues:
+            despues()
+
+    tiempos.sort()
+    return {
+        'repeticiones': repeticiones,
+        'min_ms': round(tiempos[0], 4),
+        'mediana_ms': round(statistics.median(tiempos), 4),
+        'media_ms': round(statistics.fmean(tiempos), 4),
+        'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 4),
+    }
+
+
+def fin_de_peticion():
+    """Lo mismo que hace Flask-SQLAlchemy al terminar cada petición"""
+    db.session.remove()
+
+
+class Resultados:
+    def __init__(self):
+        self.filas = []
+
+    def agregar(self, grupo, nombre, escala, medicion):
+        fila = {'grupo': grupo, 'nombre': nombre, 'escala': escala, **medicion}
+        self.filas.append(fila)
+        print(f"  {grupo:<16} {nombre:<42} {escala:>7}  mediana {fila['mediana_ms']:>9.3f} ms  "
+              f"p95 {fila['p95_ms']:>9.3f} ms")
+
+
+# ==================== APLICACIÓN Y SIEMBRA ====================
+
+def crear_app_benchmark(ruta_db, **config):
+    """App con TestingConfig apuntando a una base SQLite temporal"""
+    atributos = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{ruta_db}', **config}
+    configuracion = type('ConfigBenchmark', (TestingConfig,), atributos)
+    aplicacion = create_app(configuracion)
+
+    # Registrar todos los modelos antes de create_all
+    for modulo in MODELOS:
+        importlib.import_module(f'app.models.{modulo}')
+
+    with aplicacion.app_context():
+        db.create_all()
+    return aplicacion
+
+
+def insertar_en_lotes(modelo, filas):
+    for inicio in range(0, len(filas), TAMANO_LOTE_SIEMBRA):
+        db.session.execute(insert(modelo), filas[inicio:inicio + TAMANO_LOTE_SIEMBRA])
+    db.session.commit()
+
+
+def coordenada_cercana(aleatorio, dispersion=0.05):
+    return (LATITUD_BASE + aleatorio.uniform(-dispersion, dispersion),
+            LONGITUD_BASE + aleatorio.uniform(-dispersion, dispersion))
+
+
+def sembrar_ordenes(cantidad, aleatorio):
+    """
+    Siembra `cantidad` órdenes repartidas entre cantidad/10 usuarios, con sus detalles,
+    datos de envío, trackings y una factura cada dos órdenes.
+    """
+    from app.models.user_telgram import UserTelegram
+    from app.models.user_delivery import UserDelivery
+    from app.models.producto import Producto
+    from app.models.orden import Orden
+    from app.models.detalle_orden import DetalleOrden
+    from app.models.factura import Factura
+    from app.models.datos_envio import DatosEnvio
+    from app.models.tracking_orden import TrackingOrden
+
+    ahora = datetime.utcnow()
+    usuarios = max(cantidad // 10, 1)
+    estados = ['pendiente', 'completada', 'cancelada']
+    estados_tracking = ['asignada', 'recogiendo', 'en_camino', 'entregada']
+
+    insertar_en_lotes(UserTelegram, [
+        {'id': i, 'chat_id': f'chat-{i}', 'created_at': ahora, 'updated_at': ahora}
+        for i in range(1, usuarios + 1)
+    ])
+    insertar_en_lotes(UserDelivery, [
+        {'id': i, 'username': f'delivery-{i}', 'password_hash': 'x', 'fecha_creacion': ahora,
+         'esta_activo': True, 'latitud': lat, 'longitud': lon, 'id_orden': None}
+        for i, (lat, lon) in ((i, coordenada_cercana(aleatorio)) for i in range(1, DELIVERIES_SIEMBRA + 1))
+    ])
+    precios = {i: round(aleatorio.uniform(5, 80), 2) for i in range(1, PRODUCTOS + 1)}
+    insertar_en_lotes(Producto, [
+        {'id': i, 'name': f'Producto {i}', 'price': precios[i], 'category': f'categoria-{i % 5}',
+         'fecha_creacion': ahora}
+        for i in range(1, PRODUCTOS + 1)
+    ])
+
+    ordenes, detalles, facturas, envios, trackings = [], [], [], [], []
+    for cod in range(1, cantidad + 1):
+        fecha = ahora - timedelta(minutes=cantidad - cod)
+        usuario = aleatorio.randint(1, usuarios)
+        total = 0.0
+        for _ in range(DETALLES_POR_ORDEN):
+            producto = aleatorio.randint(1, PRODUCTOS)
+            cantidad_producto = aleatorio.randint(1, 4)
+            total += precios[producto] * cantidad_producto
+            detalles.append({'orden_cod': cod, 'producto_id': producto, 'cantidad': cantidad_producto,
+                             'precio_unitario': precios[producto], 'fecha_agregacion': fecha})
+        tiene_factura = cod % 2 == 0
+        ordenes.append({'cod': cod, 'total': round(total, 2), 'estado': aleatorio.choice(estados),
+                        'fecha_creacion': fecha, 'user_telegram_id': usuario,
+                        'detalles_count': DETALLES_POR_ORDEN, 'tiene_factura': tiene_factura})
+        if tiene_factura:
+            facturas.append({'orden_cod': cod, 'total': round(total, 2), 'estado': 'pagada',
+                             'tipo_pago': 'efectivo', 'fecha_creacion': fecha})
+        lat, lon = coordenada_cercana(aleatorio)
+        envios.append({'orden_id': cod, 'user_telegram_id': usuario, 'latitud': lat, 'longitud': lon,
+                       'ciudad': 'Santa Cruz', 'region': 'Santa Cruz', 'codigo_postal': '0000',
+                       'nombre_completo': f'Cliente {usuario}', 'telefono': '70000000',
+                       'fecha_creacion': fecha})
+        delivery = aleatorio.randint(1, DELIVERIES_SIEMBRA)
+        for paso in range(TRACKINGS_POR_ORDEN):
+            fecha_tracking = fecha + timedelta(minutes=5 * (paso + 1))
+            trackings.append({'orden_cod': cod, 'user_delivery_id': delivery,
+                              'estado': estados_tracking[paso % len(estados_tracking)],
+                              'latitud': lat, 'longitud': lon, 'fecha_creacion': fecha_tracking,
+                              'fecha_actualizacion': fecha_tracking})
+
+    insertar_en_lotes(Orden, ordenes)
+    insertar_en_lotes(DetalleOrden, detalles)
+    insertar_en_lotes(Factura, facturas)
+    insertar_en_lotes(DatosEnvio, envios)
+    insertar_en_lotes(TrackingOrden, trackings)
+    return usuarios
+
+
+# ==================== ESCENARIOS ====================
+
+def bench_ordenes_y_tracking(escala, repeticiones, resultados, aleatorio, directorio):
+    """Servicios de órdenes, tracking y serialización sobre una base con `escala` órdenes"""
+    from app.models.orden import Orden
+    from app.models.tracking_orden import TrackingOrden
+    from app.services.orden_service import OrdenService
+    from app.services.tracking_service import TrackingService
+
+    app = crear_app_benchmark(os.path.join(directorio, f'ordenes-{escala}.db'))
+    with app.app_context():
+        inicio = time.perf_counter()
+        usuarios = sembrar_ordenes(escala, aleatorio)
+        print(f"  (siembra de {escala} órdenes: {time.perf_counter() - inicio:.1f} s)")
+        fin_de_peticion()
+
+        orden_medio = escala // 2 or 1
+        usuario_medio = usuarios // 2 or 1
+        delivery_medio = DELIVERIES_SIEMBRA // 2
+
+        casos = [
+            ('orden', 'obtener_ordenes_completas (pagina 1)',
+             lambda: OrdenService.obtener_ordenes_completas(limit=50)),
+            ('orden', 'obtener_ordenes_completas (pagina intermedia)',
+             lambda: OrdenService.obtener_ordenes_completas(limit=50, after=orden_medio)),
+            ('orden', 'obtener_ordenes_completas (estado)',
+             lambda: OrdenService.obtener_ordenes_completas(estado='pendiente', limit=50)),
+            ('orden', 'obtener_ordenes_usuario_json',
+             lambda: OrdenService.obtener_ordenes_usuario_json(usuario_medio, limit=50)),
+            ('orden', 'obtener_orden_json (detalle)',
+             lambda: OrdenService.obtener_orden_json(orden_medio)),
+            ('orden', 'obtener_orden_por_cod + serializar',
+             lambda: OrdenService.serializar_orden_completa(OrdenService.obtener_orden_por_cod(orden_medio))),
+            ('tracking', 'obtener_trackings_por_orden',
+             lambda: TrackingService.obtener_trackings_por_orden(orden_medio)),
+            ('tracking', 'obtener_historial_por_delivery (limit 50)',
+             lambda: TrackingService.obtener_historial_por_delivery(delivery_medio, limit=50)),
+        ]
+        for grupo, nombre, funcion in casos:
+            resultados.agregar(grupo, nombre, escala, medir(funcion, repeticiones, fin_de_peticion))
+
+        # Serialización: objetos ya cargados, se mide solo to_dict
+        ordenes = Orden.query.order_by(Orden.cod).limit(1000).all()
+        trackings = TrackingOrden.query.order_by(TrackingOrden.id).limit(1000).all()
+        resultados.agregar('serializacion', f'Orden.to_dict x{len(ordenes)}', escala,
+                           medir(lambda: [orden.to_dict() for orden in ordenes], repeticiones))
+        resultados.agregar('serializacion', f'TrackingOrden.to_dict x{len(trackings)}', escala,
+                           medir(lambda: [tracking.to_dict() for tracking in trackings], repeticiones))
+        resultados.agregar('serializacion', f'app.json.dumps x{len(ordenes)} ordenes', escala,
+                           medir(lambda: app.json.dumps([orden.to_dict() for orden in ordenes]), repeticiones))
+        fin_de_peticion()
+        db.engine.dispose()
+
+
+def bench_delivery_cercano(cantidades, repeticiones, resultados, aleatorio, directorio):
+    """find_closest_delivery con distintas cantidades de deliveries y algunos rechazos"""
+    from app.models.user_telgram import UserTelegram
+    from app.models.user_delivery import UserDelivery
+    from app.models.orden import Orden
+    from app.utils.distance_calculator import find_closest_delivery
+    from app.utils.indice_espacial import recargar_indice
+    from app.utils.rechazos_manager import limpiar_rechazos_antiguos, registrar_rechazo
+
+    for cantidad in cantidades:
+        app = crear_app_benchmark(os.path.join(directorio, f'deliveries-{cantidad}.db'),
+                                  INDICE_ESPACIAL_TTL_SEGUNDOS=3600)
+        with app.app_context():
+            ahora = datetime.utcnow()
+            insertar_en_lotes(UserTelegram, [{'id': 1, 'chat_id': 'chat-1', 'created_at': ahora,
+                                              'updated_at': ahora}])
+            insertar_en_lotes(Orden, [{'cod': 1, 'total': 0.0, 'estado': 'pendiente', 'fecha_creacion': ahora,
+                                       'user_telegram_id': 1, 'detalles_count': 0, 'tiene_factura': False}])
+            insertar_en_lotes(UserDelivery, [
+                {'id': i, 'username': f'delivery-{i}', 'password_hash': 'x', 'fecha_creacion': ahora,
+                 'esta_activo': True, 'latitud': lat, 'longitud': lon,
+                 # Un cuarto de los deliveries ya está ocupado
+                 'id_orden': 1000 + i if i % 4 == 0 else None}
+                for i, (lat, lon) in ((i, coordenada_cercana(aleatorio)) for i in range(1, cantidad + 1))
+            ])
+            recargar_indice()
+
+            limpiar_rechazos_antiguos([])
+            # La orden fue rechazada por los 3 deliveries más cercanos
+            cercano = None
+            for _ in range(min(3, cantidad - 1)):
+                cercano = find_closest_delivery(LATITUD_BASE, LONGITUD_BASE, orden_id=1)
+                if cercano:
+                    registrar_rechazo(1, cercano[0].id)
+            fin_de_peticion()
+
+            resultados.agregar('delivery', 'find_closest_delivery (sin rechazos)', cantidad, medir(
+                lambda: find_closest_delivery(LATITUD_BASE, LONGITUD_BASE), repeticiones, fin_de_peticion))
+            resultados.agregar('delivery', 'find_closest_delivery (3 rechazos)', cantidad, medir(
+                lambda: find_closest_delivery(LATITUD_BASE, LONGITUD_BASE, orden_id=1), repeticiones,
+                fin_de_peticion))
+            resultados.agregar('delivery', 'recargar_indice', cantidad, medir(
+                recargar_indice, repeticiones, fin_de_peticion))
+            limpiar_rechazos_antiguos([])
+            db.engine.dispose()
+
+
+def bench_rechazos(repeticiones, resultados, aleatorio, directorio, ordenes=1000, deliveries=50):
+    """Operaciones de rechazos_manager con ambos almacenes"""
+    from app.models.user_telgram import UserTelegram
+    from app.models.user_delivery import UserDelivery
+    from app.models.orden import Orden
+    from app.utils import rechazos_manager
+
+    for backend in ('memoria', 'db'):
+        app = crear_app_benchmark(os.path.join(directorio, f'rechazos-{backend}.db'), RECHAZOS_BACKEND=backend)
+        with app.app_context():
+            ahora = datetime.utcnow()
+            insertar_en_lotes(UserTelegram, [{'id': 1, 'chat_id': 'chat-1', 'created_at': ahora,
+                                              'updated_at': ahora}])
+            insertar_en_lotes(Orden, [
+                {'cod': cod, 'total': 0.0, 'estado': 'pendiente', 'fecha_creacion': ahora,
+                 'user_telegram_id': 1, 'detalles_count': 0, 'tiene_factura': False}
+                for cod in range(1, ordenes + 1)
+            ])
+            insertar_en_lotes(UserDelivery, [
+                {'id': i, 'username': f'delivery-{i}', 'password_hash': 'x', 'fecha_creacion': ahora,
+                 'esta_activo': True}
+                for i in range(1, deliveries + 1)
+            ])
+            rechazos_manager.limpiar_rechazos_antiguos([])
+            # Cada orden con 3 rechazos
+            for cod in range(1, ordenes + 1):
+                for delivery_id in aleatorio.sample(range(1, deliveries + 1), 3):
+                    rechazos_manager.registrar_rechazo(cod, delivery_id)
+            fin_de_peticion()
+
+            def registrar():
+                rechazos_manager.registrar_rechazo(aleatorio.randint(1, ordenes), aleatorio.randint(1, deliveries))
+
+            casos = [
+                ('registrar_rechazo', registrar),
+                ('obtener_rechazos_orden', lambda: rechazos_manager.obtener_rechazos_orden(aleatorio.randint(1, ordenes))),
+                ('delivery_ha_rechazado', lambda: rechazos_manager.delivery_ha_rechazado(
+                    aleatorio.randint(1, ordenes), aleatorio.randint(1, deliveries))),
+                (f'obtener_todos_rechazos ({ordenes} ordenes)', rechazos_manager.obtener_todos_rechazos),
+            ]
+            for nombre, funcion in casos:
+                resultados.agregar(f'rechazos_{backend}', nombre, ordenes, medir(funcion, repeticiones, fin_de_peticion))
+
+            rechazos_manager.limpiar_rechazos_antiguos([])
+            db.engine.dispose()
+
+
+# ==================== SALIDA ====================
+
+def commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(anterior, actual):
+    """Imprime la relación de medianas (actual / anterior) de los casos presentes en ambos"""
+    clave = lambda fila: (fila['grupo'], fila['nombre'], fila['escala'])
+    previas = {clave(fila): fila for fila in anterior['resultados']}
+    print(f"\nComparación contra {anterior['metadatos'].get('commit')} (mediana actual / anterior):")
+    for fila in actual['resultados']:
+        previa = previas.get(clave(fila))
+        if not previa or not previa['mediana_ms']:
+            continue
+        relacion = fila['mediana_ms'] / previa['mediana_ms']
+        print(f"  {fila['grupo']:<16} {fila['nombre']:<42} {fila['escala']:>7}  x{relacion:.2f}")
+
+
+def lista_enteros(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escalas', type=lista_enteros, default=[1000, 10000, 100000],
+                        help='Cantidades de órdenes sembradas (por defecto 1000,10000,100000)')
+    parser.add_argument('--deliveries', type=lista_enteros, default=[10, 100, 1000],
+                        help='Cantidades de deliveries para find_closest_delivery (por defecto 10,100,1000)')
+    parser.add_argument('--repeticiones', type=int, default=30, help='Mediciones por caso (por defecto 30)')
+    parser.add_argument('--semilla', type=int, default=1234, help='Semilla de los datos aleatorios')
+    parser.add_argument('--salida', default=None,
+                        help='Archivo JSON de resultados (por defecto benchmarks/resultados/<commit>-<fecha>.json)')
+    parser.add_argument('--comparar', default=None, help='JSON de una corrida anterior para comparar')
+    argumentos = parser.parse_args()
+
+    aleatorio = random.Random(argumentos.semilla)
+    resultados = Resultados()
+    inicio = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as directorio:
+        for escala in argumentos.escalas:
+            print(f"Órdenes y tracking con {escala} órdenes")
+            bench_ordenes_y_tracking(escala, argumentos.repeticiones, resultados, aleatorio, directorio)
+        print("Delivery más cercano")
+        bench_delivery_cercano(argumentos.deliveries, argumentos.repeticiones, resultados, aleatorio, directorio)
+        print("Rechazos")
+        bench_rechazos(argumentos.repeticiones, resultados, aleatorio, directorio)
+
+    commit = commit_actual()
+    documento = {
+        'metadatos': {
+            'commit': commit,
+            'fecha': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'semilla': argumentos.semilla,
+            'repeticiones': argumentos.repeticiones,
+            'duracion_s': round(time.perf_counter() - inicio, 1),
+        },
+        'resultados': resultados.filas,
+    }
+
+    salida = argumentos.salida
+    if salida is None:
+        marca = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        salida = os.path.join(RAIZ, 'benchmarks', 'resultados', f'{commit or "sin-commit"}-{marca}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(documento, archivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados escritos en {salida}")
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding='utf-8') as archivo:
+            comparar(json.load(archivo), documento)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Esquema inicial
+
+Tablas tal como las creaba `flask db migrate -m "Migración inicial"` antes de versionar
+las migraciones. En una base ya creada con ese esquema basta con marcarla:
+
+    flask db stamp 3f1c2a9b7d10
+    flask db upgrade
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2025-11-03 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_telegram',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chat_id', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chat_id')
+    )
+    op.create_table('user_delivery',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=64), nullable=False),
+    sa.Column('password_hash', sa.String(length=256), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.Column('esta_activo', sa.Boolean(), nullable=True),
+    sa.Column('latitud', sa.Numeric(precision=10, scale=7), nullable=True),
+    sa.Column('longitud', sa.Numeric(precision=10, scale=7), nullable=True),
+    sa.Column('id_orden', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_delivery_username'), 'user_delivery', ['username'], unique=True)
+    op.create_table('productos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('image', sa.String(length=500), nullable=True),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('orden',
+    sa.Column('cod', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.Column('user_telegram_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_telegram_id'], ['user_telegram.id'], ),
+    sa.PrimaryKeyConstraint('cod')
+    )
+    op.create_table('datos_pago',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('numero_tarjeta', sa.String(length=16), nullable=False),
+    sa.Column('fecha_expiracion_tarjeta', sa.String(length=7), nullable=False),
+    sa.Column('nombre_propietario', sa.String(length=150), nullable=False),
+    sa.Column('codigo_seguridad', sa.String(length=4), nullable=False),
+    sa.Column('pais', sa.String(length=100), nullable=False),
+    sa.Column('codigo_postal', sa.String(length=20), nullable=False),
+    sa.Column('user_telegram_id', sa.Integer(), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_telegram_id'], ['user_telegram.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('datos_envio',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('latitud', sa.Numeric(precision=10, scale=7), nullable=False),
+    sa.Column('longitud', sa.Numeric(precision=10, scale=7), nullable=False),
+    sa.Column('ciudad', sa.String(length=100), nullable=False),
+    sa.Column('region', sa.String(length=100), nullable=False),
+    sa.Column('codigo_postal', sa.String(length=20), nullable=False),
+    sa.Column('nombre_completo', sa.String(length=150), nullable=False),
+    sa.Column('telefono', sa.String(length=20), nullable=False),
+    sa.Column('comentario', sa.Text(), nullable=True),
+    sa.Column('user_telegram_id', sa.Integer(), nullable=False),
+    sa.Column('orden_id', sa.Integer(), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['orden_id'], ['orden.cod'], ),
+    sa.ForeignKeyConstraint(['user_telegram_id'], ['user_telegram.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('detalle_orden',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('precio_unitario', sa.Float(), nullable=False),
+    sa.Column('fecha_agregacion', sa.DateTime(), nullable=True),
+    sa.Column('orden_cod', sa.Integer(), nullable=False),
+    sa.Column('producto_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['orden_cod'], ['orden.cod'], ),
+    sa.ForeignKeyConstraint(['producto_id'], ['productos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('factura',
+    sa.Column('cod', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.Column('tipo_pago', sa.String(length=50), nullable=False),
+    sa.Column('orden_cod', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['orden_cod'], ['orden.cod'], ),
+    sa.PrimaryKeyConstraint('cod'),
+    sa.UniqueConstraint('orden_cod')
+    )
+    op.create_table('tracking_orden',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('orden_cod', sa.Integer(), nullable=False),
+    sa.Column('user_delivery_id', sa.Integer(), nullable=False),
+    sa.Column('estado', sa.String(length=50), nullable=False),
+    sa.Column('latitud', sa.Numeric(precision=10, scale=7), nullable=True),
+    sa.Column('longitud', sa.Numeric(precision=10, scale=7), nullable=True),
+    sa.Column('comentario', sa.Text(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+    sa.Column('fecha_actualizacion', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['orden_cod'], ['orden.cod'], ),
+    sa.ForeignKeyConstraint(['user_delivery_id'], ['user_delivery.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('tracking_orden')
+    op.drop_table('factura')
+    op.drop_table('detalle_orden')
+    op.drop_table('datos_envio')
+    op.drop_table('datos_pago')
+    op.drop_table('orden')
+    op.drop_table('productos')
+    op.drop_index(op.f('ix_user_delivery_username'), table_name='user_delivery')
+    op.drop_table('user_delivery')
+    op.drop_table('user_telegram')
@@ -0,0 +1,33 @@
+"""Tabla rechazo_orden para el almacén de rechazos en base de datos
+
+Revision ID: 8b4e6d2f1a93
+Revises: 3f1c2a9b7d10
+Create Date: 2025-11-03 10:20:05.774512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6d2f1a93'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rechazo_orden',
+    sa.Column('orden_id', sa.Integer(), nullable=False),
+    sa.Column('delivery_id', sa.Integer(), nullable=False),
+    sa.Column('fecha_rechazo', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['delivery_id'], ['user_delivery.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['orden_id'], ['orden.cod'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('orden_id', 'delivery_id')
+    )
+    op.create_index(op.f('ix_rechazo_orden_fecha_rechazo'), 'rechazo_orden', ['fecha_rechazo'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_rechazo_orden_fecha_rechazo'), table_name='rechazo_orden')
+    op.drop_table('rechazo_orden')
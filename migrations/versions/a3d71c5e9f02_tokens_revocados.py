@@ -0,0 +1,36 @@
+"""Tabla token_revocado con la lista de revocación de tokens de refresco
+
+Revision ID: a3d71c5e9f02
+Revises: f4a8c2e7b915
+Create Date: 2025-11-10 09:42:17.530914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d71c5e9f02'
+down_revision = 'f4a8c2e7b915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('token_revocado',
+    sa.Column('clave', sa.String(length=64), nullable=False),
+    sa.Column('delivery_id', sa.Integer(), nullable=False),
+    sa.Column('emitidos_antes', sa.DateTime(), nullable=True),
+    sa.Column('expira', sa.DateTime(), nullable=False),
+    sa.Column('fecha_revocacion', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['delivery_id'], ['user_delivery.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('clave')
+    )
+    op.create_index(op.f('ix_token_revocado_expira'), 'token_revocado', ['expira'], unique=False)
+    op.create_index(op.f('ix_token_revocado_fecha_revocacion'), 'token_revocado', ['fecha_revocacion'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_token_revocado_fecha_revocacion'), table_name='token_revocado')
+    op.drop_index(op.f('ix_token_revocado_expira'), table_name='token_revocado')
+    op.drop_table('token_revocado')
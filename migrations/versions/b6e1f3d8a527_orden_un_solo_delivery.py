@@ -0,0 +1,34 @@
+"""Índice único parcial: una orden asignada a lo sumo a un delivery
+
+Antes de crear el índice se liberan los deliveries sobrantes de las órdenes que ya
+quedaron con más de uno (se conserva el de menor id); si no, la creación fallaría.
+
+Revision ID: b6e1f3d8a527
+Revises: a3d71c5e9f02
+Create Date: 2025-11-14 16:08:52.201734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1f3d8a527'
+down_revision = 'a3d71c5e9f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.text(
+        'UPDATE user_delivery SET id_orden = NULL '
+        'WHERE id_orden IS NOT NULL AND id NOT IN ('
+        'SELECT MIN(id) FROM user_delivery WHERE id_orden IS NOT NULL GROUP BY id_orden)'
+    ))
+    op.create_index('ux_user_delivery_id_orden', 'user_delivery', ['id_orden'], unique=True,
+                    postgresql_where=sa.text('id_orden IS NOT NULL'),
+                    sqlite_where=sa.text('id_orden IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ux_user_delivery_id_orden', table_name='user_delivery')
@@ -0,0 +1,37 @@
+"""Columnas detalles_count y tiene_factura en orden
+
+Se rellenan con el mismo UPDATE basado en conjuntos que `flask reparar-totales-orden`.
+
+Revision ID: c57a0e9d4b21
+Revises: 8b4e6d2f1a93
+Create Date: 2025-11-03 10:26:48.109377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c57a0e9d4b21'
+down_revision = '8b4e6d2f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orden', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('detalles_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('tiene_factura', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    op.execute(
+        'UPDATE orden SET '
+        'total = COALESCE((SELECT SUM(d.precio_unitario * d.cantidad) FROM detalle_orden d WHERE d.orden_cod = orden.cod), 0), '
+        'detalles_count = (SELECT COUNT(d.id) FROM detalle_orden d WHERE d.orden_cod = orden.cod), '
+        'tiene_factura = EXISTS (SELECT 1 FROM factura f WHERE f.orden_cod = orden.cod)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('orden', schema=None) as batch_op:
+        batch_op.drop_column('tiene_factura')
+        batch_op.drop_column('detalles_count')
@@ -0,0 +1,64 @@
+"""Índices para las consultas frecuentes de los servicios
+
+En PostgreSQL se crean con CREATE INDEX CONCURRENTLY (fuera de la transacción de la
+migración) para no bloquear escrituras en tablas con datos; en otros motores se crean
+de forma normal.
+
+Revision ID: e2d9f4a61c38
+Revises: c57a0e9d4b21
+Create Date: 2025-11-03 10:41:17.562930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d9f4a61c38'
+down_revision = 'c57a0e9d4b21'
+branch_labels = None
+depends_on = None
+
+
+# (nombre, tabla, columnas, opciones)
+INDICES = [
+    ('ix_orden_user_telegram_id', 'orden', ['user_telegram_id'], {}),
+    ('ix_orden_estado', 'orden', ['estado'], {}),
+    ('ix_detalle_orden_orden_cod', 'detalle_orden', ['orden_cod'], {}),
+    ('ix_tracking_orden_user_delivery_id_fecha_creacion', 'tracking_orden', ['user_delivery_id', 'fecha_creacion'], {}),
+    ('ix_tracking_orden_orden_cod', 'tracking_orden', ['orden_cod'], {}),
+    ('ix_datos_envio_orden_id', 'datos_envio', ['orden_id'], {}),
+    ('ix_datos_envio_user_telegram_id', 'datos_envio', ['user_telegram_id'], {}),
+    ('ix_user_delivery_esta_activo_id_orden', 'user_delivery', ['esta_activo', 'id_orden'], {}),
+    # Parcial: solo deliveries disponibles (activos y sin orden asignada)
+    ('ix_user_delivery_disponibles', 'user_delivery', ['id'], {
+        'postgresql_where': sa.text('esta_activo = true AND id_orden IS NULL'),
+        'sqlite_where': sa.text('esta_activo = 1 AND id_orden IS NULL'),
+    }),
+]
+
+
+def _es_postgresql():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if _es_postgresql():
+        # CONCURRENTLY no puede ejecutarse dentro de una transacción
+        with op.get_context().autocommit_block():
+            for nombre, tabla, columnas, opciones in INDICES:
+                op.create_index(nombre, tabla, columnas, unique=False, if_not_exists=True,
+                                postgresql_concurrently=True, **opciones)
+    else:
+        for nombre, tabla, columnas, opciones in INDICES:
+            op.create_index(nombre, tabla, columnas, unique=False, if_not_exists=True, **opciones)
+
+
+def downgrade():
+    if _es_postgresql():
+        with op.get_context().autocommit_block():
+            for nombre, tabla, _, _ in reversed(INDICES):
+                op.drop_index(nombre, table_name=tabla, if_exists=True, postgresql_concurrently=True)
+    else:
+        for nombre, tabla, _, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla, if_exists=True)
@@ -0,0 +1,31 @@
+"""Tabla posicion_delivery con el historial de posiciones de los deliveries
+
+Revision ID: f4a8c2e7b915
+Revises: e2d9f4a61c38
+Create Date: 2025-11-03 11:05:42.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a8c2e7b915'
+down_revision = 'e2d9f4a61c38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('posicion_delivery',
+    sa.Column('delivery_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.DateTime(), nullable=False),
+    sa.Column('latitud', sa.REAL(), nullable=False),
+    sa.Column('longitud', sa.REAL(), nullable=False),
+    sa.ForeignKeyConstraint(['delivery_id'], ['user_delivery.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('delivery_id', 'fecha')
+    )
+
+
+def downgrade():
+    op.drop_table('posicion_delivery')
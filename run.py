@@ -1,6 +1,17 @@
+import os
+
+# El parche de gevent tiene que ir antes de importar Flask, SQLAlchemy y la app
+if os.environ.get('SERVIDOR_COOPERATIVO', 'false').lower() == 'true':
+    from gevent import monkey
+    monkey.patch_all()
+
 from app import create_app
 
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if app.config.get('SERVIDOR_COOPERATIVO'):
+        from app.utils.modo_cooperativo import servir
+        servir(app, host='0.0.0.0', port=5000, conexiones_maximas=app.config['SERVIDOR_CONEXIONES_MAXIMAS'])
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000)
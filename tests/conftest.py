@@ -0,0 +1,28 @@
+import pytest
+from app import create_app, db
+from app.config.config import TestingConfig
+
+
+class ConfigPrueba(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    INDICE_ESPACIAL_TTL_SEGUNDOS = 0
+
+
+@pytest.fixture
+def app():
+    """Aplicación con una base SQLite en memoria y todas las tablas creadas"""
+    aplicacion = create_app(ConfigPrueba)
+    with aplicacion.app_context():
+        import app.models.user_telgram, app.models.user_delivery, app.models.producto  # noqa: F401
+        import app.models.orden, app.models.detalle_orden, app.models.factura  # noqa: F401
+        import app.models.datos_envio, app.models.datos_pago, app.models.tracking_orden  # noqa: F401
+        import app.models.rechazo_orden, app.models.posicion_delivery, app.models.token_revocado  # noqa: F401
+        db.create_all()
+        yield aplicacion
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
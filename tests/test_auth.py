@@ -0,0 +1,102 @@
+import time
+import pytest
+from flask_jwt_extended import create_refresh_token, decode_token
+from app import db
+from app.utils import revocacion_tokens
+from app.utils.revocacion_tokens import lista_revocacion
+
+
+@pytest.fixture(autouse=True)
+def lista_limpia(monkeypatch):
+    """Sin hilo de recarga: la lista es global del proceso y se reinicia en cada prueba"""
+    monkeypatch.setattr(revocacion_tokens, '_recarga', object())
+    monkeypatch.setattr(lista_revocacion, '_jtis', {})
+    monkeypatch.setattr(lista_revocacion, '_usuarios', {})
+    monkeypatch.setattr(lista_revocacion, '_ultima_fecha', None)
+    lista_revocacion.cargada.set()
+
+
+def _registrar(client, username='delivery1', password='clave123'):
+    respuesta = client.post('/api/auth/registro', json={'username': username, 'password': password})
+    assert respuesta.status_code == 201
+    return respuesta
+
+
+def _bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_registro_y_login_envian_el_token_de_refresco_en_el_encabezado(client):
+    registro = _registrar(client)
+    assert 'refresh_token' not in registro.get_json()
+    assert decode_token(registro.headers['X-Refresh-Token'])['type'] == 'refresh'
+
+    login = client.post('/api/auth/login', json={'username': 'delivery1', 'password': 'clave123'})
+    assert login.status_code == 200
+    assert decode_token(login.headers['X-Refresh-Token'])['type'] == 'refresh'
+
+
+def test_refresh_con_token_de_refresco_valido(client):
+    refresco = _registrar(client).headers['X-Refresh-Token']
+
+    respuesta = client.post('/api/auth/refresh', headers=_bearer(refresco))
+    assert respuesta.status_code == 200
+    claims = decode_token(respuesta.get_data(as_text=True))
+    assert claims['type'] == 'access'
+    assert claims['username'] == 'delivery1'
+
+
+def test_refresh_rechaza_un_token_de_acceso(client):
+    acceso = _registrar(client).get_json()['token']
+
+    respuesta = client.post('/api/auth/refresh', headers=_bearer(acceso))
+    assert respuesta.status_code == 422
+
+
+def test_logout_revoca_el_token_de_refresco(client):
+    refresco = _registrar(client).headers['X-Refresh-Token']
+
+    assert client.post('/api/auth/logout', headers=_bearer(refresco)).status_code == 200
+    assert client.post('/api/auth/refresh', headers=_bearer(refresco)).status_code == 401
+
+
+def test_cambio_de_contrasena_invalida_los_tokens_anteriores(client):
+    from app.services.usuario_service import UsuarioService
+
+    usuario_id = _registrar(client).get_json()['usuario']['id']
+    # iat tiene resolución de segundos: el token "anterior" se emite 10 s antes
+    anterior = create_refresh_token(
+        identity='delivery1',
+        additional_claims={'id': usuario_id, 'username': 'delivery1', 'iat': int(time.time()) - 10}
+    )
+    assert not lista_revocacion.esta_revocado(decode_token(anterior))
+
+    _, error = UsuarioService.actualizar_usuario(usuario_id, {'password': 'nueva456'})
+    assert error is None
+
+    assert lista_revocacion.esta_revocado(decode_token(anterior, allow_expired=True))
+    assert client.post('/api/auth/refresh', headers=_bearer(anterior)).status_code == 401
+
+    nuevo = client.post('/api/auth/login', json={'username': 'delivery1', 'password': 'nueva456'})
+    assert client.post('/api/auth/refresh', headers=_bearer(nuevo.headers['X-Refresh-Token'])).status_code == 200
+
+
+def test_recarga_incluye_filas_confirmadas_con_fecha_anterior(app):
+    from datetime import datetime, timedelta
+    from app.models.token_revocado import TokenRevocado
+    from app.services.usuario_service import UsuarioService
+
+    usuario, _ = UsuarioService.crear_usuario('delivery1', 'clave123')
+    ahora = datetime.utcnow()
+    lista_revocacion.recargar()
+    assert lista_revocacion._ultima_fecha is not None
+
+    # Otro worker tomó fecha_revocacion 2 minutos antes de que su commit terminara
+    db.session.add(TokenRevocado(
+        clave='jti:tardio', delivery_id=usuario.id,
+        expira=ahora + timedelta(days=1), fecha_revocacion=ahora - timedelta(minutes=2)
+    ))
+    db.session.commit()
+
+    lista_revocacion.recargar()
+    assert lista_revocacion.esta_revocado({'jti': 'tardio', 'type': 'refresh'})
@@ -0,0 +1,136 @@
+from collections import deque
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app import db
+from app.config.config import TestingConfig
+from app.utils.buffer_ubicaciones import BufferUbicaciones, buffer_ubicaciones
+
+
+@pytest.fixture(autouse=True)
+def buffer_limpio(app, monkeypatch):
+    """El buffer es global del proceso: estado limpio y sin hilo de flush en cada prueba"""
+    app.config['UBICACION_BANDA_MUERTA_METROS'] = 10
+    app.config['UBICACION_CACHE_TTL_SEGUNDOS'] = 60
+    monkeypatch.setattr(buffer_ubicaciones, '_pendientes', {})
+    monkeypatch.setattr(buffer_ubicaciones, '_aceptadas', {})
+    monkeypatch.setattr(buffer_ubicaciones, '_perfiles', {})
+    monkeypatch.setattr(buffer_ubicaciones, '_historial', deque(maxlen=100000))
+    monkeypatch.setattr(buffer_ubicaciones, 'iniciar', lambda app: None)
+
+
+def _crear_deliveries(cantidad):
+    from app.models.user_delivery import UserDelivery
+
+    deliveries = [
+        UserDelivery(username=f'delivery{i}', password_hash='x', esta_activo=True,
+                     latitud=TestingConfig.RESTAURANT_LAT, longitud=TestingConfig.RESTAURANT_LON)
+        for i in range(cantidad)
+    ]
+    db.session.add_all(deliveries)
+    db.session.commit()
+    return [delivery.id for delivery in deliveries]
+
+
+def _contar_updates():
+    sentencias = []
+
+    def antes(conn, cursor, sql, parametros, contexto, executemany):
+        if sql.lstrip().upper().startswith('UPDATE'):
+            sentencias.append(sql)
+
+    event.listen(db.engine, 'before_cursor_execute', antes)
+    return sentencias
+
+
+def test_ping_dentro_de_la_banda_muerta_no_se_escribe(app):
+    from app.models.user_delivery import UserDelivery
+    from app.services.usuario_service import UsuarioService
+
+    [delivery_id] = _crear_deliveries(1)
+    lat, lon = TestingConfig.RESTAURANT_LAT + 0.01, TestingConfig.RESTAURANT_LON
+
+    _, _, error = UsuarioService.registrar_ubicacion_diferida(delivery_id, lat, lon)
+    assert error is None
+    assert buffer_ubicaciones.flush() == 1
+
+    # ~1 m más allá: dentro de la banda muerta de 10 m
+    _, _, error = UsuarioService.registrar_ubicacion_diferida(delivery_id, lat + 0.00001, lon)
+    assert error is None
+    assert buffer_ubicaciones.pendientes() == {}
+    assert buffer_ubicaciones.flush() == 0
+    assert len(buffer_ubicaciones._historial) == 1
+
+    db.session.expire_all()
+    assert float(db.session.get(UserDelivery, delivery_id).latitud) == pytest.approx(lat)
+
+
+def test_flush_escribe_la_ultima_posicion_de_cada_delivery_en_una_sentencia(app):
+    from app.models.user_delivery import UserDelivery
+
+    ids = _crear_deliveries(2)
+    buffer = BufferUbicaciones()
+    for paso in range(1, 4):
+        for delivery_id in ids:
+            buffer.registrar(delivery_id, -17.7 - paso * 0.01 - delivery_id, -63.1, banda_muerta_m=10)
+
+    sentencias = _contar_updates()
+    assert buffer.flush() == 2
+    assert len(sentencias) == 1
+    assert buffer.pendientes() == {}
+
+    db.session.expire_all()
+    for delivery_id in ids:
+        assert float(db.session.get(UserDelivery, delivery_id).latitud) == pytest.approx(-17.73 - delivery_id)
+
+
+def test_asignacion_invalida_el_id_orden_cacheado(app):
+    from app.models.user_telgram import UserTelegram
+    from app.models.orden import Orden
+    from app.services.despacho_service import DespachoService
+    from app.services.usuario_service import UsuarioService
+
+    [delivery_id] = _crear_deliveries(1)
+    db.session.add(UserTelegram(chat_id='cliente'))
+    db.session.add(Orden(user_telegram_id=1))
+    db.session.commit()
+    lat, lon = TestingConfig.RESTAURANT_LAT + 0.001, TestingConfig.RESTAURANT_LON
+
+    id_orden, _, _ = UsuarioService.registrar_ubicacion_diferida(delivery_id, lat, lon)
+    assert id_orden is None
+
+    asignaciones, error = DespachoService.ejecutar_ronda()
+    assert error is None
+    assert [(orden, delivery) for orden, delivery, _ in asignaciones] == [(1, delivery_id)]
+
+    # Dentro del TTL del caché: sin la invalidación seguiría respondiendo None
+    id_orden, perfil, _ = UsuarioService.registrar_ubicacion_diferida(delivery_id, lat + 0.01, lon)
+    assert id_orden == 1
+    # La posición aún no escrita sigue ganando sobre la de la base
+    assert perfil['latitud'] == pytest.approx(lat + 0.01)
+
+
+def test_flush_historial_ignora_claves_repetidas(app):
+    from app.models.posicion_delivery import PosicionDelivery
+
+    [delivery_id] = _crear_deliveries(1)
+    fecha = datetime(2025, 11, 10, 12, 0, 0)
+    buffer = BufferUbicaciones()
+    buffer._historial.extend([
+        (delivery_id, fecha, -17.78, -63.18),
+        (delivery_id, fecha, -17.79, -63.19),
+    ])
+    buffer.flush_historial()
+
+    # Un reintento que repite un punto ya insertado tampoco falla
+    buffer._historial.extend([
+        (delivery_id, fecha, -17.78, -63.18),
+        (delivery_id, datetime(2025, 11, 10, 12, 0, 5), -17.80, -63.18),
+    ])
+    buffer.flush_historial()
+
+    puntos = PosicionDelivery.query.order_by(PosicionDelivery.fecha).all()
+    assert [(p.fecha, round(p.latitud, 2)) for p in puntos] == [
+        (fecha, -17.78),
+        (datetime(2025, 11, 10, 12, 0, 5), -17.8),
+    ]
@@ -0,0 +1,38 @@
+from app.utils.cache_catalogo import CacheCatalogo
+
+PRODUCTOS = [{'id': 1, 'category': 'bebidas'}, {'id': 2, 'category': 'postres'}]
+
+
+def test_invalidar_durante_la_carga_no_devuelve_catalogo_vacio():
+    cache = CacheCatalogo()
+    cargas = []
+
+    def cargar():
+        cargas.append(1)
+        if len(cargas) == 1:
+            # Otra petición escribe un producto mientras esta carga
+            cache.invalidar()
+        return list(PRODUCTOS)
+
+    productos, _, etag = cache.obtener_pagina(cargar, ttl=60, limit=10)
+    assert productos == PRODUCTOS
+    assert len(cargas) == 2
+
+    # La segunda carga quedó publicada: la categoría sale de la misma versión
+    productos, _, _ = cache.obtener_pagina(cargar, ttl=60, limit=10, categoria='postres')
+    assert productos == [PRODUCTOS[1]]
+    assert len(cargas) == 2
+
+
+def test_invalidar_conserva_la_ultima_version_hasta_recargar():
+    cache = CacheCatalogo()
+    cache.obtener_pagina(lambda: list(PRODUCTOS), ttl=60, limit=10)
+    cache.invalidar()
+
+    def cargar_siempre_invalidado():
+        cache.invalidar()
+        return list(PRODUCTOS)
+
+    productos, _, etag = cache.obtener_pagina(cargar_siempre_invalidado, ttl=60, limit=10)
+    assert productos == PRODUCTOS
+    assert etag.startswith(CacheCatalogo._construir(PRODUCTOS)[3])
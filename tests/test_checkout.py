@@ -0,0 +1,96 @@
+import pytest
+from app import db
+
+
+def _crear_catalogo():
+    from app.models.user_telgram import UserTelegram
+    from app.models.producto import Producto
+
+    db.session.add(UserTelegram(chat_id='cliente'))
+    db.session.add_all([
+        Producto(name='Hamburguesa', price=20.0, category='comida'),
+        Producto(name='Gaseosa', price=5.0, category='bebidas'),
+    ])
+    db.session.commit()
+
+
+def _pedido(**cambios):
+    pedido = {
+        'user_telegram_id': 1,
+        'detalles': [
+            {'producto_id': 1, 'cantidad': 2},
+            {'producto_id': 2, 'cantidad': 3, 'precio_unitario': 4.5},
+        ],
+        'datos_envio': {
+            'latitud': -17.78, 'longitud': -63.18, 'ciudad': 'Santa Cruz', 'region': 'Centro',
+            'codigo_postal': '0000', 'nombre_completo': 'Cliente Prueba', 'telefono': '70000000'
+        },
+        'tipo_pago': 'efectivo'
+    }
+    pedido.update(cambios)
+    return pedido
+
+
+def _contar_filas():
+    from app.models.orden import Orden
+    from app.models.detalle_orden import DetalleOrden
+    from app.models.datos_envio import DatosEnvio
+    from app.models.factura import Factura
+
+    return [modelo.query.count() for modelo in (Orden, DetalleOrden, DatosEnvio, Factura)]
+
+
+def test_checkout_guarda_total_contadores_y_factura(client):
+    from app.models.orden import Orden
+
+    _crear_catalogo()
+    respuesta = client.post('/api/orden/checkout', json=_pedido())
+    assert respuesta.status_code == 201
+
+    orden = db.session.get(Orden, respuesta.get_json()['orden']['cod'])
+    assert orden.total == pytest.approx(2 * 20.0 + 3 * 4.5)
+    assert orden.detalles_count == 2
+    assert orden.tiene_factura
+    assert orden.factura.total == pytest.approx(orden.total)
+    assert _contar_filas() == [1, 2, 1, 1]
+
+
+def test_checkout_conserva_un_precio_explicito_de_cero(client):
+    _crear_catalogo()
+    pedido = _pedido(detalles=[{'producto_id': 1, 'cantidad': 1, 'precio_unitario': 0}])
+
+    respuesta = client.post('/api/orden/checkout', json=pedido)
+    assert respuesta.status_code == 201
+    cuerpo = respuesta.get_json()
+    assert cuerpo['detalles'][0]['precio_unitario'] == 0
+    assert cuerpo['orden']['total'] == 0
+
+
+def test_checkout_con_producto_inexistente_no_guarda_nada(client):
+    _crear_catalogo()
+    pedido = _pedido(detalles=[{'producto_id': 1, 'cantidad': 1}, {'producto_id': 99, 'cantidad': 1}])
+
+    respuesta = client.post('/api/orden/checkout', json=pedido)
+    assert respuesta.status_code == 400
+    assert '99' in respuesta.get_json()['error']
+    assert _contar_filas() == [0, 0, 0, 0]
+
+
+@pytest.mark.parametrize('cambios', [
+    {'detalles': ['x']},
+    {'detalles': {'producto_id': 1, 'cantidad': 1}},
+    {'detalles': [{'producto_id': [1], 'cantidad': 1}]},
+    {'detalles': [{'producto_id': True, 'cantidad': 1}]},
+    {'detalles': [{'producto_id': 1, 'cantidad': True}]},
+    {'detalles': [{'producto_id': 1, 'cantidad': 0}]},
+    {'detalles': [{'producto_id': 1, 'cantidad': 1, 'precio_unitario': '15.5'}]},
+    {'detalles': [{'producto_id': 1, 'cantidad': 1, 'precio_unitario': -1}]},
+    {'datos_envio': {**_pedido()['datos_envio'], 'latitud': 'norte'}},
+    {'datos_envio': {**_pedido()['datos_envio'], 'longitud': [1]}},
+])
+def test_checkout_rechaza_pedidos_mal_formados(client, cambios):
+    _crear_catalogo()
+
+    respuesta = client.post('/api/orden/checkout', json=_pedido(**cambios))
+    assert respuesta.status_code == 400
+    assert _contar_filas() == [0, 0, 0, 0]
@@ -0,0 +1,86 @@
+import pytest
+from app import db
+
+
+@pytest.fixture
+def orden(app):
+    from app.models.user_telgram import UserTelegram
+    from app.models.producto import Producto
+    from app.models.orden import Orden
+
+    db.session.add(UserTelegram(chat_id='cliente'))
+    db.session.add(Producto(name='Hamburguesa', price=20.0, category='comida'))
+    orden = Orden(user_telegram_id=1)
+    db.session.add(orden)
+    db.session.commit()
+    return orden.cod
+
+
+def _contadores(orden_cod):
+    from app.models.orden import Orden
+
+    db.session.expire_all()
+    orden = db.session.get(Orden, orden_cod)
+    return orden.total, orden.detalles_count, orden.tiene_factura
+
+
+def test_agregar_actualizar_y_eliminar_detalles_ajusta_total_y_conteo(orden):
+    from app.services.orden_service import OrdenService
+
+    primero, error = OrdenService.agregar_detalle_orden(orden, 1, 2, 20.0)
+    assert error is None
+    segundo, error = OrdenService.agregar_detalle_orden(orden, 1, 1, 7.5)
+    assert error is None
+    assert _contadores(orden) == (pytest.approx(47.5), 2, False)
+
+    _, error = OrdenService.actualizar_detalle_orden(primero.id, 5)
+    assert error is None
+    assert _contadores(orden) == (pytest.approx(107.5), 2, False)
+
+    _, error = OrdenService.eliminar_detalle_orden(segundo.id)
+    assert error is None
+    assert _contadores(orden) == (pytest.approx(100.0), 1, False)
+
+    # Cantidad 0 equivale a eliminar el detalle
+    _, error = OrdenService.actualizar_detalle_orden(primero.id, 0)
+    assert error is None
+    assert _contadores(orden) == (pytest.approx(0.0), 0, False)
+
+
+def test_crear_y_eliminar_factura_cambia_tiene_factura(orden):
+    from app.services.orden_service import OrdenService
+    from app.services.factura_service import FacturaService
+
+    OrdenService.agregar_detalle_orden(orden, 1, 1, 20.0)
+    factura, error = OrdenService.crear_factura_desde_orden(orden, 'efectivo')
+    assert error is None
+    assert _contadores(orden)[2] is True
+
+    _, error = OrdenService.crear_factura_desde_orden(orden, 'efectivo')
+    assert error == "La orden ya tiene una factura asociada"
+
+    _, error = FacturaService.eliminar_factura(factura.cod)
+    assert error is None
+    assert _contadores(orden)[2] is False
+
+
+def test_reparar_contadores_corrige_desvios(orden):
+    from sqlalchemy import update
+    from app.models.orden import Orden
+    from app.models.factura import Factura
+    from app.services.orden_service import OrdenService
+
+    OrdenService.agregar_detalle_orden(orden, 1, 2, 20.0)
+    OrdenService.agregar_detalle_orden(orden, 1, 1, 5.0)
+    db.session.add(Factura(total=45.0, tipo_pago='efectivo', orden_cod=orden))
+    db.session.commit()
+
+    # Contadores corrompidos a propósito (desvío silencioso)
+    db.session.execute(update(Orden).values(total=999.0, detalles_count=7, tiene_factura=False))
+    db.session.commit()
+    assert _contadores(orden) == (999.0, 7, False)
+
+    filas, error = OrdenService.reparar_contadores_ordenes()
+    assert error is None
+    assert filas == 1
+    assert _contadores(orden) == (pytest.approx(45.0), 2, True)
@@ -0,0 +1,144 @@
+from app import db
+from app.config.config import TestingConfig
+
+
+def _crear_datos(distancias_grados):
+    from app.models.user_telgram import UserTelegram
+    from app.models.orden import Orden
+    from app.models.user_delivery import UserDelivery
+
+    db.session.add(UserTelegram(chat_id='cliente'))
+    deliveries = [
+        UserDelivery(username=f'delivery{i}', password_hash='x', esta_activo=True,
+                     latitud=TestingConfig.RESTAURANT_LAT + delta, longitud=TestingConfig.RESTAURANT_LON)
+        for i, delta in enumerate(distancias_grados)
+    ]
+    db.session.add_all(deliveries)
+    db.session.add(Orden(user_telegram_id=1))
+    db.session.commit()
+    return deliveries
+
+
+def test_orden_aceptada_no_se_vuelve_a_despachar(app):
+    from app.services.despacho_service import DespachoService
+    from app.services.tracking_service import TrackingService
+
+    _crear_datos([0.001, 0.01])
+
+    asignaciones, error = DespachoService.ejecutar_ronda()
+    assert error is None
+    assert [(orden, delivery) for orden, delivery, _ in asignaciones] == [(1, 1)]
+
+    # El delivery acepta: crear_tracking lo libera (id_orden = None) y la orden sigue 'pendiente'
+    _, error = TrackingService.crear_tracking(1, 1, 'asignada')
+    assert error is None
+
+    asignaciones, error = DespachoService.ejecutar_ronda()
+    assert error is None
+    assert asignaciones == []
+
+
+def test_ronda_elige_los_deliveries_mas_cercanos(app):
+    from app.services.despacho_service import DespachoService
+
+    # El más cercano tiene el id más alto: no debe quedar afuera por el límite del lote
+    app.config['DESPACHO_LOTE_MAXIMO'] = 1
+    _crear_datos([0.05, 0.02, 0.001])
+
+    asignaciones, error = DespachoService.ejecutar_ronda()
+    assert error is None
+    assert [(orden, delivery) for orden, delivery, _ in asignaciones] == [(1, 3)]
+
+
+def test_orden_despachada_por_la_ronda_no_recibe_un_segundo_delivery(app):
+    from app.models.user_delivery import UserDelivery
+    from app.services.despacho_service import DespachoService
+    from app.utils.distance_calculator import assign_order_to_closest_delivery
+
+    _crear_datos([0.001, 0.01, 0.02])
+
+    # La ronda toma la orden entre el commit de la orden y la asignación individual
+    asignaciones, error = DespachoService.ejecutar_ronda()
+    assert error is None
+    assert [(orden, delivery) for orden, delivery, _ in asignaciones] == [(1, 1)]
+
+    exito, mensaje, delivery = assign_order_to_closest_delivery(1)
+    assert not exito
+    assert delivery is None
+    assert 'ya tiene un delivery asignado' in mensaje
+
+    db.session.expire_all()
+    assert [(d.id, d.id_orden) for d in UserDelivery.query.order_by(UserDelivery.id)] == [
+        (1, 1), (2, None), (3, None)
+    ]
+
+
+
+def _carrera_tras_verificar(monkeypatch, ordenes_ajenas):
+    """
+    Otro worker asigna los primeros candidatos (uno por orden ajena) justo después de que
+    se verificaron contra la base y antes del UPDATE condicional.
+    Devuelve la lista de (delivery_id, reclamado).
+    """
+    from sqlalchemy import text
+    from app.utils import distance_calculator, indice_espacial
+
+    ordenes = iter(ordenes_ajenas)
+    original = indice_espacial.obtener_delivery_mas_cercano
+
+    def con_carrera(*args, **kwargs):
+        resultado = original(*args, **kwargs)
+        orden_ajena = next(ordenes, None)
+        if resultado and orden_ajena is not None:
+            with db.engine.begin() as conexion:
+                conexion.execute(text('UPDATE user_delivery SET id_orden = :orden WHERE id = :id'),
+                                 {'orden': orden_ajena, 'id': resultado[0].id})
+        return resultado
+
+    reclamos = []
+    reclamar = distance_calculator.reclamar_delivery
+
+    def registrar_reclamo(delivery_id, orden_cod):
+        reclamado = reclamar(delivery_id, orden_cod)
+        reclamos.append((delivery_id, reclamado))
+        return reclamado
+
+    monkeypatch.setattr(indice_espacial, 'obtener_delivery_mas_cercano', con_carrera)
+    monkeypatch.setattr(distance_calculator, 'reclamar_delivery', registrar_reclamo)
+    return reclamos
+
+
+def test_asignacion_reintenta_con_el_siguiente_si_le_ganan_el_mas_cercano(app, monkeypatch):
+    from app.utils.distance_calculator import assign_order_to_closest_delivery
+    from app.utils.indice_espacial import obtener_indice, recargar_indice
+
+    # Sin recargas por TTL: solo la corrección tras el reclamo fallido actualiza el índice
+    app.config['INDICE_ESPACIAL_TTL_SEGUNDOS'] = 3600
+    _crear_datos([0.001, 0.01, 0.02])
+    recargar_indice()
+    # Solo el primer candidato se lo lleva otro worker
+    reclamos = _carrera_tras_verificar(monkeypatch, [99])
+
+    exito, _, delivery = assign_order_to_closest_delivery(1)
+    assert exito
+    assert delivery.id == 2
+    assert reclamos == [(1, False), (2, True)]
+
+    # El índice quedó corregido: el delivery 1 ya no figura como disponible
+    lat, lon = TestingConfig.RESTAURANT_LAT, TestingConfig.RESTAURANT_LON
+    assert [delivery_id for delivery_id, _ in obtener_indice().cercanos(lat, lon, k=3)] == [3]
+
+
+def test_asignacion_se_rinde_tras_max_intentos(app, monkeypatch):
+    from app.utils import distance_calculator
+
+    monkeypatch.setattr(distance_calculator, 'MAX_INTENTOS_ASIGNACION', 2)
+    _crear_datos([0.001, 0.01, 0.02])
+    reclamos = _carrera_tras_verificar(monkeypatch, [91, 92, 93])
+
+    exito, mensaje, delivery = distance_calculator.assign_order_to_closest_delivery(1)
+    assert not exito
+    assert delivery is None
+    assert mensaje == "No se pudo asignar la orden: todos los deliveries cercanos fueron tomados"
+    # Quedaba un delivery libre, pero se agotaron los intentos
+    assert reclamos == [(1, False), (2, False)]
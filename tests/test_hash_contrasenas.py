@@ -0,0 +1,17 @@
+import os
+import pytest
+from app.utils.hash_contrasenas import HashSaturado, PoolHash, _verificar, generar_hash
+
+
+def test_pool_roto_responde_saturado_y_se_recrea():
+    pool = PoolHash(1, 2, timeout=30)
+    try:
+        # El proceso del pool muere a mitad del trabajo (como un OOM kill)
+        with pytest.raises(HashSaturado):
+            pool.ejecutar(os._exit, 1)
+
+        # La siguiente petición usa un pool nuevo
+        assert pool.ejecutar(_verificar, generar_hash('clave123'), 'clave123') is True
+        assert pool._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        pool.cerrar()
@@ -0,0 +1,27 @@
+import json
+from app import db
+
+
+def _crear_ordenes(cantidad):
+    from app.models.user_telgram import UserTelegram
+    from app.models.orden import Orden
+
+    db.session.add(UserTelegram(chat_id='cliente'))
+    db.session.add_all([Orden(user_telegram_id=1) for _ in range(cantidad)])
+    db.session.commit()
+
+
+def test_error_en_el_json_sql_recurre_al_orm(app, monkeypatch):
+    from app.services.orden_service import OrdenService
+
+    _crear_ordenes(3)
+    # En SQLite la sentencia de PostgreSQL falla: debe responder con el ORM, no con una lista vacía
+    monkeypatch.setattr(OrdenService, '_usar_json_sql', staticmethod(lambda: True))
+
+    primera = json.loads(OrdenService.obtener_ordenes_usuario_json(1, limit=2))
+    assert [orden['cod'] for orden in primera['ordenes']] == [1, 2]
+    assert primera['siguiente_cursor'] == 2
+
+    segunda = json.loads(OrdenService.obtener_ordenes_usuario_json(1, limit=2, after=2))
+    assert [orden['cod'] for orden in segunda['ordenes']] == [3]
+    assert segunda['siguiente_cursor'] is None
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import text
+from app import db
+from app.utils.replicas import _es_lectura, hubo_escritura
+
+
+@pytest.mark.parametrize('sql, lectura', [
+    ('SELECT 1', True),
+    ('  with x AS (SELECT 1) SELECT * FROM x', True),
+    ('WITH\nx AS (SELECT 1) SELECT * FROM x', True),
+    ('WITH borradas AS (DELETE FROM t RETURNING id) SELECT * FROM borradas', False),
+    ('SELECT * FROM t FOR UPDATE', False),
+    ('UPDATE t SET a = v.a FROM (VALUES (1, 2)) AS v (id, a) WHERE t.id = v.id', False),
+])
+def test_es_lectura_sql_textual(sql, lectura):
+    assert _es_lectura(text(sql)) is lectura
+
+
+def test_update_textual_fija_la_primaria(app):
+    # Cada petición real tiene su propio contexto de aplicación (y su propio g)
+    with app.app_context(), app.test_request_context('/', method='GET'):
+        db.session.execute(text('CREATE TABLE t (id INTEGER, a INTEGER)'))
+        assert hubo_escritura()
+
+    with app.app_context(), app.test_request_context('/', method='GET'):
+        db.session.execute(text('SELECT 1'))
+        assert not hubo_escritura()
+        db.session.execute(text('UPDATE t SET a = 1'))
+        assert hubo_escritura()
+
+
+@pytest.fixture
+def app_con_replica(tmp_path):
+    """Primaria y réplica en dos archivos SQLite con filas distintas"""
+    from app import create_app
+    from app.config.config import TestingConfig
+
+    class ConfigReplica(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primaria.db'}"
+        SQLALCHEMY_BINDS = {'replica': f"sqlite:///{tmp_path / 'replica.db'}"}
+
+    aplicacion = create_app(ConfigReplica)
+    with aplicacion.app_context():
+        import app.models.user_telgram  # noqa: F401
+        for engine, chat_id in ((db.engines[None], 'primaria'), (db.engines['replica'], 'replica')):
+            db.metadata.create_all(engine)
+            with engine.begin() as conexion:
+                conexion.execute(text('INSERT INTO user_telegram (chat_id) VALUES (:chat_id)'), {'chat_id': chat_id})
+    yield aplicacion
+    with aplicacion.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registró el bind en el db global: sin esto create_all falla en las demás pruebas
+    db.metadatas.pop('replica', None)
+
+
+def _chat_ids(engine=None):
+    from app.models.user_telgram import UserTelegram
+
+    if engine is None:
+        return sorted(chat_id for (chat_id,) in db.session.query(UserTelegram.chat_id))
+    with engine.connect() as conexion:
+        return sorted(fila[0] for fila in conexion.execute(text('SELECT chat_id FROM user_telegram')))
+
+
+def test_get_lee_de_la_replica(app_con_replica):
+    respuesta = app_con_replica.test_client().get('/api/user-telegram/')
+    assert respuesta.status_code == 200
+    assert [usuario['chat_id'] for usuario in respuesta.get_json()['users']] == ['replica']
+
+
+def test_post_escribe_en_la_primaria(app_con_replica):
+    # 'replica' solo existe en la réplica: el POST también lee de la primaria y lo crea ahí
+    respuesta = app_con_replica.test_client().post('/api/user-telegram/', json={'chat_id': 'replica'})
+    assert respuesta.status_code == 201
+
+    with app_con_replica.app_context():
+        assert _chat_ids(db.engines[None]) == ['primaria', 'replica']
+        assert _chat_ids(db.engines['replica']) == ['replica']
+
+
+def test_lecturas_despues_de_escribir_quedan_en_la_primaria(app_con_replica):
+    from app.models.user_telgram import UserTelegram
+
+    with app_con_replica.app_context(), app_con_replica.test_request_context('/', method='GET'):
+        assert _chat_ids() == ['replica']
+        db.session.add(UserTelegram(chat_id='nuevo'))
+        db.session.commit()
+        assert _chat_ids() == ['nuevo', 'primaria']
+
+
+def test_usar_primaria_ignora_la_replica(app_con_replica):
+    from app.utils.replicas import usar_primaria
+
+    leer_primaria = usar_primaria(_chat_ids)
+    with app_con_replica.app_context(), app_con_replica.test_request_context('/', method='GET'):
+        assert leer_primaria() == ['primaria']
+        assert _chat_ids() == ['replica']
@@ -0,0 +1,72 @@
+import pytest
+from app import db
+
+
+@pytest.fixture(autouse=True)
+def stream_corto(app):
+    app.config['TRACKING_STREAM_HEARTBEAT_SEGUNDOS'] = 0.1
+    app.config['TRACKING_STREAM_DURACION_MAXIMA_SEGUNDOS'] = 0.5
+    # Lotes chicos para que la reanudación tenga que leer varios
+    app.config['TRACKING_STREAM_LOTE_PERDIDOS'] = 2
+
+
+def _crear_orden():
+    from app.models.user_telgram import UserTelegram
+    from app.models.orden import Orden
+    from app.models.user_delivery import UserDelivery
+
+    db.session.add(UserTelegram(chat_id='cliente'))
+    db.session.add(UserDelivery(username='delivery1', password_hash='x', esta_activo=True))
+    db.session.add(Orden(user_telegram_id=1))
+    db.session.commit()
+    return 1, 1
+
+
+def _ids_eventos(cuerpo):
+    return [
+        linea[len('id: '):]
+        for mensaje in cuerpo.split('\n\n')
+        for linea in mensaje.split('\n')
+        if linea.startswith('id: ')
+    ]
+
+
+def test_reanudar_con_last_event_id_envia_los_perdidos_una_vez_y_en_orden(app):
+    from app.services.tracking_service import TrackingService
+    from app.utils.eventos_tracking import bus_tracking
+
+    orden_cod, delivery_id = _crear_orden()
+
+    def crear(estado):
+        tracking, error = TrackingService.crear_tracking(orden_cod, delivery_id, estado)
+        assert error is None
+        return tracking, TrackingService.evento_tracking(tracking)
+
+    primero, (ultimo_recibido, _) = crear('asignada')
+
+    # Cambios que el cliente se pierde mientras está desconectado (más de un lote)
+    perdidos = []
+    segundo, evento = crear('en_camino')
+    perdidos.append(evento)
+    _, evento = crear('cerca')
+    perdidos.append(evento)
+    actualizado, error = TrackingService.actualizar_tracking(primero.id, {'comentario': 'retirada'})
+    assert error is None
+    perdidos.append(TrackingService.evento_tracking(actualizado))
+    _, evento = crear('entregada')
+    perdidos.append(evento)
+
+    respuesta = app.test_client().get(
+        f'/api/tracking/orden/{orden_cod}/stream', headers={'Last-Event-ID': ultimo_recibido}
+    )
+    assert respuesta.status_code == 200
+
+    # Ya suscrito: un evento repetido en la cola en vivo y uno nuevo
+    bus_tracking.publicar(orden_cod, *perdidos[1])
+    actualizado, error = TrackingService.actualizar_tracking(segundo.id, {'estado': 'entregada'})
+    assert error is None
+    nuevo, _ = TrackingService.evento_tracking(actualizado)
+
+    ids = _ids_eventos(respuesta.get_data(as_text=True))
+    assert ids == [id_del_evento for id_del_evento, _ in perdidos] + [nuevo]
+    assert bus_tracking.conexiones() == 0